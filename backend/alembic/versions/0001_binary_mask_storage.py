@@ -0,0 +1,92 @@
+"""Store segmentation masks as bit-packed binary
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from app.utils import mask_codec
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 200
+
+segmentations = sa.table(
+    "segmentations",
+    sa.column("id", sa.Integer),
+    sa.column("mask_data", mysql.LONGTEXT),
+    sa.column("mask_blob", mysql.LONGBLOB),
+    sa.column("bbox_x", sa.DECIMAL(10, 6)),
+    sa.column("bbox_y", sa.DECIMAL(10, 6)),
+    sa.column("bbox_width", sa.DECIMAL(10, 6)),
+    sa.column("bbox_height", sa.DECIMAL(10, 6)),
+    sa.column("area", sa.DECIMAL(15, 6)),
+)
+
+
+def _columns() -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns("segmentations")}
+
+
+def _convert(source, convert_row) -> None:
+    """Walk segmentations in id order, converting one batch at a time"""
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(segmentations.c.id, source)
+            .where(segmentations.c.id > last_id)
+            .order_by(segmentations.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for row_id, value in rows:
+            bind.execute(
+                segmentations.update()
+                .where(segmentations.c.id == row_id)
+                .values(**convert_row(value))
+            )
+        last_id = rows[-1][0]
+
+
+def _to_blob(mask_data) -> dict:
+    try:
+        mask = mask_codec.decode_image_data(mask_data or "")
+    except ValueError:
+        # Unreadable legacy data becomes an empty 1x1 mask rather than blocking the upgrade
+        mask = np.zeros((1, 1), dtype=bool)
+    blob = mask_codec.encode_mask(mask)
+    return {"mask_blob": blob, **mask_codec.mask_stats(blob)}
+
+
+def _to_png(mask_blob) -> dict:
+    return {"mask_data": mask_codec.encode_png_data_url(mask_codec.decode_mask(mask_blob))}
+
+
+def upgrade() -> None:
+    # Databases created from the current schema.sql already use binary masks
+    if "mask_data" not in _columns():
+        return
+
+    op.add_column("segmentations", sa.Column("mask_blob", mysql.LONGBLOB(), nullable=True))
+    _convert(segmentations.c.mask_data, _to_blob)
+    op.alter_column("segmentations", "mask_blob", existing_type=mysql.LONGBLOB(), nullable=False)
+    op.drop_column("segmentations", "mask_data")
+
+
+def downgrade() -> None:
+    op.add_column("segmentations", sa.Column("mask_data", mysql.LONGTEXT(), nullable=True))
+    _convert(segmentations.c.mask_blob, _to_png)
+    op.alter_column("segmentations", "mask_data", existing_type=mysql.LONGTEXT(), nullable=False)
+    op.drop_column("segmentations", "mask_blob")
\ No newline at end of file
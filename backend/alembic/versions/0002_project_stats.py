@@ -0,0 +1,80 @@
+"""Add materialized project_stats counters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+BACKFILL = """
+INSERT INTO project_stats (
+    project_id, total_images, train_images, val_images, test_images,
+    annotated_images, class_count, segmentation_count
+)
+SELECT
+    p.id,
+    COALESCE(i.total_images, 0),
+    COALESCE(i.train_images, 0),
+    COALESCE(i.val_images, 0),
+    COALESCE(i.test_images, 0),
+    COALESCE(i.annotated_images, 0),
+    COALESCE(c.class_count, 0),
+    COALESCE(s.segmentation_count, 0)
+FROM projects p
+LEFT JOIN (
+    SELECT
+        project_id,
+        COUNT(*) AS total_images,
+        SUM(CASE WHEN dataset_type = 'train' THEN 1 ELSE 0 END) AS train_images,
+        SUM(CASE WHEN dataset_type = 'val' THEN 1 ELSE 0 END) AS val_images,
+        SUM(CASE WHEN dataset_type = 'test' THEN 1 ELSE 0 END) AS test_images,
+        SUM(CASE WHEN has_annotations THEN 1 ELSE 0 END) AS annotated_images
+    FROM images
+    GROUP BY project_id
+) i ON i.project_id = p.id
+LEFT JOIN (
+    SELECT project_id, COUNT(*) AS class_count
+    FROM class_definitions
+    GROUP BY project_id
+) c ON c.project_id = p.id
+LEFT JOIN (
+    SELECT images.project_id, COUNT(*) AS segmentation_count
+    FROM segmentations
+    JOIN images ON images.id = segmentations.image_id
+    GROUP BY images.project_id
+) s ON s.project_id = p.id
+"""
+
+
+def counter(name: str) -> sa.Column:
+    return sa.Column(name, sa.Integer(), nullable=False, server_default="0")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "project_stats",
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True),
+        counter("total_images"),
+        counter("train_images"),
+        counter("val_images"),
+        counter("test_images"),
+        counter("annotated_images"),
+        counter("class_count"),
+        counter("segmentation_count"),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    op.drop_table("project_stats")
\ No newline at end of file
@@ -0,0 +1,27 @@
+"""Add images.content_hash for upload deduplication
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00.000000
+
+Existing images keep a NULL hash and are not matched as duplicates.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("images", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.create_index("idx_project_content_hash", "images", ["project_id", "content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_project_content_hash", table_name="images")
+    op.drop_column("images", "content_hash")
\ No newline at end of file
@@ -0,0 +1,27 @@
+"""Add (created_at, id) indexes for keyset pagination
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00.000000
+
+Image listings page on (project_id, id), which the existing project_id
+index already serves: InnoDB secondary indexes carry the primary key.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("idx_segmentations_created_at_id", "segmentations", ["created_at", "id"])
+    op.create_index("idx_annotations_created_at_id", "annotations", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_annotations_created_at_id", table_name="annotations")
+    op.drop_index("idx_segmentations_created_at_id", table_name="segmentations")
\ No newline at end of file
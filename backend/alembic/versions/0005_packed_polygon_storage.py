@@ -0,0 +1,100 @@
+"""Store annotation polygons as packed float32 binary
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from app.utils import polygon_codec
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+annotations = sa.table(
+    "annotations",
+    sa.column("id", sa.Integer),
+    sa.column("normalized_coordinates", mysql.LONGTEXT),
+    sa.column("original_coordinates", mysql.LONGTEXT),
+    sa.column("normalized_blob", mysql.LONGBLOB),
+    sa.column("original_blob", mysql.LONGBLOB),
+)
+
+
+def _columns() -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns("annotations")}
+
+
+def _convert(sources, convert_row) -> None:
+    """Walk annotations in id order, converting one batch at a time"""
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(annotations.c.id, *sources)
+            .where(annotations.c.id > last_id)
+            .order_by(annotations.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for row_id, *values in rows:
+            bind.execute(
+                annotations.update()
+                .where(annotations.c.id == row_id)
+                .values(**convert_row(*values))
+            )
+        last_id = rows[-1][0]
+
+
+def _pack(raw):
+    try:
+        return polygon_codec.encode_coordinates(raw)
+    except ValueError:
+        # Unreadable legacy data becomes an empty polygon rather than blocking the upgrade
+        return b""
+
+
+def _to_blob(normalized, original) -> dict:
+    return {
+        "normalized_blob": _pack(normalized or "[]"),
+        "original_blob": None if original is None else _pack(original),
+    }
+
+
+def _to_json(normalized, original) -> dict:
+    return {
+        "normalized_coordinates": polygon_codec.to_json(normalized, polygon_codec.NORMALIZED_DECIMALS),
+        "original_coordinates": polygon_codec.to_json(original, polygon_codec.ORIGINAL_DECIMALS),
+    }
+
+
+def upgrade() -> None:
+    # Databases created from the current schema.sql already use binary polygons
+    if "normalized_coordinates" not in _columns():
+        return
+
+    op.add_column("annotations", sa.Column("normalized_blob", mysql.LONGBLOB(), nullable=True))
+    op.add_column("annotations", sa.Column("original_blob", mysql.LONGBLOB(), nullable=True))
+    _convert((annotations.c.normalized_coordinates, annotations.c.original_coordinates), _to_blob)
+    op.alter_column("annotations", "normalized_blob", existing_type=mysql.LONGBLOB(), nullable=False)
+    op.drop_column("annotations", "normalized_coordinates")
+    op.drop_column("annotations", "original_coordinates")
+
+
+def downgrade() -> None:
+    op.add_column("annotations", sa.Column("normalized_coordinates", mysql.LONGTEXT(), nullable=True))
+    op.add_column("annotations", sa.Column("original_coordinates", mysql.LONGTEXT(), nullable=True))
+    _convert((annotations.c.normalized_blob, annotations.c.original_blob), _to_json)
+    op.alter_column("annotations", "normalized_coordinates", existing_type=mysql.LONGTEXT(), nullable=False)
+    op.drop_column("annotations", "normalized_blob")
+    op.drop_column("annotations", "original_blob")
@@ -0,0 +1,31 @@
+"""Add revision counters for HTTP cache validators
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00.000000
+
+updated_at has whole-second resolution in MySQL, so two writes within a
+second left ETags unchanged. revision is bumped by every UPDATE (see
+models.base.RevisionMixin); existing rows start at 0.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+TABLES = ("images", "class_definitions", "segmentations", "annotations")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column("revision", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_column(table, "revision")
@@ -1,5 +1,7 @@
-from typing import Any, List
+from datetime import datetime
+from typing import Any, List, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import json
 import zipfile
@@ -7,34 +9,74 @@ import io
 import os
 from pathlib import Path
 
-from ....core.deps import get_db, get_current_user
-from ....crud import annotation as crud_annotation, project as crud_project, image as crud_image, segmentation as crud_segmentation
+from ....core.database import ReadSessionLocal
+from ....core.deps import (
+    check_project_access, get_db, get_current_user, get_owned_segmentation, get_read_db, OwnedResource,
+    ReadResourceAccess, ResourceAccess
+)
+from ....crud import annotation as crud_annotation, project as crud_project
 from ....models.user import User
-from ....schemas.annotation import Annotation, AnnotationCreate, AnnotationUpdate
+from ....schemas.annotation import Annotation, AnnotationCreate, AnnotationSummary, AnnotationUpdate
+from ....services import annotation_validation
+from ....services.dataset_export import stream_project_export
+from ....utils import pagination
 
 router = APIRouter()
 
-@router.get("/segmentation/{segmentation_id}", response_model=List[Annotation])
+@router.get("/segmentation/{segmentation_id}", response_model=Union[List[Annotation], List[AnnotationSummary]])
 def read_segmentation_annotations(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     segmentation_id: int,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ReadResourceAccess("segmentation", "segmentation_id")),
+    summary: bool = False,
 ) -> Any:
     """
     Retrieve all annotations for a specific segmentation.
+    
+    With `summary=true` only polygon metrics are returned, without coordinates.
     """
-    # Verify segmentation exists and user has access
-    segmentation = crud_segmentation.get(db, id=segmentation_id)
-    if not segmentation:
-        raise HTTPException(status_code=404, detail="Segmentation not found")
+    annotations = crud_annotation.get_by_segmentation(
+        db, segmentation_id=segmentation_id, summary=summary
+    )
+    if summary:
+        return [AnnotationSummary.from_orm(annotation) for annotation in annotations]
+    return annotations
+
+@router.get("/project/{project_id}", response_model=Union[List[Annotation], List[AnnotationSummary]])
+def read_project_annotations(
+    *,
+    db: Session = Depends(get_read_db),
+    project_id: int,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    summary: bool = False,
+) -> Any:
+    """
+    Retrieve annotations for a specific project, newest first.
     
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    Pages are chained with the opaque cursor returned in the `X-Next-Cursor`
+    header (absent on the last page). With `summary=true` only polygon
+    metrics are returned, without coordinates.
+    """
+    # Verify project ownership
+    check_project_access(db, project_id=project_id, user=current_user)
     
-    annotations = crud_annotation.get_by_segmentation(db, segmentation_id=segmentation_id)
+    try:
+        after = pagination.decode_cursor(cursor, (datetime, int)) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    annotations = crud_annotation.get_by_project(
+        db, project_id=project_id, limit=limit, after=after, summary=summary
+    )
+    next_cursor = pagination.next_cursor(annotations, limit, ("created_at", "id"))
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    if summary:
+        return [AnnotationSummary.from_orm(annotation) for annotation in annotations]
     return annotations
 
 @router.post("/", response_model=Annotation)
@@ -48,14 +90,7 @@ def create_annotation(
     Create new annotation.
     """
     # Verify segmentation exists and user has access
-    segmentation = crud_segmentation.get(db, id=annotation_in.segmentation_id)
-    if not segmentation:
-        raise HTTPException(status_code=404, detail="Segmentation not found")
-    
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    get_owned_segmentation(db, segmentation_id=annotation_in.segmentation_id, user=current_user)
     
     # Create annotation
     annotation = crud_annotation.create(db, obj_in=annotation_in)
@@ -64,25 +99,13 @@ def create_annotation(
 @router.get("/{id}", response_model=Annotation)
 def read_annotation(
     *,
-    db: Session = Depends(get_db),
     id: int,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ResourceAccess("annotation")),
 ) -> Any:
     """
     Get annotation by ID.
     """
-    annotation = crud_annotation.get(db, id=id)
-    if not annotation:
-        raise HTTPException(status_code=404, detail="Annotation not found")
-    
-    # Verify user has access
-    segmentation = crud_segmentation.get(db, id=annotation.segmentation_id)
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    return annotation
+    return owned.annotation
 
 @router.put("/{id}", response_model=Annotation)
 def update_annotation(
@@ -90,23 +113,12 @@ def update_annotation(
     db: Session = Depends(get_db),
     id: int,
     annotation_in: AnnotationUpdate,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ResourceAccess("annotation")),
 ) -> Any:
     """
     Update an annotation.
     """
-    annotation = crud_annotation.get(db, id=id)
-    if not annotation:
-        raise HTTPException(status_code=404, detail="Annotation not found")
-    
-    # Verify user has access
-    segmentation = crud_segmentation.get(db, id=annotation.segmentation_id)
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    annotation = crud_annotation.update(db, db_obj=annotation, obj_in=annotation_in)
+    annotation = crud_annotation.update(db, db_obj=owned.annotation, obj_in=annotation_in)
     return annotation
 
 @router.delete("/{id}")
@@ -114,22 +126,11 @@ def delete_annotation(
     *,
     db: Session = Depends(get_db),
     id: int,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ResourceAccess("annotation")),
 ) -> Any:
     """
     Delete an annotation.
     """
-    annotation = crud_annotation.get(db, id=id)
-    if not annotation:
-        raise HTTPException(status_code=404, detail="Annotation not found")
-    
-    # Verify user has access
-    segmentation = crud_segmentation.get(db, id=annotation.segmentation_id)
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
     crud_annotation.remove(db, id=id)
     return {"message": "Annotation deleted successfully"}
 
@@ -139,21 +140,16 @@ def simplify_annotation(
     db: Session = Depends(get_db),
     id: int,
     tolerance: float = 2.0,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ResourceAccess("annotation")),
 ) -> Any:
     """
     Simplify annotation coordinates using Douglas-Peucker algorithm.
     """
-    annotation = crud_annotation.get(db, id=id)
-    if not annotation:
-        raise HTTPException(status_code=404, detail="Annotation not found")
+    if tolerance <= 0:
+        raise HTTPException(status_code=400, detail="Tolerance must be positive")
     
-    # Verify user has access
-    segmentation = crud_segmentation.get(db, id=annotation.segmentation_id)
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    # Read before simplifying; the same instance is updated in place
+    original_points = owned.annotation.point_count
     
     # Simplify coordinates
     simplified_annotation = crud_annotation.simplify_coordinates(
@@ -162,32 +158,59 @@ def simplify_annotation(
     
     return {
         "message": "Annotation simplified successfully",
-        "original_points": annotation.point_count,
+        "original_points": original_points,
         "simplified_points": simplified_annotation.point_count,
-        "reduction_percentage": round((1 - simplified_annotation.point_count / annotation.point_count) * 100, 2)
+        "reduction_percentage": round((1 - simplified_annotation.point_count / original_points) * 100, 2)
     }
 
-@router.post("/{id}/validate")
-def validate_annotation(
+@router.post("/project/{project_id}/simplify")
+def simplify_project_annotations(
     *,
     db: Session = Depends(get_db),
-    id: int,
+    project_id: int,
+    tolerance: Optional[float] = None,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
-    Validate annotation coordinates and geometry.
+    Simplify every annotation of a project using Douglas-Peucker algorithm.
+    
+    Without `tolerance` the project's simplify_tolerance is used.
     """
-    annotation = crud_annotation.get(db, id=id)
-    if not annotation:
-        raise HTTPException(status_code=404, detail="Annotation not found")
+    project = crud_project.get(db, id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
     
-    # Verify user has access
-    segmentation = crud_segmentation.get(db, id=annotation.segmentation_id)
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
+    if project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    if tolerance is None:
+        if not project.simplify_polygons:
+            raise HTTPException(status_code=400, detail="Polygon simplification is disabled for this project")
+        tolerance = float(project.simplify_tolerance or 0)
+    if tolerance <= 0:
+        raise HTTPException(status_code=400, detail="Tolerance must be positive")
+    
+    totals = crud_annotation.simplify_project(db, project_id=project_id, tolerance=tolerance)
+    original_points = totals["original_points"]
+    return {
+        "message": "Annotations simplified successfully",
+        "tolerance": tolerance,
+        **totals,
+        "reduction_percentage": (
+            round((1 - totals["simplified_points"] / original_points) * 100, 2) if original_points else 0.0
+        ),
+    }
+
+@router.post("/{id}/validate")
+def validate_annotation(
+    *,
+    db: Session = Depends(get_db),
+    id: int,
+    owned: OwnedResource = Depends(ResourceAccess("annotation")),
+) -> Any:
+    """
+    Validate annotation coordinates and geometry.
+    """
     # Validate annotation
     validation_result = crud_annotation.validate_annotation(db, annotation_id=id)
     
@@ -197,17 +220,40 @@ def validate_annotation(
         "warnings": validation_result.get("warnings", [])
     }
 
+@router.post("/project/{project_id}/validate")
+def validate_project_annotations(
+    *,
+    db: Session = Depends(get_db),
+    project_id: int,
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Validate the geometry of every annotation in a project (e.g. before export).
+    
+    Results are stored on each annotation (is_valid, validation_errors);
+    invalid annotations are left out of exports.
+    """
+    # Verify project ownership
+    check_project_access(db, project_id=project_id, user=current_user)
+    
+    totals = annotation_validation.validate_project(db, project_id=project_id)
+    return {"message": "Annotations validated successfully", **totals}
+
 @router.get("/project/{project_id}/export")
 def export_project_annotations(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     project_id: int,
     format: str = "yolo",
     include_images: bool = False,
+    stream: bool = True,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Export all project annotations in specified format.
+
+    By default the ZIP archive is streamed to the client entry by entry.
+    Set `stream=false` to build the whole archive in memory instead.
     """
     # Verify project exists and user has access
     project = crud_project.get(db, id=project_id)
@@ -220,6 +266,31 @@ def export_project_annotations(
     if format not in ["yolo", "coco"]:
         raise HTTPException(status_code=400, detail="Unsupported export format")
     
+    filename = f"{project.name}_{format}_dataset.zip"
+    
+    if stream:
+        project_name = project.name
+        
+        def export_stream():
+            # The request session may be closed before the body is fully sent
+            export_db = ReadSessionLocal()
+            try:
+                yield from stream_project_export(
+                    export_db,
+                    project_id=project_id,
+                    project_name=project_name,
+                    format=format,
+                    include_images=include_images
+                )
+            finally:
+                export_db.close()
+        
+        return StreamingResponse(
+            export_stream(),
+            media_type="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+    
     # Generate export
     export_data = crud_annotation.export_project_annotations(
         db, project_id=project_id, format=format, include_images=include_images
@@ -231,8 +302,8 @@ def export_project_annotations(
         # Add annotation files
         for dataset_type in ["train", "val", "test"]:
             if dataset_type in export_data["annotations"]:
-                for filename, content in export_data["annotations"][dataset_type].items():
-                    zip_file.writestr(f"labels/{dataset_type}/{filename}", content)
+                for label_filename, content in export_data["annotations"][dataset_type].items():
+                    zip_file.writestr(f"labels/{dataset_type}/{label_filename}", content)
         
         # Add classes file
         if format == "yolo":
@@ -254,8 +325,6 @@ def export_project_annotations(
     zip_buffer.seek(0)
     
     # Return ZIP file
-    filename = f"{project.name}_{format}_dataset.zip"
-    
     return Response(
         zip_buffer.getvalue(),
         media_type="application/zip",
@@ -265,7 +334,7 @@ def export_project_annotations(
 @router.get("/project/{project_id}/stats")
 def get_annotation_stats(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     project_id: int,
     current_user: User = Depends(get_current_user),
 ) -> Any:
@@ -273,12 +342,7 @@ def get_annotation_stats(
     Get annotation statistics for a project.
     """
     # Verify project exists and user has access
-    project = crud_project.get(db, id=project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    if project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    check_project_access(db, project_id=project_id, user=current_user)
     
     # Get statistics
     stats = crud_annotation.get_project_annotation_stats(db, project_id=project_id)
@@ -3,6 +3,7 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from ....core import security
 from ....core.config import settings
@@ -13,8 +14,12 @@ from ....schemas.user import User, UserCreate
 
 router = APIRouter()
 
+# /register and /login are async so that bcrypt (security.*_async, run in
+# the password process pool) is awaited without holding a request thread;
+# their queries still run in the threadpool.
+
 @router.post("/register", response_model=User)
-def register(
+async def register(
     *,
     db: Session = Depends(get_db),
     user_in: UserCreate,
@@ -22,34 +27,37 @@ def register(
     """
     Create new user.
     """
-    user = crud_user.get_by_email(db, email=user_in.email)
+    user = await run_in_threadpool(crud_user.get_by_email, db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system."
         )
     
-    user = crud_user.get_by_username(db, username=user_in.username)
+    user = await run_in_threadpool(crud_user.get_by_username, db, username=user_in.username)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this username already exists in the system."
         )
     
-    user = crud_user.create(db, obj_in=user_in)
+    hashed_password = await security.get_password_hash_async(user_in.password)
+    user = await run_in_threadpool(
+        crud_user.create, db, obj_in=user_in, hashed_password=hashed_password
+    )
     return user
 
 @router.post("/login", response_model=LoginResponse)
-def login_for_access_token(
+async def login_for_access_token(
     db: Session = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud_user.authenticate(
-        db, username=form_data.username, password=form_data.password
-    )
+    user = await run_in_threadpool(crud_user.get_by_login, db, login=form_data.username)
+    if user and not await security.verify_password_async(form_data.password, user.hashed_password):
+        user = None
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,7 +80,7 @@ def login_for_access_token(
         "access_token": access_token,
         "refresh_token": refresh_token,
         "token_type": "bearer",
-        "user": user
+        "user": User.from_orm(user).dict()
     }
 
 @router.post("/refresh", response_model=Token)
@@ -1,33 +1,38 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 
-from ....core.deps import get_db, get_current_user
+from ....core.deps import check_project_access, get_db, get_current_user, get_read_db
 from ....crud import class_definition as crud_class, project as crud_project
 from ....models.user import User
 from ....schemas.class_definition import ClassDefinition, ClassDefinitionCreate, ClassDefinitionUpdate
+from ....utils import http_cache
 
 router = APIRouter()
 
 @router.get("/project/{project_id}", response_model=List[ClassDefinition])
 def read_project_classes(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     project_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Retrieve class definitions for a specific project.
+    
+    Revalidates with an ETag; a matching If-None-Match gets 304 before the
+    classes are loaded.
     """
     # Verify project ownership
-    project = crud_project.get(db, id=project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    if project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    check_project_access(db, project_id=project_id, user=current_user)
     
-    classes = crud_class.get_by_project(db, project_id=project_id)
+    version = crud_class.get_project_version(db, project_id=project_id)
+    etag = http_cache.make_etag("project_classes", project_id, version)
+    if http_cache.is_not_modified(request, etag):
+        return http_cache.not_modified(etag)
+    http_cache.set_validators(response, etag)
     
     # Add segmentation counts
     classes_with_counts = crud_class.get_class_with_segmentation_count(db, project_id=project_id)
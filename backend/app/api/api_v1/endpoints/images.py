@@ -1,41 +1,57 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File, Form
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import os
-import uuid
-from PIL import Image as PILImage
 
-from ....core.deps import get_db, get_current_user
+from ....core.deps import (
+    check_project_access, check_project_access_async, get_async_read_db, get_current_user,
+    get_current_user_async, get_db, get_file_image, OwnedResource, ResourceAccess
+)
+from ....core import security
 from ....core.config import settings
-from ....crud import image as crud_image, project as crud_project
+from ....crud import image as crud_image
 from ....models.user import User
 from ....schemas.image import Image, ImageCreate, ImageUpdate, ImageUploadResponse, BatchUploadResponse
+from ....services import content_store, derivatives, image_regions, image_upload
+from ....utils import file_response, http_cache, pagination
 
 router = APIRouter()
 
+DUPLICATE_MESSAGE = "Image already exists in this project"
+
 @router.get("/project/{project_id}", response_model=List[Image])
-def read_project_images(
+async def read_project_images(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     project_id: int,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    current_user: User = Depends(get_current_user_async),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
 ) -> Any:
     """
     Retrieve images for a specific project.
+    
+    Pages are chained with the opaque cursor returned in the `X-Next-Cursor`
+    header (absent on the last page); `skip` is kept for older clients.
+    Runs on the async session, so listings do not occupy the threadpool.
     """
     # Verify project ownership
-    project = crud_project.get(db, id=project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    await check_project_access_async(db, project_id=project_id, user=current_user)
     
-    if project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    try:
+        after_id = pagination.decode_cursor(cursor, (int,))[0] if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    images = crud_image.get_by_project(
-        db, project_id=project_id, skip=skip, limit=limit
+    images = await crud_image.get_by_project_async(
+        db, project_id=project_id, skip=skip, limit=limit, after_id=after_id
     )
+    next_cursor = pagination.next_cursor(images, limit, ("id",))
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
     return images
 
 @router.post("/project/{project_id}/upload", response_model=ImageUploadResponse)
@@ -52,70 +68,25 @@ def upload_image(
     Upload a single image to a project.
     """
     # Verify project ownership
-    project = crud_project.get(db, id=project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    check_project_access(db, project_id=project_id, user=current_user)
     
-    if project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    # Validate file type
-    if not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail="File must be an image")
-    
-    # Check file size
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset to beginning
-    
-    if file_size > settings.MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE} bytes"
-        )
-    
-    # Generate unique filename
-    file_extension = os.path.splitext(file.filename)[1].lower()
-    if file_extension not in settings.ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File type not allowed. Allowed types: {settings.ALLOWED_EXTENSIONS}"
+    # Validate, stream to disk in chunks while hashing, and read dimensions from the header
+    try:
+        received = image_upload.receive_upload(
+            file.file, filename=file.filename, content_type=file.content_type
         )
+    except image_upload.UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(settings.UPLOAD_DIR, str(project_id), unique_filename)
+    # The same bytes already in this project: return the existing image
+    existing = crud_image.get_by_content_hashes(
+        db, project_id=project_id, content_hashes=[received.content_hash]
+    ).get(received.content_hash)
+    if existing:
+        image_upload.discard(received)
+        return _upload_response(existing, message=DUPLICATE_MESSAGE)
     
-    # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
-    
-    # Get image dimensions
-    try:
-        with PILImage.open(file_path) as img:
-            width, height = img.size
-            img_format = img.format.lower()
-    except Exception as e:
-        # Clean up file if image processing fails
-        os.remove(file_path)
-        raise HTTPException(status_code=400, detail="Invalid image file")
-    
-    # Create thumbnail
-    thumbnail_path = None
-    try:
-        thumbnail_filename = f"thumb_{unique_filename}"
-        thumbnail_path = os.path.join(settings.UPLOAD_DIR, str(project_id), "thumbnails", thumbnail_filename)
-        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
-        
-        with PILImage.open(file_path) as img:
-            img.thumbnail(settings.THUMBNAIL_SIZE, PILImage.Resampling.LANCZOS)
-            img.save(thumbnail_path)
-    except Exception:
-        # Thumbnail creation failed, but continue
-        thumbnail_path = None
+    stored = image_upload.store_received(received, project_id=project_id)
     
     # Create database record
     image_in = ImageCreate(
@@ -128,15 +99,109 @@ def upload_image(
         db,
         obj_in=image_in,
         project_id=project_id,
-        filename=unique_filename,
-        file_path=file_path,
-        file_size=file_size,
-        width=width,
-        height=height,
-        format=img_format,
-        thumbnail_path=thumbnail_path
+        filename=stored.filename,
+        file_path=stored.file_path,
+        file_size=stored.file_size,
+        content_hash=stored.content_hash,
+        width=stored.width,
+        height=stored.height,
+        format=stored.format
+    )
+    
+    # Thumbnail and other derivatives are generated in the background
+    derivatives.enqueue([image.id])
+    
+    return _upload_response(image)
+
+@router.post("/project/{project_id}/upload/batch", response_model=BatchUploadResponse)
+def upload_images_batch(
+    *,
+    db: Session = Depends(get_db),
+    project_id: int,
+    current_user: User = Depends(get_current_user),
+    files: List[UploadFile] = File(...),
+    dataset_type: str = Form("train"),
+) -> Any:
+    """
+    Upload many images to a project in one request.
+    
+    Each file is streamed to disk and probed from its header, and all image
+    rows are written with a single bulk insert; thumbnails are generated in
+    the background. Files whose content already exists in the project are
+    not stored again and are reported with the existing image. Files that
+    fail validation are reported in `failed_uploads` without aborting the
+    batch.
+    """
+    # Verify project ownership
+    check_project_access(db, project_id=project_id, user=current_user)
+    
+    if dataset_type not in ["train", "val", "test"]:
+        raise HTTPException(status_code=400, detail="Invalid dataset type")
+    
+    if len(files) > settings.MAX_BATCH_UPLOAD_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files. Maximum per request: {settings.MAX_BATCH_UPLOAD_FILES}"
+        )
+    
+    # Stream every file to disk; rejected files are reported, not fatal
+    received_uploads = []
+    failed_uploads = []
+    for file in files:
+        try:
+            received = image_upload.receive_upload(
+                file.file, filename=file.filename, content_type=file.content_type
+            )
+        except image_upload.UploadError as e:
+            failed_uploads.append({"filename": file.filename, "error": str(e)})
+            continue
+        received_uploads.append((file.filename, received))
+    
+    # Store each distinct content once; duplicates (in the project or the batch) are skipped
+    existing = crud_image.get_by_content_hashes(
+        db, project_id=project_id,
+        content_hashes=list({received.content_hash for _, received in received_uploads})
     )
+    seen_hashes = set(existing)
+    rows = []
+    duplicate_hashes = []
+    for original_filename, received in received_uploads:
+        if received.content_hash in seen_hashes:
+            image_upload.discard(received)
+            duplicate_hashes.append(received.content_hash)
+            continue
+        seen_hashes.add(received.content_hash)
+        stored = image_upload.store_received(received, project_id=project_id)
+        rows.append({
+            "original_filename": original_filename,
+            "dataset_type": dataset_type,
+            "filename": stored.filename,
+            "file_path": stored.file_path,
+            "file_size": stored.file_size,
+            "content_hash": stored.content_hash,
+            "width": stored.width,
+            "height": stored.height,
+            "format": stored.format,
+        })
+    
+    images = crud_image.bulk_create_with_project(db, project_id=project_id, rows=rows)
+    derivatives.enqueue(image.id for image in images)
+    
+    images_by_hash = {**existing, **{image.content_hash: image for image in images}}
+    successful_uploads = [_upload_response(image) for image in images] + [
+        _upload_response(images_by_hash[content_hash], message=DUPLICATE_MESSAGE)
+        for content_hash in duplicate_hashes
+    ]
     
+    return BatchUploadResponse(
+        successful_uploads=successful_uploads,
+        failed_uploads=failed_uploads,
+        total_count=len(files),
+        success_count=len(successful_uploads),
+        error_count=len(failed_uploads)
+    )
+
+def _upload_response(image, message: str = "Image uploaded successfully") -> ImageUploadResponse:
     return ImageUploadResponse(
         id=image.id,
         filename=image.filename,
@@ -145,7 +210,8 @@ def upload_image(
         height=image.height,
         format=image.format,
         file_size=image.file_size,
-        thumbnail_url=f"/uploads/{project_id}/thumbnails/thumb_{unique_filename}" if thumbnail_path else None
+        thumbnail_url=security.image_file_url(image.id, "thumbnail") if image.thumbnail_path else None,
+        message=message
     )
 
 @router.get("/{id}", response_model=Image)
@@ -153,41 +219,91 @@ def read_image(
     *,
     db: Session = Depends(get_db),
     id: int,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    owned: OwnedResource = Depends(ResourceAccess("image")),
 ) -> Any:
     """
     Get image by ID.
-    """
-    image = crud_image.get(db, id=id)
-    if not image:
-        raise HTTPException(status_code=404, detail="Image not found")
-    
-    # Verify project ownership
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    Revalidates with an ETag (from the row's revision and the expiry of the
+    signed file URLs in the body); a matching If-None-Match gets 304
+    without a body.
+    """
+    image = owned.image
+    etag = http_cache.make_etag("image", image.id, image.revision, security.file_token_expiry())
+    if http_cache.is_not_modified(request, etag):
+        return http_cache.not_modified(etag)
+    http_cache.set_validators(response, etag)
     return image
 
+@router.api_route("/{id}/file", methods=["GET", "HEAD"])
+def read_image_file(
+    *,
+    id: int,
+    request: Request,
+    variant: str = "original",
+    owned: OwnedResource = Depends(get_file_image),
+) -> Response:
+    """
+    Image file (or one of its derivatives: thumbnail, preview, resized) for
+    the image's owner, or for anyone holding the signed `token` of the
+    image's URLs (deps.get_file_image). Supports Range / If-Range and
+    conditional requests; see utils.file_response for how the bytes are sent.
+    """
+    image = owned.image
+    if variant == "original":
+        return file_response.serve_file(request, image.file_path, cache_control=http_cache.PRIVATE_IMMUTABLE)
+    if variant not in derivatives.DERIVATIVES:
+        raise HTTPException(status_code=400, detail="Invalid variant")
+    path = derivatives.derivative_path(image.project_id, image.filename, variant)
+    return file_response.serve_file(
+        request, path, cache_control=f"private, max-age={settings.UPLOAD_DERIVATIVE_MAX_AGE}"
+    )
+
+@router.get("/{id}/region")
+def read_image_region(
+    *,
+    id: int,
+    request: Request,
+    x: int = 0,
+    y: int = 0,
+    width: int = Query(..., gt=0),
+    height: int = Query(..., gt=0),
+    max_size: int = Query(1024, gt=0, le=settings.IMAGE_REGION_MAX_SIZE),
+    owned: OwnedResource = Depends(get_file_image),
+) -> Response:
+    """
+    Viewport retrieval: the region (x, y, width, height in original pixels)
+    of an image, scaled so its longer side is at most `max_size`. Regions of
+    an image never change, so responses are cacheable indefinitely.
+    """
+    image = owned.image
+    etag = http_cache.make_etag("image_region", image.id, image.content_hash, x, y, width, height, max_size)
+    if http_cache.is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": http_cache.PRIVATE_IMMUTABLE})
+    try:
+        region = image_regions.render_region(image, (x, y, width, height), max_size=max_size)
+    except image_regions.RegionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(
+        content=region.content,
+        media_type=region.media_type,
+        headers={"ETag": etag, "Cache-Control": http_cache.PRIVATE_IMMUTABLE},
+    )
+
 @router.put("/{id}", response_model=Image)
 def update_image(
     *,
     db: Session = Depends(get_db),
     id: int,
     image_in: ImageUpdate,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ResourceAccess("image")),
 ) -> Any:
     """
     Update an image.
     """
-    image = crud_image.get(db, id=id)
-    if not image:
-        raise HTTPException(status_code=404, detail="Image not found")
-    
-    # Verify project ownership
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    image = owned.image
     
     image = crud_image.update(db, db_obj=image, obj_in=image_in)
     return image
@@ -197,26 +313,23 @@ def delete_image(
     *,
     db: Session = Depends(get_db),
     id: int,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ResourceAccess("image")),
 ) -> Any:
     """
     Delete an image.
     """
-    image = crud_image.get(db, id=id)
-    if not image:
-        raise HTTPException(status_code=404, detail="Image not found")
-    
-    # Verify project ownership
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    image = owned.image
     
     # Delete physical files
     try:
         if os.path.exists(image.file_path):
             os.remove(image.file_path)
-        if image.thumbnail_path and os.path.exists(image.thumbnail_path):
-            os.remove(image.thumbnail_path)
+        for kind in derivatives.DERIVATIVES:
+            derivative_path = derivatives.derivative_path(image.project_id, image.filename, kind)
+            if os.path.exists(derivative_path):
+                os.remove(derivative_path)
+        # Drop stored blobs no other image links to
+        content_store.release(image.content_hash)
     except Exception:
         pass  # Continue even if file deletion fails
     
@@ -230,7 +343,7 @@ def update_image_dataset_type(
     db: Session = Depends(get_db),
     id: int,
     dataset_type: str,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ResourceAccess("image")),
 ) -> Any:
     """
     Update image dataset type (train/val/test).
@@ -238,14 +351,7 @@ def update_image_dataset_type(
     if dataset_type not in ["train", "val", "test"]:
         raise HTTPException(status_code=400, detail="Invalid dataset type")
     
-    image = crud_image.get(db, id=id)
-    if not image:
-        raise HTTPException(status_code=404, detail="Image not found")
-    
-    # Verify project ownership
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    image = owned.image
     
     image_update = ImageUpdate(dataset_type=dataset_type)
     image = crud_image.update(db, db_obj=image, obj_in=image_update)
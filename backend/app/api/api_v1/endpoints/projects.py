@@ -2,7 +2,8 @@ from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from ....core.deps import get_db, get_current_user
+from ....core import ownership_cache
+from ....core.deps import get_db, get_current_user, get_read_db
 from ....crud import project as crud_project
 from ....models.user import User
 from ....schemas.project import Project, ProjectCreate, ProjectUpdate, ProjectStats, ProjectSummary
@@ -11,7 +12,7 @@ router = APIRouter()
 
 @router.get("/", response_model=List[ProjectSummary])
 def read_projects(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     skip: int = 0,
     limit: int = 100,
@@ -23,10 +24,14 @@ def read_projects(
         db, owner_id=current_user.id, skip=skip, limit=limit
     )
     
-    # Add project stats for each project
+    # Fetch stats for all listed projects in one query
+    project_stats = crud_project.get_stats_for_projects(
+        db, project_ids=[project.id for project in projects]
+    )
+    
     project_summaries = []
     for project in projects:
-        stats = crud_project.get_project_stats(db, project_id=project.id)
+        stats = project_stats.get(project.id, {})
         project_summary = ProjectSummary(
             id=project.id,
             name=project.name,
@@ -144,12 +149,13 @@ def delete_project(
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     project = crud_project.remove(db, id=id)
+    ownership_cache.invalidate(current_user.id)
     return {"message": "Project deleted successfully"}
 
 @router.get("/{id}/stats", response_model=ProjectStats)
 def read_project_stats(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     id: int,
     current_user: User = Depends(get_current_user),
 ) -> Any:
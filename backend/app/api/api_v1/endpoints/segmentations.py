@@ -1,38 +1,138 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from datetime import datetime
+from typing import Any, List, Optional, Union
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, UploadFile, File, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import base64
 import json
 
-from ....core.deps import get_db, get_current_user
-from ....crud import segmentation as crud_segmentation, project as crud_project, image as crud_image, class_definition as crud_class
+from ....core.deps import (
+    check_project_access, get_async_read_db, get_current_user, get_current_user_async, get_db, get_owned_image,
+    get_owned_image_async, get_read_db, OwnedResource, ReadResourceAccess, ResourceAccess
+)
+from ....crud import segmentation as crud_segmentation, image as crud_image, class_definition as crud_class
 from ....models.user import User
-from ....schemas.segmentation import Segmentation, SegmentationCreate, SegmentationUpdate, SegmentationWithAnnotations
+from ....schemas.segmentation import (
+    Segmentation, SegmentationCreate, SegmentationMaskPatch, SegmentationSummary, SegmentationUpdate,
+    SegmentationWithAnnotations
+)
+from ....services import annotation_jobs
+from ....utils import http_cache, mask_codec, pagination
 
 router = APIRouter()
 
-@router.get("/image/{image_id}", response_model=List[SegmentationWithAnnotations])
-def read_image_segmentations(
+def _summary(row: tuple) -> SegmentationSummary:
+    """Build a summary from a (segmentation, class_name, class_color, annotation_count) row"""
+    segmentation, class_name, class_color, annotation_count = row
+    return SegmentationSummary.from_orm(segmentation).copy(update={
+        "class_name": class_name,
+        "class_color": class_color,
+        "annotation_count": annotation_count,
+    })
+
+@router.get("/image/{image_id}", response_model=Union[List[SegmentationWithAnnotations], List[SegmentationSummary]])
+async def read_image_segmentations(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     image_id: int,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user_async),
+    summary: bool = False,
 ) -> Any:
     """
     Retrieve all segmentations for a specific image.
+    
+    With `summary=true` masks and annotations are left out; each layer carries
+    its class name/color and annotation count instead. Revalidates with an
+    ETag; a matching If-None-Match gets 304 before the layers are loaded.
     """
-    # Verify image exists and user has access
-    image = crud_image.get(db, id=image_id)
-    if not image:
-        raise HTTPException(status_code=404, detail="Image not found")
+    await get_owned_image_async(db, image_id=image_id, user=current_user)
+    version = await crud_segmentation.get_image_version_async(db, image_id=image_id)
+    etag = http_cache.make_etag("image_segmentations", image_id, summary, version)
+    if http_cache.is_not_modified(request, etag):
+        return http_cache.not_modified(etag)
+    http_cache.set_validators(response, etag)
+    if summary:
+        rows = await crud_segmentation.get_summaries_by_image_async(db, image_id=image_id)
+        return [_summary(row) for row in rows]
+    segmentations = await crud_segmentation.get_by_image_async(db, image_id=image_id)
+    return segmentations
+
+@router.get("/project/{project_id}", response_model=Union[List[Segmentation], List[SegmentationSummary]])
+def read_project_segmentations(
+    *,
+    db: Session = Depends(get_read_db),
+    project_id: int,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    summary: bool = False,
+) -> Any:
+    """
+    Retrieve segmentations for a specific project, newest first.
+    
+    Pages are chained with the opaque cursor returned in the `X-Next-Cursor`
+    header (absent on the last page). With `summary=true` masks are left out.
+    """
+    # Verify project ownership
+    check_project_access(db, project_id=project_id, user=current_user)
     
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    try:
+        after = pagination.decode_cursor(cursor, (datetime, int)) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    segmentations = crud_segmentation.get_by_image(db, image_id=image_id)
+    if summary:
+        segmentations = [
+            _summary(row) for row in crud_segmentation.get_summaries_by_project(
+                db, project_id=project_id, limit=limit, after=after
+            )
+        ]
+    else:
+        segmentations = crud_segmentation.get_by_project(db, project_id=project_id, limit=limit, after=after)
+    next_cursor = pagination.next_cursor(segmentations, limit, ("created_at", "id"))
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
     return segmentations
 
+@router.post("/project/{project_id}/generate-annotations", status_code=202)
+def generate_project_annotations(
+    *,
+    db: Session = Depends(get_db),
+    project_id: int,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Start a background job that converts every unprocessed or stale
+    segmentation mask in a project into annotations. While one is still
+    pending or running for the project, that job is returned instead.
+    """
+    # Verify project ownership
+    check_project_access(db, project_id=project_id, user=current_user)
+    
+    job, created = annotation_jobs.create_job(project_id=project_id, owner_id=current_user.id)
+    if created:
+        background_tasks.add_task(annotation_jobs.run_project_job, job["job_id"])
+    return job
+
+@router.get("/jobs/{job_id}")
+def read_annotation_job(
+    *,
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Get progress of a batch annotation job.
+    """
+    job = annotation_jobs.get_job(job_id)
+    if not job or job["owner_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
 @router.post("/", response_model=Segmentation)
 def create_segmentation(
     *,
@@ -44,13 +144,7 @@ def create_segmentation(
     Create new segmentation.
     """
     # Verify image and class exist and user has access
-    image = crud_image.get(db, id=segmentation_in.image_id)
-    if not image:
-        raise HTTPException(status_code=404, detail="Image not found")
-    
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    image = get_owned_image(db, image_id=segmentation_in.image_id, user=current_user).image
     
     class_def = crud_class.get(db, id=segmentation_in.class_id)
     if not class_def or class_def.project_id != image.project_id:
@@ -67,24 +161,14 @@ def create_segmentation(
 @router.get("/{id}", response_model=SegmentationWithAnnotations)
 def read_segmentation(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     id: int,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ReadResourceAccess("segmentation")),
 ) -> Any:
     """
     Get segmentation by ID.
     """
-    segmentation = crud_segmentation.get(db, id=id)
-    if not segmentation:
-        raise HTTPException(status_code=404, detail="Segmentation not found")
-    
-    # Verify user has access
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    return segmentation
+    return owned.segmentation
 
 @router.put("/{id}", response_model=Segmentation)
 def update_segmentation(
@@ -92,43 +176,47 @@ def update_segmentation(
     db: Session = Depends(get_db),
     id: int,
     segmentation_in: SegmentationUpdate,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ResourceAccess("segmentation")),
 ) -> Any:
     """
     Update a segmentation.
     """
-    segmentation = crud_segmentation.get(db, id=id)
-    if not segmentation:
-        raise HTTPException(status_code=404, detail="Segmentation not found")
-    
-    # Verify user has access
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    segmentation = crud_segmentation.update(db, db_obj=segmentation, obj_in=segmentation_in)
+    segmentation = crud_segmentation.update(db, db_obj=owned.segmentation, obj_in=segmentation_in)
     return segmentation
 
+@router.patch("/{id}/mask", response_model=SegmentationSummary)
+def patch_segmentation_mask(
+    *,
+    db: Session = Depends(get_db),
+    id: int,
+    patch_in: SegmentationMaskPatch,
+    owned: OwnedResource = Depends(ResourceAccess("segmentation")),
+) -> Any:
+    """
+    Merge dirty tiles (or a bbox-cropped sub-mask) into a segmentation mask.
+    
+    Each patch replaces the rectangle it covers, so erased pixels are sent
+    as cleared pixels. bbox and area are updated from the patched region;
+    the response carries them without the full mask.
+    """
+    patches = [
+        (patch.x, patch.y, mask_codec.decode_image_data(patch.mask_data))
+        for patch in patch_in.patches
+    ]
+    segmentation = crud_segmentation.patch_mask(db, db_obj=owned.segmentation, patches=patches)
+    return SegmentationSummary.from_orm(segmentation)
+
 @router.delete("/{id}")
 def delete_segmentation(
     *,
     db: Session = Depends(get_db),
     id: int,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ResourceAccess("segmentation")),
 ) -> Any:
     """
     Delete a segmentation.
     """
-    segmentation = crud_segmentation.get(db, id=id)
-    if not segmentation:
-        raise HTTPException(status_code=404, detail="Segmentation not found")
-    
-    # Verify user has access
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    image = owned.image
     
     # Delete segmentation
     crud_segmentation.remove(db, id=id)
@@ -146,22 +234,12 @@ def toggle_segmentation_visibility(
     db: Session = Depends(get_db),
     id: int,
     is_visible: bool,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ResourceAccess("segmentation")),
 ) -> Any:
     """
     Toggle segmentation visibility.
     """
-    segmentation = crud_segmentation.get(db, id=id)
-    if not segmentation:
-        raise HTTPException(status_code=404, detail="Segmentation not found")
-    
-    # Verify user has access
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    segmentation = crud_segmentation.update_visibility(db, segmentation_id=id, is_visible=is_visible)
+    crud_segmentation.update(db, db_obj=owned.segmentation, obj_in={"is_visible": is_visible})
     return {"message": "Visibility updated successfully", "is_visible": is_visible}
 
 @router.put("/{id}/layer")
@@ -170,22 +248,12 @@ def update_segmentation_layer(
     db: Session = Depends(get_db),
     id: int,
     layer_index: int,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ResourceAccess("segmentation")),
 ) -> Any:
     """
     Update segmentation layer index.
     """
-    segmentation = crud_segmentation.get(db, id=id)
-    if not segmentation:
-        raise HTTPException(status_code=404, detail="Segmentation not found")
-    
-    # Verify user has access
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    segmentation = crud_segmentation.update_layer(db, segmentation_id=id, layer_index=layer_index)
+    crud_segmentation.update_layer_order(db, segmentation_id=id, new_layer_index=layer_index)
     return {"message": "Layer updated successfully", "layer_index": layer_index}
 
 @router.post("/{id}/generate-annotation")
@@ -193,26 +261,43 @@ def generate_annotation_from_segmentation(
     *,
     db: Session = Depends(get_db),
     id: int,
-    current_user: User = Depends(get_current_user),
+    owned: OwnedResource = Depends(ResourceAccess("segmentation")),
 ) -> Any:
     """
     Generate YOLO annotation from segmentation mask data.
     """
-    segmentation = crud_segmentation.get(db, id=id)
-    if not segmentation:
-        raise HTTPException(status_code=404, detail="Segmentation not found")
-    
-    # Verify user has access
-    image = crud_image.get(db, id=segmentation.image_id)
-    project = crud_project.get(db, id=image.project_id)
-    if not project or project.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    # Generate annotation from mask data
-    annotation = crud_segmentation.generate_annotation(db, segmentation_id=id)
+    # Generate annotations from mask data (largest polygon first)
+    annotations = crud_segmentation.generate_annotation(db, segmentation_id=id)
+    if not annotations:
+        raise HTTPException(status_code=400, detail="Segmentation mask contains no polygons")
     
     return {
         "message": "Annotation generated successfully",
-        "annotation_id": annotation.id,
-        "point_count": annotation.point_count
-    }
\ No newline at end of file
+        "annotation_id": annotations[0].id,
+        "point_count": annotations[0].point_count,
+        "annotation_ids": [annotation.id for annotation in annotations]
+    }
+
+@router.get("/{id}/mask")
+def read_segmentation_mask(
+    *,
+    db: Session = Depends(get_read_db),
+    id: int,
+    format: str = "raw",
+    owned: OwnedResource = Depends(ReadResourceAccess("segmentation")),
+) -> Any:
+    """
+    Get segmentation mask as binary data.
+    
+    `raw` returns the stored bit-packed mask cropped to its bounding box
+    (see utils.mask_codec); `png` returns a full-size grayscale PNG.
+    """
+    if format not in ["raw", "png"]:
+        raise HTTPException(status_code=400, detail="Unsupported mask format")
+    
+    segmentation = owned.segmentation
+    
+    if format == "png":
+        return Response(mask_codec.encode_png(segmentation.mask_array), media_type="image/png")
+    
+    return Response(segmentation.mask_blob, media_type="application/octet-stream")
\ No newline at end of file
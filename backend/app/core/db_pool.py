@@ -0,0 +1,176 @@
+"""
+Connection pool configuration and statistics.
+
+`engine_options()` turns the DB_POOL_* settings into create_engine keyword
+arguments. The pool classes it selects record, per engine, how long
+checkouts wait for a connection and a histogram of total checkout latency
+(wait + connect + ping); `pool_status()` reports them together with the
+pool's current occupancy.
+"""
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .config import settings
+
+# Upper bounds (ms) of the checkout latency histogram buckets; the last
+# bucket counts everything slower
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+
+class PoolMetrics:
+    """Checkout counters of one pool; shared across pool re-creation"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.latency_seconds = 0.0
+        self.latency_counts: List[int] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def record_checkout(self, seconds: float) -> None:
+        milliseconds = seconds * 1000
+        bucket = next(
+            (i for i, bound in enumerate(LATENCY_BUCKETS_MS) if milliseconds <= bound),
+            len(LATENCY_BUCKETS_MS)
+        )
+        with self._lock:
+            self.checkouts += 1
+            self.latency_seconds += seconds
+            self.latency_counts[bucket] += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["slower"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds, 6),
+                "wait_seconds_max": round(self.max_wait_seconds, 6),
+                "checkout_latency": {
+                    "count": self.checkouts,
+                    "sum_seconds": round(self.latency_seconds, 6),
+                    "buckets": dict(zip(labels, self.latency_counts)),
+                },
+            }
+
+
+class _InstrumentedPool:
+    """
+    Mixin timing QueuePool checkouts: `_do_get` is the wait for a pooled
+    (or newly opened) connection, `connect` the whole checkout.
+    """
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.metrics.record_wait(time.perf_counter() - start)
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncPool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(*, asynchronous: bool = False) -> dict:
+    """create_engine / create_async_engine pool arguments from settings"""
+    if settings.DB_POOL_PRE_PING not in PRE_PING_STRATEGIES:
+        raise ValueError(
+            f"DB_POOL_PRE_PING must be one of {', '.join(PRE_PING_STRATEGIES)}"
+        )
+    return {
+        "poolclass": InstrumentedAsyncPool if asynchronous else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING == "always",
+    }
+
+
+def configure_engine(engine) -> None:
+    """
+    Install the "idle" pre-ping strategy on a (sync) engine: a connection
+    is pinged on checkout only when it sat in the pool longer than
+    DB_POOL_PING_IDLE seconds, instead of on every checkout.
+    """
+    if settings.DB_POOL_PRE_PING != "idle":
+        return
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < settings.DB_POOL_PING_IDLE:
+            return
+        try:
+            alive = engine.dialect.do_ping(dbapi_connection)
+        except Exception:
+            alive = False
+        if not alive:
+            # The pool discards this connection and retries with a fresh one
+            raise exc.DisconnectionError("Connection was closed while idle in the pool")
+
+
+def pool_status(pool) -> dict:
+    """Current occupancy and checkout statistics of a pool"""
+    status = {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # QueuePool counts overflow from -pool_size; only connections beyond the pool matter here
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+    }
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
+
+
+def engines_status(engines: Dict[str, object]) -> Dict[str, dict]:
+    """pool_status for each named engine"""
+    return {name: pool_status(engine.pool) for name, engine in engines.items()}
@@ -1,43 +1,56 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import AsyncGenerator, Generator, NamedTuple, Optional, Set
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .database import SessionLocal
-from .security import verify_token
-from ..crud import user as crud_user
+from .database import AsyncReadSessionLocal, ReadSessionLocal, SessionLocal
+from . import ownership_cache, user_cache
+from .security import verify_file_token, verify_token
+from ..crud import user as crud_user, project as crud_project, image as crud_image, segmentation as crud_segmentation, annotation as crud_annotation
 from ..models.user import User
+from ..models.project import Project
+from ..models.image import Image
+from ..models.segmentation import Segmentation
+from ..models.annotation import Annotation
 
-# Database dependency
+# Database dependencies
 def get_db() -> Generator:
-    """Get database session"""
+    """Get database session on the primary (reads and writes)"""
     try:
         db = SessionLocal()
         yield db
     finally:
         db.close()
 
+def get_read_db() -> Generator:
+    """Get database session on a read replica, for read-only endpoints"""
+    try:
+        db = ReadSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db() -> AsyncGenerator:
+    """Get async database session on a read replica (for read-only `async def` endpoints)"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
 # Security scheme
 security = HTTPBearer()
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> User:
-    """Get current authenticated user from JWT token"""
-    
-    # Verify token
+def _token_user_id(credentials: HTTPAuthorizationCredentials) -> int:
+    """User id from a JWT bearer token"""
     payload = verify_token(credentials.credentials)
-    user_id: int = payload.get("sub")
-    
-    if user_id is None:
+    try:
+        return int(payload.get("sub"))
+    except (TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    # Get user from database
-    user = crud_user.get_by_id(db, user_id=user_id)
+
+def _check_user(user: Optional[User]) -> User:
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,6 +66,39 @@ def get_current_user(
     
     return user
 
+def get_current_user(
+    db: Session = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
+    """
+    Get current authenticated user from JWT token.
+    
+    Resolved users are cached per token (see core.user_cache), so repeated
+    requests do not query the users table.
+    """
+    user_id = _token_user_id(credentials)
+    user = user_cache.get(user_id, credentials.credentials)
+    if user is not None:
+        return db.merge(user, load=False)
+    
+    user = _check_user(crud_user.get_by_id(db, user_id=user_id))
+    user_cache.put(user, credentials.credentials)
+    return user
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_read_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
+    """get_current_user on the async session, without a threadpool hop"""
+    user_id = _token_user_id(credentials)
+    user = user_cache.get(user_id, credentials.credentials)
+    if user is not None:
+        return await db.merge(user, load=False)
+    
+    user = _check_user(await crud_user.get_by_id_async(db, user_id=user_id))
+    user_cache.put(user, credentials.credentials)
+    return user
+
 def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -86,17 +132,183 @@ def get_current_user_optional(
         return None
     
     try:
-        payload = verify_token(credentials.credentials)
-        user_id: int = payload.get("sub")
+        user_id = _token_user_id(credentials)
         
-        if user_id is None:
-            return None
+        user = user_cache.get(user_id, credentials.credentials)
+        if user is not None:
+            return db.merge(user, load=False)
         
         user = crud_user.get_by_id(db, user_id=user_id)
         if user and user.is_active:
+            user_cache.put(user, credentials.credentials)
             return user
         
     except HTTPException:
         pass
     
-    return None
\ No newline at end of file
+    return None
+
+# Resource ownership
+class OwnedResource(NamedTuple):
+    """A resource and its ancestors, loaded together for authorization"""
+    project: Project
+    image: Optional[Image] = None
+    segmentation: Optional[Segmentation] = None
+    annotation: Optional[Annotation] = None
+
+def _owned_project_ids(db: Session, user: User) -> Set[int]:
+    project_ids = ownership_cache.get_project_ids(user.id)
+    if project_ids is None:
+        project_ids = set(crud_project.get_ids_by_owner(db, owner_id=user.id))
+        ownership_cache.set_project_ids(user.id, project_ids)
+    return project_ids
+
+def _check_project(project: Optional[Project], user: User) -> None:
+    if project is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    if project.owner_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    # Owned but not cached yet (e.g. created by another worker)
+    ownership_cache.add_project(user.id, project.id)
+
+def check_project_access(db: Session, *, project_id: int, user: User) -> None:
+    """
+    Verify that the user owns the project (404 if it does not exist, 403 if
+    it is someone else's). Projects in the user's cached owned project ids
+    need no query; the cache is filled with one query on first use.
+    """
+    if project_id in _owned_project_ids(db, user):
+        return
+    _check_project(crud_project.get(db, id=project_id), user)
+
+async def check_project_access_async(db: AsyncSession, *, project_id: int, user: User) -> None:
+    """check_project_access on an async session"""
+    project_ids = ownership_cache.get_project_ids(user.id)
+    if project_ids is None:
+        project_ids = set(await crud_project.get_ids_by_owner_async(db, owner_id=user.id))
+        ownership_cache.set_project_ids(user.id, project_ids)
+    if project_id in project_ids:
+        return
+    _check_project(await crud_project.get_async(db, id=project_id), user)
+
+def _check_owner(resource: OwnedResource, user: User) -> OwnedResource:
+    if resource.project.owner_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return resource
+
+def get_owned_image(db: Session, *, image_id: int, user: User) -> OwnedResource:
+    """Load an image and its project in one query and verify ownership"""
+    row = crud_image.get_with_project(db, id=image_id)
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    image, project = row
+    return _check_owner(OwnedResource(project=project, image=image), user)
+
+def get_file_image(
+    request: Request,
+    token: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: Optional[User] = Depends(get_current_user_optional),
+) -> OwnedResource:
+    """
+    Image named by the `id` path parameter, for the file routes. A signed
+    `token` query parameter (security.create_file_token, carried by the
+    image URLs in API responses) authorizes on its own, since browsers
+    cannot send the Bearer header for <img>; without one the Bearer user
+    must own the image.
+    """
+    try:
+        image_id = int(request.path_params["id"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    if token is not None:
+        if not verify_file_token(token, image_id):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired file token")
+        row = crud_image.get_with_project(db, id=image_id)
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+        image, project = row
+        return OwnedResource(project=project, image=image)
+    if current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return get_owned_image(db, image_id=image_id, user=current_user)
+
+async def get_owned_image_async(db: AsyncSession, *, image_id: int, user: User) -> OwnedResource:
+    """get_owned_image on an async session"""
+    row = await crud_image.get_with_project_async(db, id=image_id)
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    image, project = row
+    return _check_owner(OwnedResource(project=project, image=image), user)
+
+def get_owned_segmentation(db: Session, *, segmentation_id: int, user: User) -> OwnedResource:
+    """Load a segmentation, its image and project in one query and verify ownership"""
+    row = crud_segmentation.get_with_ancestors(db, id=segmentation_id)
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Segmentation not found")
+    segmentation, image, project = row
+    return _check_owner(OwnedResource(project=project, image=image, segmentation=segmentation), user)
+
+def get_owned_annotation(db: Session, *, annotation_id: int, user: User) -> OwnedResource:
+    """Load an annotation and all its ancestors in one query and verify ownership"""
+    row = crud_annotation.get_with_ancestors(db, id=annotation_id)
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Annotation not found")
+    annotation, segmentation, image, project = row
+    return _check_owner(
+        OwnedResource(project=project, image=image, segmentation=segmentation, annotation=annotation),
+        user
+    )
+
+class ResourceAccess:
+    """
+    Dependency that resolves the resource named by a path parameter and
+    checks that the current user owns its project, in a single DB round trip.
+    
+    Usage: `owned: OwnedResource = Depends(ResourceAccess("segmentation", "segmentation_id"))`
+    """
+    _loaders = {
+        "image": (get_owned_image, "image_id", "Image not found"),
+        "segmentation": (get_owned_segmentation, "segmentation_id", "Segmentation not found"),
+        "annotation": (get_owned_annotation, "annotation_id", "Annotation not found"),
+    }
+    
+    def __init__(self, resource: str, param: str = "id"):
+        if resource not in self._loaders:
+            raise ValueError(f"Unknown resource: {resource}")
+        self.resource = resource
+        self.param = param
+    
+    def __call__(
+        self,
+        request: Request,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user),
+    ) -> OwnedResource:
+        loader, keyword, not_found = self._loaders[self.resource]
+        try:
+            resource_id = int(request.path_params[self.param])
+        except (KeyError, ValueError):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+        return loader(db, **{keyword: resource_id, "user": current_user})
+
+class ReadResourceAccess(ResourceAccess):
+    """ResourceAccess on the read replica session, for read-only endpoints"""
+    
+    def __call__(
+        self,
+        request: Request,
+        db: Session = Depends(get_read_db),
+        current_user: User = Depends(get_current_user),
+    ) -> OwnedResource:
+        return super().__call__(request, db, current_user)
@@ -0,0 +1,116 @@
+"""
+Cache of the project ids each user owns, for authorization checks.
+
+deps.check_project_access answers "does this user own project N" from
+here, so routes on known projects need no project query. Backends:
+
+* "memory": per-process TTL cache; for single-worker deployments.
+* "redis": one Redis set per user shared by all workers (REDIS_URL); needs
+  the `redis` package.
+
+Entries only ever miss projects (a project created by another worker, an
+expired entry), never contain projects the user does not own: creation
+adds to an existing entry, deletion drops the whole entry, and callers
+fall back to the database for ids that are not cached.
+"""
+from typing import Iterable, Optional, Set
+
+from .config import settings
+from ..utils.ttl_cache import TTLCache
+
+BACKENDS = ("memory", "redis")
+
+
+class MemoryBackend:
+    def __init__(self, *, ttl: float, max_size: int = 10000):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    def get(self, user_id: int) -> Optional[Set[int]]:
+        return self._cache.get(user_id)
+
+    def set(self, user_id: int, project_ids: Iterable[int]) -> None:
+        self._cache.set(user_id, frozenset(project_ids))
+
+    def add(self, user_id: int, project_id: int) -> None:
+        project_ids = self._cache.get(user_id)
+        if project_ids is not None:
+            self._cache.set(user_id, project_ids | {project_id})
+
+    def invalidate(self, user_id: int) -> None:
+        self._cache.delete(user_id)
+
+
+class RedisBackend:
+    # An empty set cannot be stored in Redis, so every entry carries a marker
+    _MARKER = "-"
+    # Add to an existing entry only; a partial entry would hide other projects
+    _ADD_IF_CACHED = (
+        "if redis.call('exists', KEYS[1]) == 1 then return redis.call('sadd', KEYS[1], ARGV[1]) end return 0"
+    )
+
+    def __init__(self, url: str, *, ttl: float):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('OWNERSHIP_CACHE_BACKEND "redis" requires the redis package')
+        self._redis = redis.Redis.from_url(url)
+        self._ttl = max(1, int(ttl))
+        self._add_if_cached = self._redis.register_script(self._ADD_IF_CACHED)
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"owned_projects:{user_id}"
+
+    def get(self, user_id: int) -> Optional[Set[int]]:
+        members = self._redis.smembers(self._key(user_id))
+        if not members:
+            return None
+        return {int(member) for member in members if member != self._MARKER.encode()}
+
+    def set(self, user_id: int, project_ids: Iterable[int]) -> None:
+        key = self._key(user_id)
+        pipeline = self._redis.pipeline()
+        pipeline.delete(key)
+        pipeline.sadd(key, self._MARKER, *project_ids)
+        pipeline.expire(key, self._ttl)
+        pipeline.execute()
+
+    def add(self, user_id: int, project_id: int) -> None:
+        self._add_if_cached(keys=[self._key(user_id)], args=[project_id])
+
+    def invalidate(self, user_id: int) -> None:
+        self._redis.delete(self._key(user_id))
+
+
+_backend = None
+
+
+def get_backend():
+    """The configured backend, created on first use"""
+    global _backend
+    if _backend is None:
+        if settings.OWNERSHIP_CACHE_BACKEND not in BACKENDS:
+            raise ValueError(f"OWNERSHIP_CACHE_BACKEND must be one of {', '.join(BACKENDS)}")
+        if settings.OWNERSHIP_CACHE_BACKEND == "redis":
+            _backend = RedisBackend(settings.REDIS_URL, ttl=settings.OWNERSHIP_CACHE_TTL)
+        else:
+            _backend = MemoryBackend(ttl=settings.OWNERSHIP_CACHE_TTL)
+    return _backend
+
+
+def get_project_ids(user_id: int) -> Optional[Set[int]]:
+    """Cached ids of the user's projects, or None when not cached"""
+    return get_backend().get(user_id)
+
+
+def set_project_ids(user_id: int, project_ids: Iterable[int]) -> None:
+    get_backend().set(user_id, project_ids)
+
+
+def add_project(user_id: int, project_id: int) -> None:
+    """Record a new project of the user, if the user's entry is cached"""
+    get_backend().add(user_id, project_id)
+
+
+def invalidate(user_id: int) -> None:
+    get_backend().invalidate(user_id)
@@ -1,21 +1,100 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Union
+from urllib.parse import urlencode
+from anyio import to_thread
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from .config import settings
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; existing hashes keep verifying at the cost they were made with
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain password against a hashed password"""
+# bcrypt runs in a small dedicated process pool, so a burst of logins neither
+# takes CPU from the request threads' interpreter nor queues without bound
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(settings.PASSWORD_HASH_MAX_PENDING)
+
+def _init_worker() -> None:
+    # Interactive requests win over password work when CPUs are contended
+    os.nice(settings.PASSWORD_HASH_NICENESS)
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _executor
+
+def shutdown_executor() -> None:
+    """Stop the password process pool (called on application shutdown)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def _submit(fn, *args) -> Future:
+    """
+    Queue password work on the pool; 503 when PASSWORD_HASH_MAX_PENDING
+    operations are already waiting, rather than letting a login storm
+    build an unbounded backlog.
+    """
+    if not _pending.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in requests, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        future = _get_executor().submit(fn, *args)
+    except BaseException:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda _: _pending.release())
+    return future
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    """Hash a password"""
+def _hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a plain password against a hashed password (blocks until the pool answers)"""
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return _verify(plain_password, hashed_password)
+    return _submit(_verify, plain_password, hashed_password).result()
+
+def get_password_hash(password: str) -> str:
+    """Hash a password (blocks until the pool answers)"""
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return _hash(password)
+    return _submit(_hash, password).result()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password for `async def` endpoints, holding neither the event loop nor a request thread"""
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return await to_thread.run_sync(_verify, plain_password, hashed_password)
+    return await asyncio.wrap_future(_submit(_verify, plain_password, hashed_password))
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash for `async def` endpoints"""
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return await to_thread.run_sync(_hash, password)
+    return await asyncio.wrap_future(_submit(_hash, password))
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -41,6 +120,38 @@ def verify_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def create_file_token(image_id: int) -> str:
+    """
+    Token granting read access to one image's files, for URLs the browser
+    fetches without an Authorization header (<img>); issue it only to the
+    image's owner. The expiry is rounded up to FILE_TOKEN_TTL windows, so an
+    image's URLs stay identical (and cacheable) within a window and remain
+    valid for FILE_TOKEN_TTL to 2 x FILE_TOKEN_TTL seconds.
+    """
+    return jwt.encode(
+        {"type": "file", "img": image_id, "exp": file_token_expiry()}, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    )
+
+def file_token_expiry() -> int:
+    """Expiry (epoch seconds) of the file tokens issued now"""
+    window = settings.FILE_TOKEN_TTL
+    return (int(time.time()) // window + 2) * window
+
+def image_file_url(image_id: int, variant: str = "original") -> str:
+    """Signed URL of an image file or derivative (GET /images/{id}/file)"""
+    query = {"token": create_file_token(image_id)}
+    if variant != "original":
+        query = {"variant": variant, **query}
+    return f"/api/v1/images/{image_id}/file?{urlencode(query)}"
+
+def verify_file_token(token: str, image_id: int) -> bool:
+    """Whether `token` is an unexpired file token for the image"""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return False
+    return payload.get("type") == "file" and payload.get("img") == image_id
+
 def create_refresh_token(data: dict) -> str:
     """Create a refresh token with longer expiration"""
     to_encode = data.copy()
@@ -0,0 +1,44 @@
+"""
+Cache of resolved users for the authentication dependencies.
+
+Entries are keyed by (user id, token) and hold the user's column values,
+so a cached principal is rebuilt per request into that request's session
+(`Session.merge(load=False)`) without a query and is never shared between
+sessions. crud.user drops a user's entries whenever it changes the user;
+other worker processes see the change once their entries expire after
+USER_CACHE_TTL seconds.
+"""
+from typing import Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from .config import settings
+from ..models.user import User
+from ..utils.ttl_cache import TTLCache
+
+_cache = TTLCache(max_size=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+_COLUMNS = tuple(inspect(User).column_attrs.keys())
+
+
+def get(user_id: int, token: str) -> Optional[User]:
+    """Detached copy of the cached user, or None; merge it into a session before use"""
+    values = _cache.get((user_id, token))
+    if values is None:
+        return None
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+def put(user: User, token: str) -> None:
+    _cache.set((user.id, token), {column: getattr(user, column) for column in _COLUMNS})
+
+
+def invalidate(user_id: int) -> None:
+    """Drop every cached principal of a user (all tokens)"""
+    _cache.delete_where(lambda key: key[0] == user_id)
+
+
+def clear() -> None:
+    _cache.clear()
@@ -1,5 +1,6 @@
 from .user import user
 from .project import project
+from .project_stats import project_stats
 from .image import image
 from .class_definition import class_definition
 from .segmentation import segmentation
@@ -8,6 +9,7 @@ from .annotation import annotation
 __all__ = [
     "user",
     "project", 
+    "project_stats",
     "image",
     "class_definition",
     "segmentation",
@@ -1,18 +1,46 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from sqlalchemy.orm import Session, defer, load_only
+from sqlalchemy import and_, case, func
 from ..crud.base import CRUDBase
 from ..models.annotation import Annotation
+from ..utils import pagination, polygon_codec
 from ..schemas.annotation import AnnotationCreate, AnnotationUpdate
 
+# Columns read for summary listings; the coordinate arrays are never fetched
+SUMMARY_COLUMNS = (
+    Annotation.id, Annotation.segmentation_id, Annotation.point_count, Annotation.is_simplified,
+    Annotation.simplification_tolerance, Annotation.polygon_area, Annotation.perimeter,
+    Annotation.compactness, Annotation.is_valid, Annotation.is_exported,
+    Annotation.created_at, Annotation.updated_at,
+)
+
 class CRUDAnnotation(CRUDBase[Annotation, AnnotationCreate, AnnotationUpdate]):
+    def get_with_ancestors(self, db: Session, *, id: int) -> Optional[tuple]:
+        """Get (annotation, segmentation, image, project) for an annotation in one joined query"""
+        from ..models.segmentation import Segmentation
+        from ..models.image import Image
+        from ..models.project import Project
+        
+        return (
+            db.query(Annotation, Segmentation, Image, Project)
+            .join(Segmentation, Segmentation.id == Annotation.segmentation_id)
+            .join(Image, Image.id == Segmentation.image_id)
+            .join(Project, Project.id == Image.project_id)
+            .options(defer(Segmentation.mask_blob))
+            .filter(Annotation.id == id)
+            .first()
+        )
+
     def get_by_segmentation(
-        self, db: Session, *, segmentation_id: int
+        self, db: Session, *, segmentation_id: int, summary: bool = False
     ) -> List[Annotation]:
-        """Get annotations by segmentation ID"""
+        """Get annotations by segmentation ID (only SUMMARY_COLUMNS loaded with `summary`)"""
+        query = db.query(self.model)
+        if summary:
+            query = query.options(load_only(*SUMMARY_COLUMNS))
         return (
-            db.query(self.model)
-            .filter(Annotation.segmentation_id == segmentation_id)
+            query.filter(Annotation.segmentation_id == segmentation_id)
             .order_by(Annotation.created_at)
             .all()
         )
@@ -32,22 +60,35 @@ class CRUDAnnotation(CRUDBase[Annotation, AnnotationCreate, AnnotationUpdate]):
         )
 
     def get_by_project(
-        self, db: Session, *, project_id: int, skip: int = 0, limit: int = 100
+        self, db: Session, *, project_id: int, skip: int = 0, limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None, summary: bool = False
     ) -> List[Annotation]:
-        """Get annotations by project ID"""
+        """
+        Get annotations by project ID, newest first.
+        
+        Pass the (created_at, id) of the last row of the previous page as
+        `after` for keyset pagination; `skip` is only used without it. With
+        `summary` only SUMMARY_COLUMNS are loaded.
+        """
         from ..models.segmentation import Segmentation
         from ..models.image import Image
         
-        return (
-            db.query(self.model)
-            .join(Segmentation)
+        query = db.query(self.model)
+        if summary:
+            query = query.options(load_only(*SUMMARY_COLUMNS))
+        query = (
+            query.join(Segmentation)
             .join(Image)
             .filter(Image.project_id == project_id)
-            .order_by(Annotation.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+            .order_by(Annotation.created_at.desc(), Annotation.id.desc())
         )
+        if after is not None:
+            query = query.filter(
+                pagination.after((Annotation.created_at, Annotation.id), after, descending=True)
+            )
+        else:
+            query = query.offset(skip)
+        return query.limit(limit).all()
 
     def get_valid_annotations(
         self, db: Session, *, project_id: int
@@ -90,34 +131,107 @@ class CRUDAnnotation(CRUDBase[Annotation, AnnotationCreate, AnnotationUpdate]):
             .all()
         )
 
+    def iter_export_rows(
+        self, db: Session, *, project_id: int, batch_size: int = 1000
+    ) -> Iterator[tuple]:
+        """Stream valid annotation rows for export, ordered by image, using a server-side cursor"""
+        from ..models.segmentation import Segmentation
+        from ..models.image import Image
+        from ..models.class_definition import ClassDefinition
+
+        query = (
+            db.query(
+                Image.id.label("image_id"),
+                Image.filename,
+                Image.dataset_type,
+                Image.width,
+                Image.height,
+                ClassDefinition.class_index,
+                Annotation.id.label("annotation_id"),
+                Annotation.normalized_blob,
+            )
+            .select_from(Annotation)
+            .join(Segmentation, Segmentation.id == Annotation.segmentation_id)
+            .join(Image, Image.id == Segmentation.image_id)
+            .join(ClassDefinition, ClassDefinition.id == Segmentation.class_id)
+            .filter(
+                and_(
+                    Image.project_id == project_id,
+                    Annotation.is_valid == True
+                )
+            )
+            .order_by(Image.id, Segmentation.layer_index, Annotation.id)
+            .execution_options(stream_results=True)
+            .yield_per(batch_size)
+        )
+        return iter(query)
+
     def create_from_segmentation(
         self, db: Session, *, segmentation_id: int, normalized_coordinates: str, 
         original_coordinates: str = None, **kwargs
     ) -> Annotation:
-        """Create annotation from segmentation data"""
-        import json
-        
-        # Parse coordinates to get point count
-        try:
-            coords = json.loads(normalized_coordinates)
-            point_count = len(coords) // 2  # x,y pairs
-        except:
-            point_count = 0
-        
-        annotation_data = {
-            "segmentation_id": segmentation_id,
-            "normalized_coordinates": normalized_coordinates,
-            "original_coordinates": original_coordinates,
-            "point_count": point_count,
-            **kwargs
-        }
-        
-        db_obj = self.model(**annotation_data)
+        """Create annotation from segmentation data (coordinates as JSON text or arrays)"""
+        db_obj = self.model(segmentation_id=segmentation_id, **kwargs)
+        db_obj.normalized_coordinates = normalized_coordinates
+        db_obj.original_coordinates = original_coordinates
+        db_obj.point_count = polygon_codec.point_count(db_obj.normalized_blob)
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
         return db_obj
 
+    def update(
+        self, db: Session, *, db_obj: Annotation,
+        obj_in: Union[AnnotationUpdate, Dict[str, Any]]
+    ) -> Annotation:
+        """
+        Update annotation, re-packing coordinates given as JSON text or arrays.
+        
+        New normalized coordinates without original ones re-derive the stored
+        pixel polygon from the image size, so the two never disagree. Both
+        lists must have the same number of points (ValueError otherwise).
+        """
+        if isinstance(obj_in, dict):
+            update_data = dict(obj_in)
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        
+        normalized = update_data.pop("normalized_coordinates", None)
+        normalized_blob = (
+            polygon_codec.encode_coordinates(normalized) if normalized is not None else db_obj.normalized_blob
+        )
+        if "original_coordinates" in update_data:
+            original = update_data.pop("original_coordinates")
+            original_blob = None if original is None else polygon_codec.encode_coordinates(original)
+        elif normalized is not None and db_obj.original_blob is not None:
+            original_blob = polygon_codec.encode_coordinates(
+                polygon_codec.decode_points(normalized_blob) * self._image_size(db, db_obj)
+            )
+        else:
+            original_blob = db_obj.original_blob
+        if original_blob is not None and (
+            polygon_codec.point_count(original_blob) != polygon_codec.point_count(normalized_blob)
+        ):
+            raise ValueError("normalized_coordinates and original_coordinates must have the same number of points")
+        
+        db_obj.normalized_blob = normalized_blob
+        db_obj.original_blob = original_blob
+        if normalized is not None:
+            update_data["point_count"] = polygon_codec.point_count(normalized_blob)
+        return super().update(db, db_obj=db_obj, obj_in=update_data)
+
+    def _image_size(self, db: Session, db_obj: Annotation) -> Tuple[int, int]:
+        """(width, height) of the image an annotation belongs to"""
+        from ..models.segmentation import Segmentation
+        from ..models.image import Image
+        
+        return tuple(
+            db.query(Image.width, Image.height)
+            .join(Segmentation, Segmentation.image_id == Image.id)
+            .filter(Segmentation.id == db_obj.segmentation_id)
+            .one()
+        )
+
     def update_validation_status(
         self, db: Session, *, annotation_id: int, is_valid: bool, 
         validation_errors: str = None
@@ -132,6 +246,49 @@ class CRUDAnnotation(CRUDBase[Annotation, AnnotationCreate, AnnotationUpdate]):
             db.refresh(db_obj)
         return db_obj
 
+    def validate_annotation(self, db: Session, *, annotation_id: int) -> Optional[dict]:
+        """Check an annotation's geometry and store the outcome; returns errors and warnings"""
+        from ..core.config import settings
+        from ..services.annotation_validation import validation_values
+        from ..utils.polygon_validation import validate_polygon
+        
+        db_obj = self.get(db, id=annotation_id)
+        if not db_obj:
+            return None
+        try:
+            errors, warnings = validate_polygon(
+                db_obj.normalized_array,
+                min_points=settings.MIN_POLYGON_POINTS,
+                max_points=settings.MAX_POLYGON_POINTS,
+            )
+        except ValueError as exc:
+            errors, warnings = [str(exc)], []
+        self.update_validation_status(db, annotation_id=annotation_id, **validation_values(errors))
+        return {"is_valid": not errors, "errors": errors, "warnings": warnings}
+
+    def get_validation_inputs(
+        self, db: Session, *, project_id: int, after_id: int = 0, limit: int = 1000
+    ) -> List[tuple]:
+        """Get (id, normalized_blob) rows of a project's annotations, by id after `after_id`"""
+        from ..models.segmentation import Segmentation
+        from ..models.image import Image
+        
+        return (
+            db.query(Annotation.id, Annotation.normalized_blob)
+            .join(Segmentation, Segmentation.id == Annotation.segmentation_id)
+            .join(Image, Image.id == Segmentation.image_id)
+            .filter(Image.project_id == project_id, Annotation.id > after_id)
+            .order_by(Annotation.id)
+            .limit(limit)
+            .all()
+        )
+
+    def bulk_update_validation(self, db: Session, *, mappings: List[dict]) -> None:
+        """Write is_valid/validation_errors for many annotations with one bulk UPDATE"""
+        if mappings:
+            db.bulk_update_mappings(Annotation, mappings)
+            db.commit()
+
     def mark_as_exported(
         self, db: Session, *, annotation_id: int, export_format: str
     ) -> Optional[Annotation]:
@@ -195,6 +352,68 @@ class CRUDAnnotation(CRUDBase[Annotation, AnnotationCreate, AnnotationUpdate]):
             db.refresh(db_obj)
         return db_obj
 
+    def simplify_coordinates(
+        self, db: Session, *, annotation_id: int, tolerance: float
+    ) -> Optional[Annotation]:
+        """Simplify one annotation with Douglas-Peucker (`tolerance` in image pixels)"""
+        from ..services.annotation_simplification import simplify_annotations
+        
+        rows = self._simplification_inputs(db).filter(Annotation.id == annotation_id).all()
+        if not rows:
+            return None
+        db.bulk_update_mappings(Annotation, simplify_annotations(rows, tolerance=tolerance))
+        db.commit()
+        return self.get(db, id=annotation_id)
+
+    def simplify_project(
+        self, db: Session, *, project_id: int, tolerance: float, batch_size: int = 1000
+    ) -> dict:
+        """
+        Simplify every annotation of a project, one batch of annotations at a time.
+
+        Each batch is read in one query, simplified in one vectorized pass and
+        written back with one bulk UPDATE. Returns annotation and point totals.
+        """
+        from ..models.image import Image
+        from ..services.annotation_simplification import simplify_annotations
+        
+        totals = {"annotations": 0, "original_points": 0, "simplified_points": 0}
+        last_id = 0
+        while True:
+            rows = (
+                self._simplification_inputs(db, with_point_count=True)
+                .filter(Image.project_id == project_id, Annotation.id > last_id)
+                .order_by(Annotation.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                return totals
+            mappings = simplify_annotations([row[:5] for row in rows], tolerance=tolerance)
+            db.bulk_update_mappings(Annotation, mappings)
+            db.commit()
+            totals["annotations"] += len(rows)
+            totals["original_points"] += sum(row.point_count for row in rows)
+            totals["simplified_points"] += sum(mapping["point_count"] for mapping in mappings)
+            last_id = rows[-1].id
+
+    def _simplification_inputs(self, db: Session, *, with_point_count: bool = False):
+        """(id, normalized_blob, original_blob, image width, image height[, point_count]) rows"""
+        from ..models.segmentation import Segmentation
+        from ..models.image import Image
+        
+        columns = [
+            Annotation.id, Annotation.normalized_blob, Annotation.original_blob,
+            Image.width, Image.height,
+        ]
+        if with_point_count:
+            columns.append(Annotation.point_count)
+        return (
+            db.query(*columns)
+            .join(Segmentation, Segmentation.id == Annotation.segmentation_id)
+            .join(Image, Image.id == Segmentation.image_id)
+        )
+
     def get_annotations_by_class(
         self, db: Session, *, project_id: int, class_id: int
     ) -> List[Annotation]:
@@ -215,4 +434,98 @@ class CRUDAnnotation(CRUDBase[Annotation, AnnotationCreate, AnnotationUpdate]):
             .all()
         )
 
+    def export_project_annotations(
+        self, db: Session, *, project_id: int, format: str = "yolo", include_images: bool = False
+    ) -> dict:
+        """Build YOLO labels or a COCO document for a project from one joined query"""
+        from ..models.project import Project
+        from ..crud.image import image as crud_image
+        from ..services.dataset_export import build_export_data, get_export_classes
+
+        project_name = db.query(Project.name).filter(Project.id == project_id).scalar()
+        classes = get_export_classes(db, project_id=project_id)
+        rows = self.iter_export_rows(db, project_id=project_id)
+
+        # Rows are materialized before the image query runs on the same connection
+        if format == "coco" or include_images:
+            rows = list(rows)
+            images = crud_image.iter_by_project(db, project_id=project_id)
+        else:
+            images = None
+
+        return build_export_data(
+            rows,
+            images,
+            project_name=project_name,
+            format=format,
+            classes=classes,
+            include_images=include_images,
+        )
+
+    def get_project_annotation_stats(self, db: Session, *, project_id: int) -> dict:
+        """Get annotation statistics for a project using aggregate queries"""
+        from ..models.segmentation import Segmentation
+        from ..models.image import Image
+        from ..models.class_definition import ClassDefinition
+
+        totals = (
+            db.query(
+                func.count(Annotation.id),
+                func.coalesce(func.sum(case((Annotation.is_valid == True, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Annotation.is_simplified == True, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Annotation.is_exported == True, 1), else_=0)), 0),
+                func.coalesce(func.sum(Annotation.point_count), 0),
+                func.count(func.distinct(Segmentation.image_id)),
+            )
+            .select_from(Annotation)
+            .join(Segmentation, Segmentation.id == Annotation.segmentation_id)
+            .join(Image, Image.id == Segmentation.image_id)
+            .filter(Image.project_id == project_id)
+            .one()
+        )
+        total, valid, simplified, exported, total_points, annotated_images = (int(v or 0) for v in totals)
+
+        by_class = (
+            db.query(
+                ClassDefinition.id,
+                ClassDefinition.name,
+                ClassDefinition.class_index,
+                func.count(Annotation.id),
+            )
+            .select_from(Annotation)
+            .join(Segmentation, Segmentation.id == Annotation.segmentation_id)
+            .join(Image, Image.id == Segmentation.image_id)
+            .join(ClassDefinition, ClassDefinition.id == Segmentation.class_id)
+            .filter(Image.project_id == project_id)
+            .group_by(ClassDefinition.id, ClassDefinition.name, ClassDefinition.class_index)
+            .order_by(ClassDefinition.class_index)
+            .all()
+        )
+
+        by_dataset_type = (
+            db.query(Image.dataset_type, func.count(Annotation.id))
+            .select_from(Annotation)
+            .join(Segmentation, Segmentation.id == Annotation.segmentation_id)
+            .join(Image, Image.id == Segmentation.image_id)
+            .filter(Image.project_id == project_id)
+            .group_by(Image.dataset_type)
+            .all()
+        )
+
+        return {
+            "total_annotations": total,
+            "valid_annotations": valid,
+            "invalid_annotations": total - valid,
+            "simplified_annotations": simplified,
+            "exported_annotations": exported,
+            "annotated_images": annotated_images,
+            "total_points": total_points,
+            "avg_points_per_annotation": total_points / total if total > 0 else 0,
+            "by_class": [
+                {"class_id": class_id, "name": name, "class_index": class_index, "count": count}
+                for class_id, name, class_index, count in by_class
+            ],
+            "by_dataset_type": {dataset_type: count for dataset_type, count in by_dataset_type},
+        }
+
 annotation = CRUDAnnotation(Annotation)
\ No newline at end of file
@@ -1,6 +1,8 @@
 from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import func, inspect, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..models.base import BaseModel as DBBaseModel
 
@@ -8,6 +10,15 @@ ModelType = TypeVar("ModelType", bound=DBBaseModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+def version_select(model: Type[DBBaseModel], part: int):
+    """
+    (part, row count, id sum, revision sum) of the `model` rows the caller
+    filters (`model` has models.base.RevisionMixin); inserting, deleting or
+    updating any of them changes the row. CRUDBase._version combines
+    several into the version of a response, for ETags.
+    """
+    return select(literal(part), func.count(model.id), func.sum(model.id), func.sum(model.revision))
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -29,6 +40,28 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """Get multiple records"""
         return db.query(self.model).offset(skip).limit(limit).all()
 
+    async def get_async(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        """Get single record by ID on an async session"""
+        result = await db.execute(select(self.model).where(self.model.id == id))
+        return result.scalars().first()
+
+    async def get_multi_async(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        """Get multiple records on an async session"""
+        result = await db.execute(select(self.model).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    @staticmethod
+    def _version(db: Session, *selects) -> tuple:
+        """Version rows of version_select statements, in one query"""
+        return tuple(sorted(tuple(row) for row in db.execute(union_all(*selects)).all()))
+
+    @staticmethod
+    async def _version_async(db: AsyncSession, *selects) -> tuple:
+        """_version on an async session"""
+        return tuple(sorted(tuple(row) for row in (await db.execute(union_all(*selects))).all()))
+
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         """Create new record"""
         obj_in_data = jsonable_encoder(obj_in)
@@ -46,7 +79,8 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
         """Update existing record"""
-        obj_data = jsonable_encoder(db_obj)
+        # Column names straight from the mapper; avoids JSON-encoding binary columns
+        obj_data = inspect(self.model).column_attrs.keys()
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
@@ -1,8 +1,10 @@
 from typing import List, Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
-from ..crud.base import CRUDBase
+from ..crud.base import CRUDBase, version_select
+from ..crud.project_stats import project_stats as crud_project_stats
 from ..models.class_definition import ClassDefinition
 from ..schemas.class_definition import ClassDefinitionCreate, ClassDefinitionUpdate
 
@@ -59,6 +61,7 @@ class CRUDClassDefinition(CRUDBase[ClassDefinition, ClassDefinitionCreate, Class
         
         try:
             db.add(db_obj)
+            crud_project_stats.increment(db, project_id=project_id, class_count=1)
             db.commit()
             db.refresh(db_obj)
             return db_obj
@@ -66,6 +69,19 @@ class CRUDClassDefinition(CRUDBase[ClassDefinition, ClassDefinitionCreate, Class
             db.rollback()
             raise HTTPException(status_code=400, detail="Class name or index already exists")
 
+    def remove(self, db: Session, *, id: int) -> ClassDefinition:
+        """Delete class definition (and its segmentations), updating the project counters"""
+        from ..models.segmentation import Segmentation
+        
+        db_obj = db.query(self.model).get(id)
+        segmentation_count = db.query(Segmentation.id).filter(Segmentation.class_id == id).count()
+        db.delete(db_obj)
+        crud_project_stats.increment(
+            db, project_id=db_obj.project_id, class_count=-1, segmentation_count=-segmentation_count
+        )
+        db.commit()
+        return db_obj
+
     def get_next_class_index(self, db: Session, *, project_id: int) -> int:
         """Get the next available class index for a project"""
         max_index = (
@@ -109,6 +125,19 @@ class CRUDClassDefinition(CRUDBase[ClassDefinition, ClassDefinitionCreate, Class
         
         return updated_classes
 
+    def get_project_version(self, db: Session, *, project_id: int) -> tuple:
+        """Version of get_class_with_segmentation_count's result (see crud.base.version_select)"""
+        from ..models.segmentation import Segmentation
+        
+        return self._version(
+            db,
+            version_select(ClassDefinition, 0).where(ClassDefinition.project_id == project_id),
+            version_select(Segmentation, 1)
+            .select_from(Segmentation)
+            .join(ClassDefinition, ClassDefinition.id == Segmentation.class_id)
+            .where(ClassDefinition.project_id == project_id),
+        )
+
     def get_class_with_segmentation_count(
         self, db: Session, *, project_id: int
     ) -> List[dict]:
@@ -118,7 +147,7 @@ class CRUDClassDefinition(CRUDBase[ClassDefinition, ClassDefinitionCreate, Class
         result = (
             db.query(
                 ClassDefinition,
-                db.func.count(Segmentation.id).label("segmentation_count")
+                func.count(Segmentation.id).label("segmentation_count")
             )
             .outerjoin(Segmentation)
             .filter(ClassDefinition.project_id == project_id)
@@ -1,19 +1,77 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Union
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..crud.base import CRUDBase
+from ..crud.project_stats import image_deltas, merge_deltas, project_stats as crud_project_stats
 from ..models.image import Image
 from ..schemas.image import ImageCreate, ImageUpdate
 
 class CRUDImage(CRUDBase[Image, ImageCreate, ImageUpdate]):
-    def get_by_project(self, db: Session, *, project_id: int, skip: int = 0, limit: int = 100) -> List[Image]:
-        """Get images by project ID"""
+    def get_with_project(self, db: Session, *, id: int) -> Optional[tuple]:
+        """Get (image, project) for an image in one joined query"""
+        return db.execute(self._with_project_statement(id)).first()
+
+    async def get_with_project_async(self, db: AsyncSession, *, id: int) -> Optional[tuple]:
+        """get_with_project on an async session"""
+        return (await db.execute(self._with_project_statement(id))).first()
+
+    def _with_project_statement(self, id: int):
+        from ..models.project import Project
+        
         return (
-            db.query(self.model)
+            select(Image, Project)
+            .join(Project, Project.id == Image.project_id)
+            .where(Image.id == id)
+        )
+
+    def get_by_project(
+        self, db: Session, *, project_id: int, skip: int = 0, limit: int = 100,
+        after_id: Optional[int] = None
+    ) -> List[Image]:
+        """
+        Get images by project ID in id order.
+        
+        Pass the last id of the previous page as `after_id` for keyset
+        pagination on (project_id, id); `skip` is only used without it.
+        """
+        statement = self._by_project_statement(project_id, skip, limit, after_id)
+        return db.execute(statement).scalars().all()
+
+    async def get_by_project_async(
+        self, db: AsyncSession, *, project_id: int, skip: int = 0, limit: int = 100,
+        after_id: Optional[int] = None
+    ) -> List[Image]:
+        """get_by_project on an async session"""
+        statement = self._by_project_statement(project_id, skip, limit, after_id)
+        return (await db.execute(statement)).scalars().all()
+
+    def _by_project_statement(self, project_id: int, skip: int, limit: int, after_id: Optional[int]):
+        statement = select(Image).where(Image.project_id == project_id).order_by(Image.id)
+        if after_id is not None:
+            statement = statement.where(Image.id > after_id)
+        else:
+            statement = statement.offset(skip)
+        return statement.limit(limit)
+
+    def iter_by_project(self, db: Session, *, project_id: int, batch_size: int = 1000) -> Iterator[tuple]:
+        """Stream lightweight image rows for a project using a server-side cursor"""
+        query = (
+            db.query(
+                Image.id,
+                Image.filename,
+                Image.file_path,
+                Image.dataset_type,
+                Image.width,
+                Image.height,
+            )
             .filter(Image.project_id == project_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
+            .order_by(Image.id)
+            .execution_options(stream_results=True)
+            .yield_per(batch_size)
         )
+        return iter(query)
 
     def get_by_project_and_dataset_type(
         self, db: Session, *, project_id: int, dataset_type: str
@@ -33,16 +91,164 @@ class CRUDImage(CRUDBase[Image, ImageCreate, ImageUpdate]):
             .first()
         )
 
+    def get_by_content_hashes(
+        self, db: Session, *, project_id: int, content_hashes: List[str]
+    ) -> Dict[str, Image]:
+        """Get the images of a project with the given content hashes, keyed by hash"""
+        if not content_hashes:
+            return {}
+        images = (
+            db.query(self.model)
+            .filter(Image.project_id == project_id, Image.content_hash.in_(content_hashes))
+            .order_by(Image.id)
+            .all()
+        )
+        by_hash: Dict[str, Image] = {}
+        for image in images:
+            by_hash.setdefault(image.content_hash, image)
+        return by_hash
+
     def create_with_project(self, db: Session, *, obj_in: ImageCreate, project_id: int, **kwargs) -> Image:
         """Create image with project ID and additional metadata"""
         obj_in_data = obj_in.dict()
         obj_in_data.update(kwargs)
         db_obj = self.model(**obj_in_data, project_id=project_id)
         db.add(db_obj)
+        crud_project_stats.increment(
+            db, project_id=project_id,
+            **image_deltas(dataset_type=db_obj.dataset_type, has_annotations=bool(db_obj.has_annotations))
+        )
         db.commit()
         db.refresh(db_obj)
         return db_obj
 
+    def bulk_create_with_project(
+        self, db: Session, *, project_id: int, rows: List[Dict[str, Any]]
+    ) -> List[Image]:
+        """
+        Insert many images with one executemany INSERT and load them back.
+        
+        `rows` are column dicts; their `filename`s must be unique within the
+        project (uploads use uuid names) since they identify the new rows.
+        """
+        if not rows:
+            return []
+        
+        now = datetime.utcnow()
+        db.execute(
+            insert(Image),
+            [
+                {
+                    "dataset_type": "train",
+                    "is_processed": False,
+                    "has_annotations": False,
+                    "created_at": now,
+                    "updated_at": now,
+                    **row,
+                    "project_id": project_id,
+                }
+                for row in rows
+            ]
+        )
+        crud_project_stats.increment(
+            db, project_id=project_id,
+            **merge_deltas(*(
+                image_deltas(dataset_type=row.get("dataset_type", "train"), has_annotations=False)
+                for row in rows
+            ))
+        )
+        db.commit()
+        
+        filenames = [row["filename"] for row in rows]
+        return (
+            db.query(self.model)
+            .filter(Image.project_id == project_id, Image.filename.in_(filenames))
+            .order_by(Image.id)
+            .all()
+        )
+
+    def update(
+        self, db: Session, *, db_obj: Image, obj_in: Union[ImageUpdate, Dict[str, Any]]
+    ) -> Image:
+        """Update image, moving it between the project counters when its type or status changes"""
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        previous = image_deltas(
+            dataset_type=db_obj.dataset_type, has_annotations=bool(db_obj.has_annotations), sign=-1
+        )
+        for field in ("dataset_type", "has_annotations"):
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        self._increment_counters(db, {db_obj.project_id: self._counter_change(db_obj, previous)})
+        return super().update(db, db_obj=db_obj, obj_in=obj_in)
+
+    def remove(self, db: Session, *, id: int) -> Image:
+        """Delete image (and its segmentations), updating the project counters"""
+        from ..models.segmentation import Segmentation
+        
+        db_obj = db.query(self.model).get(id)
+        segmentation_count = db.query(Segmentation.id).filter(Segmentation.image_id == id).count()
+        db.delete(db_obj)
+        crud_project_stats.increment(
+            db, project_id=db_obj.project_id,
+            **merge_deltas(
+                image_deltas(dataset_type=db_obj.dataset_type, has_annotations=bool(db_obj.has_annotations), sign=-1),
+                {"segmentation_count": -segmentation_count}
+            )
+        )
+        db.commit()
+        return db_obj
+
+    @staticmethod
+    def _counter_change(db_obj: Image, previous: Dict[str, int]) -> Dict[str, int]:
+        """Counter deltas between an image's previous state (negated deltas) and its current one"""
+        return merge_deltas(
+            previous,
+            image_deltas(dataset_type=db_obj.dataset_type, has_annotations=bool(db_obj.has_annotations))
+        )
+
+    @staticmethod
+    def _increment_counters(db: Session, deltas_by_project: Dict[int, Dict[str, int]]) -> None:
+        for project_id, deltas in deltas_by_project.items():
+            crud_project_stats.increment(db, project_id=project_id, **deltas)
+
+    def get_derivative_inputs(self, db: Session, *, image_id: int) -> Optional[tuple]:
+        """Get the file and project target size needed to generate an image's derivatives"""
+        from ..models.project import Project
+        
+        return (
+            db.query(
+                Image.file_path,
+                Image.filename,
+                Image.project_id,
+                Image.content_hash,
+                Project.image_width,
+                Project.image_height,
+            )
+            .join(Project, Project.id == Image.project_id)
+            .filter(Image.id == image_id)
+            .first()
+        )
+
+    def get_unprocessed_ids(self, db: Session, *, after_id: int = 0, limit: int = 1000) -> List[int]:
+        """Get ids of images whose derivatives have not been generated, in id order"""
+        rows = (
+            db.query(Image.id)
+            .filter(Image.is_processed == False, Image.id > after_id)
+            .order_by(Image.id)
+            .limit(limit)
+            .all()
+        )
+        return [image_id for image_id, in rows]
+
+    def mark_processed(self, db: Session, *, image_id: int, thumbnail_path: Optional[str]) -> None:
+        """Record generated derivatives with a single UPDATE"""
+        (
+            db.query(self.model)
+            .filter(Image.id == image_id)
+            .update({"thumbnail_path": thumbnail_path, "is_processed": True}, synchronize_session=False)
+        )
+        db.commit()
+
     def update_processing_status(self, db: Session, *, image_id: int, is_processed: bool) -> Optional[Image]:
         """Update image processing status"""
         db_obj = self.get(db, id=image_id)
@@ -57,7 +263,11 @@ class CRUDImage(CRUDBase[Image, ImageCreate, ImageUpdate]):
         """Update image annotation status"""
         db_obj = self.get(db, id=image_id)
         if db_obj:
+            previous = image_deltas(
+                dataset_type=db_obj.dataset_type, has_annotations=bool(db_obj.has_annotations), sign=-1
+            )
             db_obj.has_annotations = has_annotations
+            self._increment_counters(db, {db_obj.project_id: self._counter_change(db_obj, previous)})
             db.add(db_obj)
             db.commit()
             db.refresh(db_obj)
@@ -76,8 +286,16 @@ class CRUDImage(CRUDBase[Image, ImageCreate, ImageUpdate]):
     ) -> List[Image]:
         """Bulk update dataset type for multiple images"""
         images = db.query(self.model).filter(Image.id.in_(image_ids)).all()
+        deltas_by_project: Dict[int, Dict[str, int]] = {}
         for image in images:
+            previous = image_deltas(
+                dataset_type=image.dataset_type, has_annotations=bool(image.has_annotations), sign=-1
+            )
             image.dataset_type = dataset_type
+            deltas_by_project[image.project_id] = merge_deltas(
+                deltas_by_project.get(image.project_id, {}), self._counter_change(image, previous)
+            )
+        self._increment_counters(db, deltas_by_project)
         db.commit()
         for image in images:
             db.refresh(image)
@@ -1,6 +1,10 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from ..core import ownership_cache
 from ..crud.base import CRUDBase
+from ..crud.project_stats import COUNTERS, project_stats as crud_project_stats
 from ..models.project import Project
 from ..schemas.project import ProjectCreate, ProjectUpdate
 
@@ -15,6 +19,14 @@ class CRUDProject(CRUDBase[Project, ProjectCreate, ProjectUpdate]):
             .all()
         )
 
+    def get_ids_by_owner(self, db: Session, *, owner_id: int) -> List[int]:
+        """Get the ids of all projects of an owner"""
+        return db.execute(select(Project.id).where(Project.owner_id == owner_id)).scalars().all()
+
+    async def get_ids_by_owner_async(self, db: AsyncSession, *, owner_id: int) -> List[int]:
+        """get_ids_by_owner on an async session"""
+        return (await db.execute(select(Project.id).where(Project.owner_id == owner_id))).scalars().all()
+
     def get_by_owner_and_name(self, db: Session, *, owner_id: int, name: str) -> Optional[Project]:
         """Get project by owner ID and name"""
         return (
@@ -28,40 +40,48 @@ class CRUDProject(CRUDBase[Project, ProjectCreate, ProjectUpdate]):
         obj_in_data = obj_in.dict()
         db_obj = self.model(**obj_in_data, owner_id=owner_id)
         db.add(db_obj)
+        db.flush()
+        crud_project_stats.create_for_project(db, project_id=db_obj.id)
         db.commit()
         db.refresh(db_obj)
+        ownership_cache.add_project(owner_id, db_obj.id)
         return db_obj
 
-    def get_project_stats(self, db: Session, *, project_id: int) -> dict:
-        """Get project statistics"""
-        from ..models.image import Image
-        from ..models.class_definition import ClassDefinition
-        from ..models.segmentation import Segmentation
-        
-        project = self.get(db, id=project_id)
-        if not project:
-            return {}
-        
-        total_images = db.query(Image).filter(Image.project_id == project_id).count()
-        train_images = db.query(Image).filter(Image.project_id == project_id, Image.dataset_type == "train").count()
-        val_images = db.query(Image).filter(Image.project_id == project_id, Image.dataset_type == "val").count()
-        test_images = db.query(Image).filter(Image.project_id == project_id, Image.dataset_type == "test").count()
-        total_classes = db.query(ClassDefinition).filter(ClassDefinition.project_id == project_id).count()
-        total_annotations = db.query(Segmentation).join(Image).filter(Image.project_id == project_id).count()
+    def get_stats_for_projects(self, db: Session, *, project_ids: List[int]) -> Dict[int, dict]:
+        """
+        Get statistics for many projects from the materialized counters.
         
-        avg_annotations = total_annotations / total_images if total_images > 0 else 0
-        annotated_images = db.query(Image).filter(Image.project_id == project_id, Image.has_annotations == True).count()
-        completion_percentage = (annotated_images / total_images * 100) if total_images > 0 else 0
+        Counters are read by primary key; projects that have no counter row yet
+        (created before the counters existed and not reconciled) are counted
+        from the source tables instead, still in a single query.
+        """
+        counters = {
+            project_id: {counter: getattr(row, counter) for counter in COUNTERS}
+            for project_id, row in crud_project_stats.get_many(db, project_ids=project_ids).items()
+        }
+        missing = [project_id for project_id in project_ids if project_id not in counters]
+        if missing:
+            counters.update(crud_project_stats.aggregate(db, project_ids=missing))
         
+        return {project_id: self._format_stats(values) for project_id, values in counters.items()}
+
+    def get_project_stats(self, db: Session, *, project_id: int) -> dict:
+        """Get project statistics"""
+        return self.get_stats_for_projects(db, project_ids=[project_id]).get(project_id, {})
+
+    @staticmethod
+    def _format_stats(counters: Dict[str, int]) -> dict:
+        total_images = counters["total_images"]
+        total_annotations = counters["segmentation_count"]
         return {
             "total_images": total_images,
-            "train_images": train_images,
-            "val_images": val_images,
-            "test_images": test_images,
-            "total_classes": total_classes,
+            "train_images": counters["train_images"],
+            "val_images": counters["val_images"],
+            "test_images": counters["test_images"],
+            "total_classes": counters["class_count"],
             "total_annotations": total_annotations,
-            "avg_annotations_per_image": avg_annotations,
-            "completion_percentage": completion_percentage
+            "avg_annotations_per_image": total_annotations / total_images if total_images > 0 else 0,
+            "completion_percentage": (counters["annotated_images"] / total_images * 100) if total_images > 0 else 0
         }
 
 project = CRUDProject(Project)
\ No newline at end of file
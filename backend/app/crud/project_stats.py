@@ -0,0 +1,203 @@
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import case, func
+from ..models.project import Project
+from ..models.project_stats import ProjectStats
+
+COUNTERS = (
+    "total_images",
+    "train_images",
+    "val_images",
+    "test_images",
+    "annotated_images",
+    "class_count",
+    "segmentation_count",
+)
+
+def image_deltas(*, dataset_type: str, has_annotations: bool, sign: int = 1) -> Dict[str, int]:
+    """Counter deltas for adding (sign=1) or removing (sign=-1) one image"""
+    deltas = {"total_images": sign}
+    if dataset_type in ("train", "val", "test"):
+        deltas[f"{dataset_type}_images"] = sign
+    if has_annotations:
+        deltas["annotated_images"] = sign
+    return deltas
+
+def merge_deltas(*deltas: Dict[str, int]) -> Dict[str, int]:
+    """Sum several delta dicts"""
+    merged: Dict[str, int] = {}
+    for delta in deltas:
+        for counter, value in delta.items():
+            merged[counter] = merged.get(counter, 0) + value
+    return merged
+
+class CRUDProjectStats:
+    """
+    Materialized project counters.
+    
+    Writers call `increment` after staging their insert/delete on the session
+    and before committing, so the counters change in the same transaction as
+    the rows they count. `reconcile` rebuilds them from the source tables.
+    """
+    def __init__(self, model):
+        self.model = model
+
+    def get(self, db: Session, *, project_id: int) -> Optional[ProjectStats]:
+        """Get the counters of a project by primary key"""
+        return db.query(self.model).get(project_id)
+
+    def get_many(self, db: Session, *, project_ids: List[int]) -> Dict[int, ProjectStats]:
+        """Get the counters of several projects by primary key"""
+        if not project_ids:
+            return {}
+        rows = db.query(self.model).filter(ProjectStats.project_id.in_(project_ids)).all()
+        return {row.project_id: row for row in rows}
+
+    def create_for_project(self, db: Session, *, project_id: int) -> ProjectStats:
+        """Stage a zeroed counter row for a new project (committed by the caller)"""
+        db_obj = self.model(project_id=project_id, **{counter: 0 for counter in COUNTERS})
+        db.add(db_obj)
+        return db_obj
+
+    def increment(self, db: Session, *, project_id: int, **deltas: int) -> None:
+        """
+        Apply counter deltas with a single atomic UPDATE (committed by the caller).
+        
+        Projects created before the counters existed have no row yet; theirs is
+        rebuilt from the source tables instead, after flushing the caller's
+        pending changes so they are included.
+        """
+        deltas = {counter: value for counter, value in deltas.items() if value}
+        if not deltas:
+            return
+        
+        updated = (
+            db.query(self.model)
+            .filter(ProjectStats.project_id == project_id)
+            .update(
+                {
+                    getattr(ProjectStats, counter): getattr(ProjectStats, counter) + value
+                    for counter, value in deltas.items()
+                },
+                synchronize_session=False
+            )
+        )
+        if not updated:
+            db.flush()
+            self.rebuild(db, project_ids=[project_id])
+
+    def aggregate(self, db: Session, *, project_ids: List[int]) -> Dict[int, Dict[str, int]]:
+        """
+        Count everything from the source tables in a single query.
+        
+        Images, segmentations and classes are each aggregated per project in a
+        grouped subquery (conditional sums for the dataset splits) and joined
+        onto the projects.
+        """
+        from ..models.image import Image
+        from ..models.class_definition import ClassDefinition
+        from ..models.segmentation import Segmentation
+        
+        if not project_ids:
+            return {}
+        
+        def count_if(condition):
+            return func.sum(case((condition, 1), else_=0))
+        
+        image_stats = (
+            db.query(
+                Image.project_id.label("project_id"),
+                func.count(Image.id).label("total_images"),
+                count_if(Image.dataset_type == "train").label("train_images"),
+                count_if(Image.dataset_type == "val").label("val_images"),
+                count_if(Image.dataset_type == "test").label("test_images"),
+                count_if(Image.has_annotations == True).label("annotated_images"),
+            )
+            .filter(Image.project_id.in_(project_ids))
+            .group_by(Image.project_id)
+            .subquery()
+        )
+        class_stats = (
+            db.query(
+                ClassDefinition.project_id.label("project_id"),
+                func.count(ClassDefinition.id).label("class_count"),
+            )
+            .filter(ClassDefinition.project_id.in_(project_ids))
+            .group_by(ClassDefinition.project_id)
+            .subquery()
+        )
+        segmentation_stats = (
+            db.query(
+                Image.project_id.label("project_id"),
+                func.count(Segmentation.id).label("segmentation_count"),
+            )
+            .join(Segmentation, Segmentation.image_id == Image.id)
+            .filter(Image.project_id.in_(project_ids))
+            .group_by(Image.project_id)
+            .subquery()
+        )
+        
+        rows = (
+            db.query(
+                Project.id,
+                image_stats.c.total_images,
+                image_stats.c.train_images,
+                image_stats.c.val_images,
+                image_stats.c.test_images,
+                image_stats.c.annotated_images,
+                class_stats.c.class_count,
+                segmentation_stats.c.segmentation_count,
+            )
+            .outerjoin(image_stats, image_stats.c.project_id == Project.id)
+            .outerjoin(class_stats, class_stats.c.project_id == Project.id)
+            .outerjoin(segmentation_stats, segmentation_stats.c.project_id == Project.id)
+            .filter(Project.id.in_(project_ids))
+            .all()
+        )
+        return {
+            project_id: dict(zip(COUNTERS, (int(count or 0) for count in counts)))
+            for project_id, *counts in rows
+        }
+
+    def rebuild(self, db: Session, *, project_ids: List[int]) -> int:
+        """Replace the counter rows of the given projects with fresh counts (committed by the caller)"""
+        counts = self.aggregate(db, project_ids=project_ids)
+        (
+            db.query(self.model)
+            .filter(ProjectStats.project_id.in_(project_ids))
+            .delete(synchronize_session=False)
+        )
+        db.bulk_insert_mappings(
+            self.model,
+            [{"project_id": project_id, **counters} for project_id, counters in counts.items()]
+        )
+        return len(counts)
+
+    def reconcile(self, db: Session, *, project_ids: Optional[List[int]] = None, batch_size: int = 500) -> int:
+        """Rebuild counters from scratch, for the given projects or all of them, one batch per commit"""
+        if project_ids is not None:
+            rebuilt = 0
+            for start in range(0, len(project_ids), batch_size):
+                rebuilt += self.rebuild(db, project_ids=project_ids[start:start + batch_size])
+                db.commit()
+            return rebuilt
+        
+        rebuilt = 0
+        last_id = 0
+        while True:
+            batch = [
+                project_id for project_id, in (
+                    db.query(Project.id)
+                    .filter(Project.id > last_id)
+                    .order_by(Project.id)
+                    .limit(batch_size)
+                    .all()
+                )
+            ]
+            if not batch:
+                return rebuilt
+            rebuilt += self.rebuild(db, project_ids=batch)
+            db.commit()
+            last_id = batch[-1]
+
+project_stats = CRUDProjectStats(ProjectStats)
\ No newline at end of file
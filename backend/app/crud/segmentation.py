@@ -1,22 +1,131 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from ..crud.base import CRUDBase
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy import and_, func, or_, select
+from ..crud.base import CRUDBase, version_select
+from ..crud.project_stats import project_stats as crud_project_stats
 from ..models.segmentation import Segmentation
+from ..utils import pagination
 from ..schemas.segmentation import SegmentationCreate, SegmentationUpdate
 
+# Columns read for summary listings; the mask blob is never fetched
+SUMMARY_COLUMNS = (
+    Segmentation.id, Segmentation.image_id, Segmentation.class_id, Segmentation.name,
+    Segmentation.bbox_x, Segmentation.bbox_y, Segmentation.bbox_width, Segmentation.bbox_height,
+    Segmentation.area, Segmentation.layer_index, Segmentation.is_visible, Segmentation.is_locked,
+    Segmentation.opacity, Segmentation.is_processed, Segmentation.created_at, Segmentation.updated_at,
+)
+
 class CRUDSegmentation(CRUDBase[Segmentation, SegmentationCreate, SegmentationUpdate]):
+    def get_with_ancestors(self, db: Session, *, id: int) -> Optional[tuple]:
+        """Get (segmentation, image, project) for a segmentation in one joined query"""
+        from ..models.image import Image
+        from ..models.project import Project
+        
+        return (
+            db.query(Segmentation, Image, Project)
+            .join(Image, Image.id == Segmentation.image_id)
+            .join(Project, Project.id == Image.project_id)
+            .filter(Segmentation.id == id)
+            .first()
+        )
+
     def get_by_image(
         self, db: Session, *, image_id: int, skip: int = 0, limit: int = 100
     ) -> List[Segmentation]:
-        """Get segmentations by image ID"""
+        """Get segmentations by image ID, with their annotations loaded in one extra query"""
+        return db.execute(self._by_image_statement(image_id, skip, limit)).scalars().all()
+
+    async def get_by_image_async(
+        self, db: AsyncSession, *, image_id: int, skip: int = 0, limit: int = 100
+    ) -> List[Segmentation]:
+        """get_by_image on an async session"""
+        return (await db.execute(self._by_image_statement(image_id, skip, limit))).scalars().all()
+
+    def _by_image_statement(self, image_id: int, skip: int, limit: int):
         return (
-            db.query(self.model)
-            .filter(Segmentation.image_id == image_id)
+            select(Segmentation)
+            .options(selectinload(Segmentation.annotations))
+            .where(Segmentation.image_id == image_id)
+            .order_by(Segmentation.layer_index)
+            .offset(skip)
+            .limit(limit)
+        )
+
+    async def get_image_version_async(self, db: AsyncSession, *, image_id: int) -> tuple:
+        """
+        Version of an image's segmentation listings, full or summary (see
+        crud.base.version_select): the segmentations, their annotations and
+        their classes' names/colors.
+        """
+        from ..models.annotation import Annotation
+        from ..models.class_definition import ClassDefinition
+        
+        return await self._version_async(
+            db,
+            version_select(Segmentation, 0).where(Segmentation.image_id == image_id),
+            version_select(Annotation, 1)
+            .select_from(Annotation)
+            .join(Segmentation, Segmentation.id == Annotation.segmentation_id)
+            .where(Segmentation.image_id == image_id),
+            version_select(ClassDefinition, 2)
+            .select_from(ClassDefinition)
+            .join(Segmentation, Segmentation.class_id == ClassDefinition.id)
+            .where(Segmentation.image_id == image_id),
+        )
+
+    def get_summaries_by_image(
+        self, db: Session, *, image_id: int, skip: int = 0, limit: int = 100
+    ) -> List[tuple]:
+        """Get (segmentation, class_name, class_color, annotation_count) rows for an image, without masks"""
+        return db.execute(self._summaries_by_image_statement(image_id, skip, limit)).all()
+
+    async def get_summaries_by_image_async(
+        self, db: AsyncSession, *, image_id: int, skip: int = 0, limit: int = 100
+    ) -> List[tuple]:
+        """get_summaries_by_image on an async session"""
+        return (await db.execute(self._summaries_by_image_statement(image_id, skip, limit))).all()
+
+    def _summaries_by_image_statement(self, image_id: int, skip: int, limit: int):
+        return (
+            self._summary_statement()
+            .where(Segmentation.image_id == image_id)
             .order_by(Segmentation.layer_index)
             .offset(skip)
             .limit(limit)
-            .all()
+        )
+
+    def get_summaries_by_project(
+        self, db: Session, *, project_id: int, skip: int = 0, limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[tuple]:
+        """Summary rows (see get_summaries_by_image) for a project, paged like get_by_project"""
+        from ..models.image import Image
+        
+        statement = self._summary_statement().join(Image, Image.id == Segmentation.image_id)
+        statement = self._project_page(statement, project_id=project_id, skip=skip, limit=limit, after=after)
+        return db.execute(statement).all()
+
+    def _summary_statement(self):
+        """
+        Segmentations restricted to SUMMARY_COLUMNS, with the class name/color
+        joined in and the annotation count as a correlated subquery (one index
+        lookup per row instead of a grouped scan of the annotations table).
+        """
+        from ..models.annotation import Annotation
+        from ..models.class_definition import ClassDefinition
+        
+        annotation_count = (
+            select(func.count(Annotation.id))
+            .where(Annotation.segmentation_id == Segmentation.id)
+            .scalar_subquery()
+        )
+        return (
+            select(self.model, ClassDefinition.name, ClassDefinition.color, annotation_count)
+            .join(ClassDefinition, ClassDefinition.id == Segmentation.class_id)
+            .options(load_only(*SUMMARY_COLUMNS))
         )
 
     def get_by_image_and_class(
@@ -31,20 +140,96 @@ class CRUDSegmentation(CRUDBase[Segmentation, SegmentationCreate, SegmentationUp
         )
 
     def get_by_project(
-        self, db: Session, *, project_id: int, skip: int = 0, limit: int = 100
+        self, db: Session, *, project_id: int, skip: int = 0, limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None
     ) -> List[Segmentation]:
-        """Get segmentations by project ID"""
+        """
+        Get segmentations by project ID, newest first.
+        
+        Pass the (created_at, id) of the last row of the previous page as
+        `after` for keyset pagination; `skip` is only used without it.
+        """
         from ..models.image import Image
         
-        return (
-            db.query(self.model)
-            .join(Image)
-            .filter(Image.project_id == project_id)
-            .order_by(Segmentation.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+        statement = select(self.model).join(Image, Image.id == Segmentation.image_id)
+        statement = self._project_page(statement, project_id=project_id, skip=skip, limit=limit, after=after)
+        return db.execute(statement).scalars().all()
+
+    def _project_page(
+        self, statement, *, project_id: int, skip: int, limit: int,
+        after: Optional[Tuple[datetime, int]]
+    ):
+        from ..models.image import Image
+        
+        statement = (
+            statement.where(Image.project_id == project_id)
+            .order_by(Segmentation.created_at.desc(), Segmentation.id.desc())
         )
+        if after is not None:
+            statement = statement.where(
+                pagination.after((Segmentation.created_at, Segmentation.id), after, descending=True)
+            )
+        else:
+            statement = statement.offset(skip)
+        return statement.limit(limit)
+
+    def create(self, db: Session, *, obj_in: SegmentationCreate) -> Segmentation:
+        """Create segmentation, encoding the mask into binary storage"""
+        db_obj = self.model(**obj_in.dict(exclude={"mask_data"}))
+        # bbox and area are derived from the mask itself
+        db_obj.mask_data = obj_in.mask_data
+        db.add(db_obj)
+        self._increment_segmentation_count(db, image_id=db_obj.image_id, delta=1)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> Segmentation:
+        """Delete segmentation, updating the project counters"""
+        db_obj = db.query(self.model).get(id)
+        db.delete(db_obj)
+        self._increment_segmentation_count(db, image_id=db_obj.image_id, delta=-1)
+        db.commit()
+        return db_obj
+
+    def _increment_segmentation_count(self, db: Session, *, image_id: int, delta: int) -> None:
+        from ..models.image import Image
+        
+        project_id = db.query(Image.project_id).filter(Image.id == image_id).scalar()
+        if project_id is not None:
+            crud_project_stats.increment(db, project_id=project_id, segmentation_count=delta)
+
+    def update(
+        self, db: Session, *, db_obj: Segmentation,
+        obj_in: Union[SegmentationUpdate, Dict[str, Any]]
+    ) -> Segmentation:
+        """Update segmentation, re-encoding the mask when new mask data is given"""
+        if isinstance(obj_in, dict):
+            update_data = dict(obj_in)
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        
+        mask_data = update_data.pop("mask_data", None)
+        if mask_data is not None:
+            for field in ("bbox_x", "bbox_y", "bbox_width", "bbox_height", "area"):
+                update_data.pop(field, None)
+            db_obj.mask_data = mask_data
+            db_obj.needs_simplification = True
+            db_obj.is_processed = False
+        
+        return super().update(db, db_obj=db_obj, obj_in=update_data)
+
+    def patch_mask(
+        self, db: Session, *, db_obj: Segmentation, patches: List[Tuple[int, int, np.ndarray]]
+    ) -> Segmentation:
+        """Merge (x, y, sub_mask) patches into the stored mask (see Segmentation.patch_mask)"""
+        db_obj.patch_mask(patches)
+        db_obj.needs_simplification = True
+        db_obj.is_processed = False
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
 
     def create_with_layer_order(
         self, db: Session, *, obj_in: SegmentationCreate
@@ -52,18 +237,20 @@ class CRUDSegmentation(CRUDBase[Segmentation, SegmentationCreate, SegmentationUp
         """Create segmentation with automatic layer ordering"""
         # Get the next layer index for the image
         max_layer = (
-            db.query(db.func.max(Segmentation.layer_index))
+            db.query(func.max(Segmentation.layer_index))
             .filter(Segmentation.image_id == obj_in.image_id)
             .scalar()
         )
         
         layer_index = 0 if max_layer is None else max_layer + 1
         
-        obj_in_data = obj_in.dict()
+        obj_in_data = obj_in.dict(exclude={"mask_data"})
         obj_in_data["layer_index"] = layer_index
         
         db_obj = self.model(**obj_in_data)
+        db_obj.mask_data = obj_in.mask_data
         db.add(db_obj)
+        self._increment_segmentation_count(db, image_id=db_obj.image_id, delta=1)
         db.commit()
         db.refresh(db_obj)
         return db_obj
@@ -188,4 +375,123 @@ class CRUDSegmentation(CRUDBase[Segmentation, SegmentationCreate, SegmentationUp
             db.refresh(db_obj)
         return db_obj
 
+    def generate_annotation(
+        self, db: Session, *, segmentation_id: int
+    ) -> List["Annotation"]:
+        """
+        Regenerate annotations from the segmentation mask.
+
+        One annotation is created per outer contour, largest first. The
+        project's simplify_polygons/simplify_tolerance settings are applied.
+        """
+        from ..models.annotation import Annotation
+        from ..models.image import Image
+        from ..models.project import Project
+        from ..services.annotation_generation import annotations_from_mask
+
+        row = (
+            db.query(
+                Segmentation,
+                Image.width,
+                Image.height,
+                Project.simplify_polygons,
+                Project.simplify_tolerance,
+            )
+            .join(Image, Image.id == Segmentation.image_id)
+            .join(Project, Project.id == Image.project_id)
+            .filter(Segmentation.id == segmentation_id)
+            .first()
+        )
+        if not row:
+            return []
+        
+        segmentation, width, height, simplify_polygons, simplify_tolerance = row
+        tolerance = float(simplify_tolerance or 0) if simplify_polygons else 0.0
+        values = annotations_from_mask(
+            segmentation.mask_blob, image_width=width, image_height=height, tolerance=tolerance
+        )
+        
+        db.query(Annotation).filter(
+            Annotation.segmentation_id == segmentation_id
+        ).delete(synchronize_session=False)
+        annotations = [Annotation(segmentation_id=segmentation_id, **value) for value in values]
+        db.add_all(annotations)
+        segmentation.is_processed = True
+        segmentation.needs_simplification = False
+        db.commit()
+        return annotations
+
+    def get_ids_needing_annotation(self, db: Session, *, project_id: int) -> List[int]:
+        """Get IDs of segmentations in a project whose annotations are missing or stale"""
+        from ..models.image import Image
+        
+        rows = (
+            db.query(Segmentation.id)
+            .join(Image, Image.id == Segmentation.image_id)
+            .filter(
+                Image.project_id == project_id,
+                or_(Segmentation.needs_simplification == True, Segmentation.is_processed == False)
+            )
+            .order_by(Segmentation.id)
+            .all()
+        )
+        return [row.id for row in rows]
+
+    def get_annotation_inputs(self, db: Session, *, segmentation_ids: List[int]) -> List[tuple]:
+        """Get (segmentation_id, mask_blob, image_width, image_height, tolerance) for conversion"""
+        from ..models.image import Image
+        from ..models.project import Project
+        
+        rows = (
+            db.query(
+                Segmentation.id,
+                Segmentation.mask_blob,
+                Image.width,
+                Image.height,
+                Project.simplify_polygons,
+                Project.simplify_tolerance,
+            )
+            .join(Image, Image.id == Segmentation.image_id)
+            .join(Project, Project.id == Image.project_id)
+            .filter(Segmentation.id.in_(segmentation_ids))
+            .all()
+        )
+        return [
+            (row.id, row.mask_blob, row.width, row.height,
+             float(row.simplify_tolerance or 0) if row.simplify_polygons else 0.0)
+            for row in rows
+        ]
+
+    def bulk_replace_annotations(
+        self, db: Session, *, results: List[tuple]
+    ) -> int:
+        """
+        Replace annotations for many segmentations in one transaction.
+
+        `results` are (segmentation_id, annotation values) pairs as produced by
+        services.annotation_generation.convert_masks. Returns the number of
+        annotations inserted.
+        """
+        from ..models.annotation import Annotation
+        
+        segmentation_ids = [segmentation_id for segmentation_id, _ in results]
+        if not segmentation_ids:
+            return 0
+        
+        mappings = [
+            {"segmentation_id": segmentation_id, **value}
+            for segmentation_id, values in results
+            for value in values
+        ]
+        db.query(Annotation).filter(
+            Annotation.segmentation_id.in_(segmentation_ids)
+        ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(Annotation, mappings)
+        db.query(self.model).filter(Segmentation.id.in_(segmentation_ids)).update(
+            {Segmentation.is_processed: True, Segmentation.needs_simplification: False},
+            synchronize_session=False
+        )
+        db.commit()
+        return len(mappings)
+
 segmentation = CRUDSegmentation(Segmentation)
\ No newline at end of file
@@ -1,5 +1,7 @@
 from typing import Any, Dict, Optional, Union
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from ..core import user_cache
 from ..core.security import get_password_hash, verify_password
 from ..crud.base import CRUDBase
 from ..models.user import User
@@ -14,6 +16,10 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         """Get user by username"""
         return db.query(User).filter(User.username == username).first()
 
+    def get_by_login(self, db: Session, *, login: str) -> Optional[User]:
+        """Get user by username, falling back to email"""
+        return self.get_by_username(db, username=login) or self.get_by_email(db, email=login)
+
     def get_by_github_id(self, db: Session, *, github_id: str) -> Optional[User]:
         """Get user by GitHub ID"""
         return db.query(User).filter(User.github_id == github_id).first()
@@ -26,12 +32,18 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         """Get user by ID"""
         return db.query(User).filter(User.id == user_id).first()
 
-    def create(self, db: Session, *, obj_in: UserCreate) -> User:
-        """Create user with hashed password"""
+    async def get_by_id_async(self, db: AsyncSession, *, user_id: int) -> Optional[User]:
+        """Get user by ID on an async session"""
+        return await self.get_async(db, user_id)
+
+    def create(
+        self, db: Session, *, obj_in: UserCreate, hashed_password: Optional[str] = None
+    ) -> User:
+        """Create user with hashed password (hashed here unless already given)"""
         db_obj = User(
             username=obj_in.username,
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=hashed_password or get_password_hash(obj_in.password),
             full_name=obj_in.full_name,
             is_active=obj_in.is_active,
             theme=obj_in.theme,
@@ -67,15 +79,19 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
         
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        user = super().update(db, db_obj=db_obj, obj_in=update_data)
+        user_cache.invalidate(user.id)
+        return user
+
+    def remove(self, db: Session, *, id: int) -> User:
+        """Delete user, dropping any cached sessions"""
+        user = super().remove(db, id=id)
+        user_cache.invalidate(id)
+        return user
 
     def authenticate(self, db: Session, *, username: str, password: str) -> Optional[User]:
         """Authenticate user by username/email and password"""
-        # Try to find user by username or email
-        user = self.get_by_username(db, username=username)
-        if not user:
-            user = self.get_by_email(db, email=username)
-        
+        user = self.get_by_login(db, login=username)
         if not user:
             return None
         if not verify_password(password, user.hashed_password):
@@ -96,6 +112,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.add(user)
         db.commit()
         db.refresh(user)
+        user_cache.invalidate(user.id)
         return user
 
     def deactivate(self, db: Session, *, user: User) -> User:
@@ -104,6 +121,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.add(user)
         db.commit()
         db.refresh(user)
+        user_cache.invalidate(user.id)
         return user
 
 # Create instance
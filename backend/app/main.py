@@ -1,12 +1,16 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
 import os
 import time
 from .core.config import settings
+from .core import database
 from .core.database import create_tables
+from .core import security
+from .services.annotation_jobs import shutdown_executor
+from .services import derivatives
 from .api.api_v1.api import api_router
+from .utils import http_cache, pagination
 
 # Create FastAPI app
 app = FastAPI(
@@ -20,16 +24,18 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.BACKEND_CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=[pagination.NEXT_CURSOR_HEADER],
 )
 
 # Create upload directories
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 os.makedirs(settings.TEMP_DIR, exist_ok=True)
 
-# Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+# Mount static files for uploads (unauthenticated; see PUBLIC_UPLOADS)
+if settings.PUBLIC_UPLOADS:
+    app.mount("/uploads", http_cache.UploadFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
 # Add middleware for request timing
 @app.middleware("http")
@@ -60,6 +66,11 @@ async def file_not_found_handler(request: Request, exc: FileNotFoundError):
 async def health_check():
     return {"status": "healthy", "version": settings.VERSION}
 
+@app.get("/health/db")
+def database_health():
+    """Connection pool occupancy, checkout wait time and latency histogram per engine"""
+    return {"pools": database.pool_status()}
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
@@ -67,6 +78,14 @@ app.include_router(api_router, prefix="/api/v1")
 @app.on_event("startup")
 async def startup_event():
     create_tables()
+    derivatives.start_workers()
+    derivatives.enqueue_unprocessed()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    shutdown_executor()
+    security.shutdown_executor()
+    derivatives.stop_workers()
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,5 +1,6 @@
 from .user import User
 from .project import Project
+from .project_stats import ProjectStats
 from .image import Image
 from .class_definition import ClassDefinition
 from .segmentation import Segmentation
@@ -8,6 +9,7 @@ from .annotation import Annotation
 __all__ = [
     "User",
     "Project", 
+    "ProjectStats",
     "Image",
     "ClassDefinition",
     "Segmentation",
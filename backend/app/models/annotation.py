@@ -1,14 +1,21 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, Float, Boolean, DECIMAL
-from sqlalchemy.dialects.mysql import LONGTEXT
+from typing import Optional
+import numpy as np
+from sqlalchemy import Column, String, Integer, ForeignKey, Index, Text, Float, Boolean, DECIMAL
+from sqlalchemy.dialects.mysql import LONGBLOB
 from sqlalchemy.orm import relationship
-from .base import BaseModel
+from .base import BaseModel, RevisionMixin
+from ..utils import polygon_codec
 
-class Annotation(BaseModel):
+class Annotation(RevisionMixin, BaseModel):
     __tablename__ = "annotations"
+    __table_args__ = (
+        # Keyset pagination of project listings, newest first
+        Index("idx_annotations_created_at_id", "created_at", "id"),
+    )
 
-    # YOLO format data
-    normalized_coordinates = Column(LONGTEXT, nullable=False)  # JSON array of normalized polygon coordinates
-    original_coordinates = Column(LONGTEXT, nullable=True)     # JSON array of original pixel coordinates
+    # YOLO format data (packed float32 x, y pairs, see utils.polygon_codec)
+    normalized_blob = Column(LONGBLOB, nullable=False)  # Normalized polygon coordinates
+    original_blob = Column(LONGBLOB, nullable=True)     # Original pixel coordinates
     
     # Polygon properties
     point_count = Column(Integer, nullable=False)          # Number of polygon points
@@ -32,4 +39,37 @@ class Annotation(BaseModel):
     segmentation_id = Column(Integer, ForeignKey("segmentations.id"), nullable=False, index=True)
     
     # Relationships
-    segmentation = relationship("Segmentation", back_populates="annotations")
\ No newline at end of file
+    segmentation = relationship("Segmentation", back_populates="annotations")
+
+    @property
+    def normalized_array(self) -> np.ndarray:
+        """Flat float32 (x1, y1, x2, y2, ...) view over the stored normalized polygon"""
+        return polygon_codec.decode_coordinates(self.normalized_blob)
+
+    @property
+    def original_array(self) -> Optional[np.ndarray]:
+        """Flat float32 view over the stored pixel polygon"""
+        if self.original_blob is None:
+            return None
+        return polygon_codec.decode_coordinates(self.original_blob)
+
+    @property
+    def normalized_coordinates(self) -> Optional[str]:
+        """JSON array of normalized coordinates, for API clients"""
+        if self.normalized_blob is None:
+            return None
+        return polygon_codec.to_json(self.normalized_blob, polygon_codec.NORMALIZED_DECIMALS)
+
+    @normalized_coordinates.setter
+    def normalized_coordinates(self, value) -> None:
+        if value is not None:
+            self.normalized_blob = polygon_codec.encode_coordinates(value)
+
+    @property
+    def original_coordinates(self) -> Optional[str]:
+        """JSON array of original pixel coordinates, for API clients"""
+        return polygon_codec.to_json(self.original_blob, polygon_codec.ORIGINAL_DECIMALS)
+
+    @original_coordinates.setter
+    def original_coordinates(self, value) -> None:
+        self.original_blob = None if value is None else polygon_codec.encode_coordinates(value)
\ No newline at end of file
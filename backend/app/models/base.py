@@ -1,7 +1,7 @@
 from datetime import datetime
 from sqlalchemy import Column, Integer, DateTime
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
 
 Base = declarative_base()
 
@@ -10,6 +10,14 @@ class TimestampMixin:
     created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now())
 
+class RevisionMixin:
+    """
+    Counter bumped by every UPDATE of the row, ORM flushes and bulk
+    Query.update() alike; unlike updated_at (whole seconds in MySQL) it
+    changes on every write, so HTTP validators can rely on it.
+    """
+    revision = Column(Integer, nullable=False, default=0, server_default="0", onupdate=literal_column("revision") + 1)
+
 class BaseModel(Base, TimestampMixin):
     """すべてのモデルの基底クラス"""
     __abstract__ = True
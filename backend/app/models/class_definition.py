@@ -1,8 +1,8 @@
 from sqlalchemy import Column, String, Integer, ForeignKey, Text, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
-from .base import BaseModel
+from .base import BaseModel, RevisionMixin
 
-class ClassDefinition(BaseModel):
+class ClassDefinition(RevisionMixin, BaseModel):
     __tablename__ = "class_definitions"
 
     name = Column(String(100), nullable=False)
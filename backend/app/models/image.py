@@ -1,14 +1,18 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Float, Boolean, Text
+from sqlalchemy import Column, String, Integer, ForeignKey, Float, Boolean, Text, Index
 from sqlalchemy.orm import relationship
-from .base import BaseModel
+from .base import BaseModel, RevisionMixin
 
-class Image(BaseModel):
+class Image(RevisionMixin, BaseModel):
     __tablename__ = "images"
+    __table_args__ = (
+        Index("idx_project_content_hash", "project_id", "content_hash"),
+    )
 
     filename = Column(String(255), nullable=False)
     original_filename = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)
     file_size = Column(Integer, nullable=False)  # File size in bytes
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the file, for deduplication
     
     # Image properties
     width = Column(Integer, nullable=False)
@@ -27,4 +27,5 @@ class Project(BaseModel):
     # Relationships
     owner = relationship("User", back_populates="projects")
     images = relationship("Image", back_populates="project", cascade="all, delete-orphan")
-    classes = relationship("ClassDefinition", back_populates="project", cascade="all, delete-orphan")
\ No newline at end of file
+    classes = relationship("ClassDefinition", back_populates="project", cascade="all, delete-orphan")
+    stats = relationship("ProjectStats", back_populates="project", uselist=False, cascade="all, delete-orphan")
\ No newline at end of file
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy.orm import relationship
+from .base import Base, TimestampMixin
+
+class ProjectStats(Base, TimestampMixin):
+    """Materialized per-project counters, maintained by the CRUD create/delete paths"""
+    __tablename__ = "project_stats"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    
+    # Image counters
+    total_images = Column(Integer, nullable=False, default=0)
+    train_images = Column(Integer, nullable=False, default=0)
+    val_images = Column(Integer, nullable=False, default=0)
+    test_images = Column(Integer, nullable=False, default=0)
+    annotated_images = Column(Integer, nullable=False, default=0)
+    
+    # Class and segmentation counters
+    class_count = Column(Integer, nullable=False, default=0)
+    segmentation_count = Column(Integer, nullable=False, default=0)
+    
+    # Relationships
+    project = relationship("Project", back_populates="stats")
\ No newline at end of file
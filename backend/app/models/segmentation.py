@@ -1,15 +1,22 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, Boolean, Float, DECIMAL
-from sqlalchemy.dialects.mysql import LONGTEXT
+from typing import Optional
+import numpy as np
+from sqlalchemy import Column, String, Integer, ForeignKey, Index, Text, Boolean, Float, DECIMAL
+from sqlalchemy.dialects.mysql import LONGBLOB
 from sqlalchemy.orm import relationship
-from .base import BaseModel
+from .base import BaseModel, RevisionMixin
+from ..utils import mask_codec
 
-class Segmentation(BaseModel):
+class Segmentation(RevisionMixin, BaseModel):
     __tablename__ = "segmentations"
+    __table_args__ = (
+        # Keyset pagination of project listings, newest first
+        Index("idx_segmentations_created_at_id", "created_at", "id"),
+    )
 
     name = Column(String(100), nullable=True)  # Optional name for segmentation
     
-    # Canvas data (stored as base64 encoded image)
-    mask_data = Column(LONGTEXT, nullable=False)  # Base64 encoded mask image
+    # Canvas data (bit-packed mask cropped to its bbox, see utils.mask_codec)
+    mask_blob = Column(LONGBLOB, nullable=False)
     
     # Bounding box (for optimization)
     bbox_x = Column(DECIMAL(10,6), nullable=True)
@@ -37,4 +44,35 @@ class Segmentation(BaseModel):
     # Relationships
     image = relationship("Image", back_populates="segmentations")
     class_definition = relationship("ClassDefinition", back_populates="segmentations")
-    annotations = relationship("Annotation", back_populates="segmentation", cascade="all, delete-orphan")
\ No newline at end of file
+    annotations = relationship("Annotation", back_populates="segmentation", cascade="all, delete-orphan")
+
+    @property
+    def mask_array(self) -> Optional[np.ndarray]:
+        """Full-size bool mask decoded directly from the stored blob"""
+        if self.mask_blob is None:
+            return None
+        return mask_codec.decode_mask(self.mask_blob)
+
+    def set_mask(self, mask: np.ndarray) -> None:
+        """Store a mask array and refresh the bbox/area derived from it"""
+        self.mask_blob = mask_codec.encode_mask(mask)
+        for field, value in mask_codec.mask_stats(self.mask_blob).items():
+            setattr(self, field, value)
+
+    def patch_mask(self, patches) -> None:
+        """Merge (x, y, sub_mask) patches into the stored mask, updating bbox/area incrementally"""
+        self.mask_blob, stats = mask_codec.apply_patches(self.mask_blob, patches)
+        for field, value in stats.items():
+            setattr(self, field, value)
+
+    @property
+    def mask_data(self) -> Optional[str]:
+        """Base64 PNG representation of the mask, for API clients"""
+        if self.mask_blob is None:
+            return None
+        return mask_codec.encode_png_data_url(self.mask_array)
+
+    @mask_data.setter
+    def mask_data(self, value: Optional[str]) -> None:
+        if value is not None:
+            self.set_mask(mask_codec.decode_image_data(value))
@@ -67,6 +67,24 @@ class AnnotationInDBBase(AnnotationBase):
 class Annotation(AnnotationInDBBase):
     pass
 
+# Lightweight projection: polygon metrics without the coordinate arrays
+class AnnotationSummary(BaseModel):
+    id: int
+    segmentation_id: int
+    point_count: int
+    is_simplified: bool
+    simplification_tolerance: Optional[float] = None
+    polygon_area: Optional[float] = None
+    perimeter: Optional[float] = None
+    compactness: Optional[float] = None
+    is_valid: bool
+    is_exported: bool
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        orm_mode = True
+
 # Properties stored in DB
 class AnnotationInDB(AnnotationInDBBase):
     pass
@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, validator
+from ..core.security import image_file_url
 
 # Shared properties
 class ImageBase(BaseModel):
@@ -35,6 +36,7 @@ class ImageInDBBase(ImageBase):
     filename: str
     file_path: str
     file_size: int
+    content_hash: Optional[str] = None
     width: int
     height: int
     format: str
@@ -52,6 +54,20 @@ class ImageInDBBase(ImageBase):
 class Image(ImageInDBBase):
     segmentation_count: Optional[int] = 0
     annotation_count: Optional[int] = 0
+    # Signed URLs usable in <img> (see security.create_file_token)
+    file_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    preview_url: Optional[str] = None
+
+    @validator('file_url', always=True)
+    def sign_file_url(cls, v, values):
+        return image_file_url(values['id']) if 'id' in values else v
+
+    @validator('thumbnail_url', 'preview_url', always=True)
+    def sign_derivative_url(cls, v, values, field):
+        if 'id' not in values or not values.get('is_processed'):
+            return v
+        return image_file_url(values['id'], field.name[:-len('_url')])
 
 # Properties stored in DB
 class ImageInDB(ImageInDBBase):
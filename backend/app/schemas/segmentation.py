@@ -2,6 +2,8 @@ from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, validator
 
+from .annotation import Annotation
+
 # Shared properties
 class SegmentationBase(BaseModel):
     name: Optional[str] = None
@@ -53,6 +55,28 @@ class SegmentationUpdate(BaseModel):
             raise ValueError('Opacity must be between 0 and 255')
         return v
 
+# One dirty tile or bbox-cropped sub-mask; replaces that rectangle of the stored mask
+class MaskPatch(BaseModel):
+    x: int
+    y: int
+    mask_data: str  # Base64 encoded sub-mask image, top-left corner at (x, y)
+    
+    @validator('x', 'y')
+    def validate_origin(cls, v):
+        if v < 0:
+            raise ValueError('Patch origin must be non-negative')
+        return v
+
+# Properties to receive via API on mask patch
+class SegmentationMaskPatch(BaseModel):
+    patches: List[MaskPatch]
+    
+    @validator('patches')
+    def validate_patches(cls, v):
+        if not v:
+            raise ValueError('At least one patch is required')
+        return v
+
 # Properties shared by models stored in DB
 class SegmentationInDBBase(SegmentationBase):
     id: int
@@ -72,6 +96,35 @@ class Segmentation(SegmentationInDBBase):
     class_color: Optional[str] = None
     annotation_count: Optional[int] = 0
 
+# Segmentation with its annotations (full view of list endpoints)
+class SegmentationWithAnnotations(Segmentation):
+    annotations: List[Annotation] = []
+
+# Lightweight projection for layer panels: no mask data
+class SegmentationSummary(BaseModel):
+    id: int
+    image_id: int
+    class_id: int
+    name: Optional[str] = None
+    bbox_x: Optional[float] = None
+    bbox_y: Optional[float] = None
+    bbox_width: Optional[float] = None
+    bbox_height: Optional[float] = None
+    area: Optional[float] = None
+    layer_index: int
+    is_visible: bool
+    is_locked: bool
+    opacity: int
+    is_processed: bool
+    class_name: Optional[str] = None
+    class_color: Optional[str] = None
+    annotation_count: int = 0
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        orm_mode = True
+
 # Properties stored in DB
 class SegmentationInDB(SegmentationInDBBase):
     pass
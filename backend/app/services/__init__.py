@@ -0,0 +1 @@
+# Business logic services
\ No newline at end of file
@@ -0,0 +1,70 @@
+from typing import List
+
+import numpy as np
+
+from ..core.config import settings
+from ..utils import mask_codec, polygon_codec
+from ..utils.polygon import extract_polygons, polygon_metrics
+
+
+def annotations_from_mask(
+    mask_blob: bytes, *, image_width: int, image_height: int, tolerance: float = 0.0
+) -> List[dict]:
+    """
+    Convert a stored mask into Annotation column values, largest polygon first.
+
+    Only the bounding-box crop of the mask is decoded and traced. Vertices are
+    scaled from mask to image pixels (the canvas may be drawn at a different
+    resolution) and normalized by the image size.
+    """
+    crop, header = mask_codec.decode_mask_crop(mask_blob)
+    polygons = extract_polygons(
+        crop,
+        offset=(header.x, header.y),
+        tolerance=tolerance,
+        min_points=settings.MIN_POLYGON_POINTS,
+    )
+    if not polygons:
+        return []
+
+    image_size = np.array([image_width, image_height], dtype=np.float64)
+    scale = image_size / (header.width, header.height)
+    polygons = [polygon * scale for polygon in polygons]
+    areas, perimeters, compactness = polygon_metrics(polygons)
+    image_area = float(image_width * image_height)
+
+    values = []
+    for index in np.argsort(-areas, kind="stable"):
+        original = polygons[index]
+        normalized = np.clip(original / image_size, 0.0, 1.0)
+        values.append({
+            "normalized_blob": polygon_codec.encode_coordinates(normalized),
+            "original_blob": polygon_codec.encode_coordinates(original),
+            "point_count": len(original),
+            "is_simplified": tolerance > 0,
+            "simplification_tolerance": tolerance if tolerance > 0 else None,
+            "polygon_area": float(areas[index]) / image_area,
+            "perimeter": float(perimeters[index]),
+            "compactness": float(compactness[index]),
+        })
+    return values
+
+
+def convert_masks(items: List[tuple]) -> List[tuple]:
+    """
+    Process-pool entry point: convert a batch of masks to annotation values.
+
+    `items` are (segmentation_id, mask_blob, image_width, image_height, tolerance)
+    tuples; returns (segmentation_id, values) pairs. Failures are reported per
+    segmentation as (segmentation_id, None) so one bad mask does not sink the batch.
+    """
+    results = []
+    for segmentation_id, mask_blob, image_width, image_height, tolerance in items:
+        try:
+            values = annotations_from_mask(
+                mask_blob, image_width=image_width, image_height=image_height, tolerance=tolerance
+            )
+        except Exception:
+            values = None
+        results.append((segmentation_id, values))
+    return results
@@ -0,0 +1,165 @@
+"""
+Project-wide mask-to-annotation conversion jobs.
+
+Masks are decoded and traced in a process pool so the CPU-heavy work runs
+outside this interpreter's GIL; the driver thread only reads inputs, feeds
+the pool and bulk-writes results. Job progress is kept in memory and is
+visible to the worker process that started the job. A project has at most
+one unfinished job; finished jobs stay readable for ANNOTATION_JOB_TTL
+seconds.
+"""
+import multiprocessing
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..crud import segmentation as crud_segmentation
+from ..utils.ttl_cache import TTLCache
+from .annotation_generation import convert_masks
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Unfinished jobs by id, and the id of each project's unfinished job
+_jobs: Dict[str, dict] = {}
+_active_by_project: Dict[int, str] = {}
+_finished = TTLCache(max_size=10000, ttl=settings.ANNOTATION_JOB_TTL)
+_jobs_lock = threading.Lock()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Shared process pool, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn avoids forking a process that already runs server threads
+            _executor = ProcessPoolExecutor(
+                max_workers=max(1, settings.ANNOTATION_WORKERS),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the process pool (called on application shutdown)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def create_job(*, project_id: int, owner_id: int) -> Tuple[dict, bool]:
+    """
+    Register a new pending job, unless the project already has an
+    unfinished one; returns (job, created).
+    """
+    with _jobs_lock:
+        active_id = _active_by_project.get(project_id)
+        if active_id is not None:
+            return dict(_jobs[active_id]), False
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "project_id": project_id,
+        "owner_id": owner_id,
+        "status": "pending",
+        "total": 0,
+        "processed": 0,
+        "failed": 0,
+        "annotations_created": 0,
+        "created_at": datetime.utcnow(),
+        "finished_at": None,
+        "error": None,
+    }
+    with _jobs_lock:
+        # Checked again: another request may have registered one meanwhile
+        active_id = _active_by_project.get(project_id)
+        if active_id is not None:
+            return dict(_jobs[active_id]), False
+        _jobs[job["job_id"]] = job
+        _active_by_project[project_id] = job["job_id"]
+    return dict(job), True
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """Snapshot of a job's progress"""
+    with _jobs_lock:
+        job = _jobs.get(job_id) or _finished.get(job_id)
+        return dict(job) if job else None
+
+
+def _update_job(job_id: str, **changes) -> None:
+    with _jobs_lock:
+        _jobs[job_id].update(changes)
+
+
+def _finish_job(job_id: str, **changes) -> None:
+    """Record the outcome and move the job to the expiring finished jobs"""
+    with _jobs_lock:
+        job = _jobs.pop(job_id)
+        job.update(changes, finished_at=datetime.utcnow())
+        _active_by_project.pop(job["project_id"], None)
+        _finished.set(job_id, job)
+
+
+def _increment_job(job_id: str, **deltas) -> None:
+    with _jobs_lock:
+        job = _jobs[job_id]
+        for key, delta in deltas.items():
+            job[key] += delta
+
+
+def _chunks(items: List[int], size: int) -> List[List[int]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def run_project_job(job_id: str) -> None:
+    """
+    Convert every segmentation of the job's project that needs annotations.
+
+    Intended to run in a background thread. At most two batches per worker
+    are in flight, so memory stays bounded regardless of project size.
+    """
+    job = get_job(job_id)
+    db = SessionLocal()
+    try:
+        segmentation_ids = crud_segmentation.get_ids_needing_annotation(db, project_id=job["project_id"])
+        _update_job(job_id, status="running", total=len(segmentation_ids))
+
+        executor = get_executor()
+        max_in_flight = max(1, settings.ANNOTATION_WORKERS) * 2
+        pending = set()
+
+        def collect(done) -> None:
+            for future in done:
+                results = future.result()
+                converted = [(sid, values) for sid, values in results if values is not None]
+                created = crud_segmentation.bulk_replace_annotations(db, results=converted)
+                _increment_job(
+                    job_id,
+                    processed=len(results),
+                    failed=len(results) - len(converted),
+                    annotations_created=created,
+                )
+
+        for batch_ids in _chunks(segmentation_ids, max(1, settings.ANNOTATION_BATCH_SIZE)):
+            items = crud_segmentation.get_annotation_inputs(db, segmentation_ids=batch_ids)
+            pending.add(executor.submit(convert_masks, items))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+        _finish_job(job_id, status="completed")
+    except Exception as exc:
+        db.rollback()
+        _finish_job(job_id, status="failed", error=str(exc))
+    finally:
+        db.close()
\ No newline at end of file
@@ -0,0 +1,58 @@
+from typing import Iterable, List
+
+import numpy as np
+
+from ..core.config import settings
+from ..utils import polygon_codec
+from ..utils.polygon import polygon_metrics, simplify_polygons
+
+
+def simplify_annotations(rows: Iterable[tuple], *, tolerance: float) -> List[dict]:
+    """
+    Simplify stored annotation polygons; returns bulk UPDATE mappings.
+
+    `rows` are (annotation_id, normalized_blob, original_blob, image_width,
+    image_height). `tolerance` is in image pixels, so polygons are simplified
+    in pixel space: the normalized polygon scaled by the image size, which is
+    also what the kept indices are applied to. A stored original polygon is
+    rewritten from the simplified pixel points. A polygon that would drop
+    below MIN_POLYGON_POINTS is kept as is.
+    All polygons of the batch go through one vectorized Douglas-Peucker run.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+
+    normalized, pixels, image_sizes = [], [], []
+    for _, normalized_blob, _, width, height in rows:
+        points = polygon_codec.decode_points(normalized_blob)
+        image_size = np.array([width, height], dtype=np.float64)
+        normalized.append(points)
+        pixels.append(points * image_size)
+        image_sizes.append(image_size)
+
+    kept = simplify_polygons(pixels, tolerance)
+    kept = [
+        indices if len(indices) >= settings.MIN_POLYGON_POINTS else np.arange(len(points))
+        for indices, points in zip(kept, pixels)
+    ]
+    simplified = [points[indices] for points, indices in zip(pixels, kept)]
+    areas, perimeters, compactness = polygon_metrics(simplified)
+
+    mappings = []
+    for i, (annotation_id, _, original_blob, _, _) in enumerate(rows):
+        indices = kept[i]
+        mappings.append({
+            "id": annotation_id,
+            "normalized_blob": polygon_codec.encode_coordinates(normalized[i][indices]),
+            "original_blob": (
+                polygon_codec.encode_coordinates(simplified[i]) if original_blob is not None else None
+            ),
+            "point_count": len(indices),
+            "is_simplified": True,
+            "simplification_tolerance": tolerance,
+            "polygon_area": float(areas[i]) / float(np.prod(image_sizes[i]) or 1.0),
+            "perimeter": float(perimeters[i]),
+            "compactness": float(compactness[i]),
+        })
+    return mappings
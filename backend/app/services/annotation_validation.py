@@ -0,0 +1,85 @@
+import json
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..crud import annotation as crud_annotation
+from ..utils import polygon_codec
+from ..utils.polygon_validation import validate_polygons
+
+
+def validation_values(errors: List[str]) -> dict:
+    """is_valid / validation_errors column values for a list of errors"""
+    return {"is_valid": not errors, "validation_errors": json.dumps(errors) if errors else None}
+
+
+def validate_rows(rows: List[tuple]) -> List[dict]:
+    """
+    Process-pool entry point: validate (annotation_id, normalized_blob) rows.
+
+    Returns bulk UPDATE mappings. Unreadable coordinate data is reported as
+    a validation error of its own row.
+    """
+    polygons, unreadable = [], {}
+    for annotation_id, normalized_blob in rows:
+        try:
+            polygons.append(polygon_codec.decode_coordinates(normalized_blob))
+        except ValueError as exc:
+            unreadable[annotation_id] = str(exc)
+            polygons.append(polygon_codec.decode_coordinates(None))
+
+    results = validate_polygons(
+        polygons, min_points=settings.MIN_POLYGON_POINTS, max_points=settings.MAX_POLYGON_POINTS
+    )
+    mappings = []
+    for (annotation_id, _), (errors, _) in zip(rows, results):
+        if annotation_id in unreadable:
+            errors = [unreadable[annotation_id]]
+        mappings.append({"id": annotation_id, **validation_values(errors)})
+    return mappings
+
+
+def validate_project(db: Session, *, project_id: int, batch_size: Optional[int] = None) -> dict:
+    """
+    Validate every annotation of a project and bulk-write the results.
+
+    Batches are read by id and, beyond the first, validated in the shared
+    annotation process pool with at most two batches per worker in flight;
+    each result batch is written with one bulk UPDATE.
+    """
+    from .annotation_jobs import get_executor
+
+    batch_size = batch_size or settings.VALIDATION_BATCH_SIZE
+    totals = {"annotations": 0, "valid": 0, "invalid": 0}
+
+    def record(mappings: List[dict]) -> None:
+        crud_annotation.bulk_update_validation(db, mappings=mappings)
+        invalid = sum(1 for mapping in mappings if not mapping["is_valid"])
+        totals["annotations"] += len(mappings)
+        totals["invalid"] += invalid
+        totals["valid"] += len(mappings) - invalid
+
+    rows = crud_annotation.get_validation_inputs(db, project_id=project_id, limit=batch_size)
+    if len(rows) < batch_size:
+        # A single batch is not worth a round trip through the pool
+        if rows:
+            record(validate_rows(rows))
+        return totals
+
+    executor = get_executor()
+    max_in_flight = max(1, settings.ANNOTATION_WORKERS) * 2
+    pending = set()
+    while rows:
+        pending.add(executor.submit(validate_rows, rows))
+        if len(pending) >= max_in_flight:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                record(future.result())
+        rows = crud_annotation.get_validation_inputs(
+            db, project_id=project_id, after_id=rows[-1][0], limit=batch_size
+        )
+    for future in wait(pending).done:
+        record(future.result())
+    return totals
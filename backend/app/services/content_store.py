@@ -0,0 +1,80 @@
+"""
+Content-addressed storage for uploaded images and their derivatives.
+
+Every distinct file is stored once under UPLOAD_DIR/blobs, keyed by its
+SHA-256. The per-project paths the rest of the app uses (and serves under
+/uploads) are hard links to those blobs, so identical images uploaded to
+several projects share their bytes on disk. A blob whose link count drops
+to one is no longer referenced by any project and can be removed.
+"""
+import glob
+import os
+import shutil
+from typing import Optional, Tuple
+
+from ..core.config import settings
+
+
+def blobs_dir() -> str:
+    return os.path.join(settings.UPLOAD_DIR, "blobs")
+
+
+def incoming_dir() -> str:
+    """Scratch directory for uploads being received (same filesystem as the blobs)"""
+    return os.path.join(settings.UPLOAD_DIR, "blobs", "incoming")
+
+
+def blob_path(content_hash: str, extension: str) -> str:
+    return os.path.join(blobs_dir(), content_hash[:2], f"{content_hash}{extension}")
+
+
+def derivative_blob_path(content_hash: str, kind: str, size: Tuple[int, int], extension: str) -> str:
+    return os.path.join(
+        blobs_dir(), "derivatives", content_hash[:2],
+        f"{content_hash}_{kind}_{size[0]}x{size[1]}{extension}"
+    )
+
+
+def store(source_path: str, content_hash: str, extension: str) -> str:
+    """Move a received file into the store (or drop it if the blob exists); returns the blob path"""
+    path = blob_path(content_hash, extension)
+    if os.path.exists(path):
+        os.remove(source_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source_path, path)
+    return path
+
+
+def link(source: str, destination: str) -> None:
+    """Hard-link `source` to `destination`, copying where links are not supported"""
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def share(path: str, blob: str) -> None:
+    """Register an already written file as the blob for its content (no-op if one exists)"""
+    if not os.path.exists(blob):
+        link(path, blob)
+
+
+def release(content_hash: Optional[str]) -> None:
+    """Remove blobs of `content_hash` (original and derivatives) that no project links to anymore"""
+    if not content_hash:
+        return
+    patterns = (
+        os.path.join(blobs_dir(), content_hash[:2], f"{content_hash}.*"),
+        os.path.join(blobs_dir(), "derivatives", content_hash[:2], f"{content_hash}_*"),
+    )
+    for pattern in patterns:
+        for path in glob.glob(pattern):
+            try:
+                if os.stat(path).st_nlink <= 1:
+                    os.remove(path)
+            except OSError:
+                pass
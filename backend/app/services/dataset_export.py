@@ -0,0 +1,298 @@
+import json
+import os
+import zipfile
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..crud import annotation as crud_annotation, class_definition as crud_class, image as crud_image
+from ..utils import polygon_codec
+
+DATASET_TYPES = ("train", "val", "test")
+
+# Bytes buffered before a chunk is handed to the client
+STREAM_CHUNK_SIZE = 64 * 1024
+# Read size used when copying source images into the archive
+FILE_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class ZipStreamBuffer:
+    """
+    Write-only file object for zipfile.
+
+    zipfile falls back to data descriptors when the target is not seekable,
+    so entries can be drained and sent to the client as soon as they are written.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._size = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return self._size
+
+    def drain(self) -> bytes:
+        """Return and clear everything written so far"""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self._size = 0
+        return data
+
+
+def parse_coordinates(blob: bytes) -> np.ndarray:
+    """View stored normalized coordinates as a flat float array (x1, y1, x2, y2, ...)"""
+    try:
+        return polygon_codec.decode_coordinates(blob)
+    except ValueError:
+        return np.empty(0, dtype=polygon_codec.COORD_DTYPE)
+
+
+def label_filename(image_filename: str) -> str:
+    """YOLO label filename for an image"""
+    return f"{os.path.splitext(image_filename)[0]}.txt"
+
+
+def format_yolo_line(class_index: int, coords: np.ndarray) -> str:
+    """Format a polygon as a YOLO segmentation line"""
+    coords_str = " ".join(f"{coord:.6f}" for coord in coords)
+    return f"{class_index} {coords_str}"
+
+
+def build_coco_annotation(
+    annotation_id: int, image_id: int, category_id: int,
+    coords: np.ndarray, width: int, height: int
+) -> dict:
+    """Build a COCO annotation dict in pixel space from normalized coordinates"""
+    points = coords.reshape(-1, 2).astype(np.float64) * (width, height)
+    xs, ys = points[:, 0], points[:, 1]
+    area = 0.5 * abs(float(np.dot(xs, np.roll(ys, 1)) - np.dot(ys, np.roll(xs, 1))))
+    x_min, y_min = float(xs.min()), float(ys.min())
+
+    return {
+        "id": annotation_id,
+        "image_id": image_id,
+        "category_id": category_id,
+        "segmentation": [np.round(points.reshape(-1), 2).tolist()],
+        "area": round(area, 2),
+        "bbox": [
+            round(x_min, 2),
+            round(y_min, 2),
+            round(float(xs.max()) - x_min, 2),
+            round(float(ys.max()) - y_min, 2),
+        ],
+        "iscrowd": 0,
+    }
+
+
+def build_coco_image(image_id: int, filename: str, dataset_type: str, width: int, height: int) -> dict:
+    """Build a COCO image entry"""
+    return {
+        "id": image_id,
+        "file_name": filename,
+        "width": width,
+        "height": height,
+        "dataset_type": dataset_type,
+    }
+
+
+def build_dataset_info(
+    *, project_name: str, format: str, classes: List[dict],
+    image_counts: dict, annotation_count: int
+) -> dict:
+    """Build the dataset_info.json document"""
+    return {
+        "project_name": project_name,
+        "format": format,
+        "exported_at": datetime.utcnow().isoformat(),
+        "class_count": len(classes),
+        "image_counts": image_counts,
+        "total_images": sum(image_counts.values()),
+        "total_annotations": annotation_count,
+    }
+
+
+def iter_yolo_labels(rows: Iterable[tuple]) -> Iterator[Tuple[str, str, List[str]]]:
+    """
+    Group export rows (ordered by image) into YOLO label files.
+
+    Yields (dataset_type, label filename, label lines) once per image.
+    """
+    for _, image_rows in groupby(rows, key=itemgetter(0)):
+        lines = []
+        for row in image_rows:
+            coords = parse_coordinates(row.normalized_blob)
+            if coords.size:
+                lines.append(format_yolo_line(row.class_index, coords))
+        yield row.dataset_type, label_filename(row.filename), lines
+
+
+def iter_coco_annotations(rows: Iterable[tuple]) -> Iterator[dict]:
+    """Convert export rows into COCO annotation dicts, skipping empty polygons"""
+    for row in rows:
+        coords = parse_coordinates(row.normalized_blob)
+        if coords.size:
+            yield build_coco_annotation(
+                row.annotation_id, row.image_id, row.class_index,
+                coords, row.width, row.height
+            )
+
+
+def build_export_data(
+    rows: Iterable[tuple], images: Optional[Iterable[tuple]], *, project_name: str,
+    format: str, classes: List[dict], include_images: bool = False
+) -> dict:
+    """
+    Build an in-memory export document from joined annotation rows.
+
+    `rows` come from CRUDAnnotation.iter_export_rows and `images` from
+    CRUDImage.iter_by_project; each is consumed exactly once, so the cost is
+    linear in the number of annotations and images.
+    """
+    annotations = {dataset_type: {} for dataset_type in DATASET_TYPES}
+    image_counts = {dataset_type: 0 for dataset_type in DATASET_TYPES}
+    annotation_count = 0
+    export_data = {"classes": classes, "annotations": annotations}
+
+    if format == "yolo":
+        for dataset_type, filename, lines in iter_yolo_labels(rows):
+            annotations.setdefault(dataset_type, {})[filename] = "\n".join(lines)
+            annotation_count += len(lines)
+            image_counts[dataset_type] = image_counts.get(dataset_type, 0) + 1
+    elif format == "coco":
+        coco_annotations = list(iter_coco_annotations(rows))
+        annotation_count = len(coco_annotations)
+        export_data["coco_format"] = {
+            "categories": classes,
+            "images": [],
+            "annotations": coco_annotations,
+        }
+
+    if images is not None:
+        image_counts = {dataset_type: 0 for dataset_type in DATASET_TYPES}
+        image_paths = {dataset_type: {} for dataset_type in DATASET_TYPES}
+        for image in images:
+            image_counts[image.dataset_type] = image_counts.get(image.dataset_type, 0) + 1
+            if format == "coco":
+                export_data["coco_format"]["images"].append(build_coco_image(
+                    image.id, image.filename, image.dataset_type, image.width, image.height
+                ))
+            if include_images:
+                image_paths.setdefault(image.dataset_type, {})[image.filename] = image.file_path
+        if include_images:
+            export_data["images"] = image_paths
+
+    export_data["info"] = build_dataset_info(
+        project_name=project_name,
+        format=format,
+        classes=classes,
+        image_counts=image_counts,
+        annotation_count=annotation_count,
+    )
+    return export_data
+
+
+def get_export_classes(db: Session, *, project_id: int) -> List[dict]:
+    """Class definitions of a project in YOLO index order"""
+    classes = crud_class.get_by_project(db, project_id=project_id, limit=None)
+    return [{"id": cls.class_index, "name": cls.name} for cls in classes]
+
+
+def stream_project_export(
+    db: Session, *, project_id: int, project_name: str, format: str = "yolo",
+    include_images: bool = False, batch_size: int = 1000
+) -> Iterator[bytes]:
+    """
+    Stream a YOLO/COCO dataset archive.
+
+    Rows are paged through server-side cursors and every entry is flushed to
+    the client as soon as it is written, so memory use is independent of
+    project size.
+    """
+    sink = ZipStreamBuffer()
+    zip_file = zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED)
+    classes = get_export_classes(db, project_id=project_id)
+    image_counts = {dataset_type: 0 for dataset_type in DATASET_TYPES}
+    annotation_count = 0
+
+    if format == "yolo":
+        zip_file.writestr("classes.txt", "\n".join(cls["name"] for cls in classes))
+
+        rows = crud_annotation.iter_export_rows(db, project_id=project_id, batch_size=batch_size)
+        for dataset_type, filename, lines in iter_yolo_labels(rows):
+            annotation_count += len(lines)
+            image_counts[dataset_type] = image_counts.get(dataset_type, 0) + 1
+            zip_file.writestr(f"labels/{dataset_type}/{filename}", "\n".join(lines))
+            if len(sink) >= STREAM_CHUNK_SIZE:
+                yield sink.drain()
+
+    elif format == "coco":
+        with zip_file.open("annotations.json", "w", force_zip64=True) as entry:
+            entry.write(b'{"categories": ')
+            entry.write(json.dumps(classes).encode())
+
+            entry.write(b', "images": [')
+            separator = b""
+            for image in crud_image.iter_by_project(db, project_id=project_id, batch_size=batch_size):
+                image_counts[image.dataset_type] = image_counts.get(image.dataset_type, 0) + 1
+                entry.write(separator + json.dumps(build_coco_image(
+                    image.id, image.filename, image.dataset_type, image.width, image.height
+                )).encode())
+                separator = b", "
+                if len(sink) >= STREAM_CHUNK_SIZE:
+                    yield sink.drain()
+
+            entry.write(b'], "annotations": [')
+            separator = b""
+            rows = crud_annotation.iter_export_rows(db, project_id=project_id, batch_size=batch_size)
+            for coco_annotation in iter_coco_annotations(rows):
+                annotation_count += 1
+                entry.write(separator + json.dumps(coco_annotation).encode())
+                separator = b", "
+                if len(sink) >= STREAM_CHUNK_SIZE:
+                    yield sink.drain()
+
+            entry.write(b"]}")
+
+    if include_images:
+        image_counts = {dataset_type: 0 for dataset_type in DATASET_TYPES}
+        for image in crud_image.iter_by_project(db, project_id=project_id, batch_size=batch_size):
+            if not os.path.exists(image.file_path):
+                continue
+            image_counts[image.dataset_type] = image_counts.get(image.dataset_type, 0) + 1
+
+            # Source images are already compressed; storing them avoids burning CPU on deflate
+            zip_info = zipfile.ZipInfo.from_file(
+                image.file_path, f"images/{image.dataset_type}/{image.filename}"
+            )
+            zip_info.compress_type = zipfile.ZIP_STORED
+            with open(image.file_path, "rb") as src, zip_file.open(zip_info, "w") as dst:
+                while True:
+                    chunk = src.read(FILE_COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    if len(sink) >= STREAM_CHUNK_SIZE:
+                        yield sink.drain()
+
+    info = build_dataset_info(
+        project_name=project_name,
+        format=format,
+        classes=classes,
+        image_counts=image_counts,
+        annotation_count=annotation_count,
+    )
+    zip_file.writestr("dataset_info.json", json.dumps(info, indent=2))
+    zip_file.close()
+    yield sink.drain()
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Background generation of image derivatives.
+
+Uploads only store the original; a thumbnail, a downscaled preview for the
+canvas and a copy resized to the project's image_width x image_height are
+produced here, off the request path, by a small pool of worker threads
+(Pillow releases the GIL while decoding and resizing). Completion is
+reported through `Image.is_processed`.
+
+The queue lives in memory. Images whose derivatives were never written
+(e.g. the server stopped with work queued) still have is_processed = False
+and are re-queued by `enqueue_unprocessed` on startup.
+"""
+import logging
+import os
+import queue
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from PIL import Image as PILImage
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..crud import image as crud_image
+from . import content_store
+
+logger = logging.getLogger(__name__)
+
+# Derivative kind -> (directory, filename prefix)
+DERIVATIVES = {
+    "thumbnail": ("thumbnails", "thumb_"),
+    "preview": ("previews", "preview_"),
+    "resized": ("resized", "resized_"),
+}
+
+_queue: "queue.Queue[Optional[int]]" = queue.Queue()
+_queued = set()
+_queued_lock = threading.Lock()
+_workers: List[threading.Thread] = []
+
+
+def derivative_path(project_id: int, filename: str, kind: str) -> str:
+    directory, prefix = DERIVATIVES[kind]
+    return os.path.join(settings.UPLOAD_DIR, str(project_id), directory, f"{prefix}{filename}")
+
+
+def generate_derivatives(
+    file_path: str, *, project_id: int, filename: str, target_size: Tuple[int, int],
+    content_hash: Optional[str] = None
+) -> dict:
+    """
+    Write every derivative of one image; returns {kind: path}.
+
+    With a `content_hash`, derivatives are shared through the content store:
+    any derivative already produced for the same bytes and size (in any
+    project) is linked instead of rendered. Whatever is left is rendered
+    from a single decode, JPEGs at the smallest scale that still covers the
+    largest derivative (via `draft`), with the thumbnail reduced from the
+    preview rather than from the original.
+    """
+    sizes = {
+        "thumbnail": tuple(settings.THUMBNAIL_SIZE),
+        "preview": tuple(settings.PREVIEW_SIZE),
+        "resized": tuple(target_size),
+    }
+    paths = {kind: derivative_path(project_id, filename, kind) for kind in DERIVATIVES}
+    blobs = {}
+    if content_hash:
+        extension = os.path.splitext(filename)[1]
+        blobs = {
+            kind: content_store.derivative_blob_path(content_hash, kind, size, extension)
+            for kind, size in sizes.items()
+        }
+
+    missing = set()
+    for kind in DERIVATIVES:
+        if kind in blobs and os.path.exists(blobs[kind]):
+            content_store.link(blobs[kind], paths[kind])
+        else:
+            missing.add(kind)
+            os.makedirs(os.path.dirname(paths[kind]), exist_ok=True)
+    if not missing:
+        return paths
+
+    decode_size = sizes["preview"]
+    if "resized" in missing:
+        decode_size = tuple(max(a, b) for a, b in zip(decode_size, sizes["resized"]))
+    with PILImage.open(file_path) as img:
+        img.draft(img.mode, decode_size)
+        img.load()
+
+        if "resized" in missing:
+            img.resize(sizes["resized"], PILImage.Resampling.LANCZOS).save(paths["resized"])
+
+        preview = img.copy()
+        preview.thumbnail(sizes["preview"], PILImage.Resampling.LANCZOS)
+        if "preview" in missing:
+            preview.save(paths["preview"])
+
+    if "thumbnail" in missing:
+        preview.thumbnail(sizes["thumbnail"], PILImage.Resampling.LANCZOS)
+        preview.save(paths["thumbnail"])
+
+    for kind in missing & set(blobs):
+        content_store.share(paths[kind], blobs[kind])
+    return paths
+
+
+def process_image(image_id: int) -> bool:
+    """Generate the derivatives of one image and mark it processed; returns success"""
+    db = SessionLocal()
+    try:
+        row = crud_image.get_derivative_inputs(db, image_id=image_id)
+        if row is None:
+            return False
+        paths = generate_derivatives(
+            row.file_path,
+            project_id=row.project_id,
+            filename=row.filename,
+            target_size=(row.image_width or settings.DEFAULT_IMAGE_SIZE[0],
+                         row.image_height or settings.DEFAULT_IMAGE_SIZE[1]),
+            content_hash=row.content_hash,
+        )
+        crud_image.mark_processed(db, image_id=image_id, thumbnail_path=paths["thumbnail"])
+        return True
+    except Exception:
+        db.rollback()
+        logger.exception("Derivative generation failed for image %s", image_id)
+        return False
+    finally:
+        db.close()
+
+
+def enqueue(image_ids: Iterable[int]) -> None:
+    """Queue images for derivative generation; already queued images are skipped"""
+    with _queued_lock:
+        for image_id in image_ids:
+            if image_id not in _queued:
+                _queued.add(image_id)
+                _queue.put(image_id)
+
+
+def enqueue_unprocessed(batch_size: int = 1000) -> int:
+    """Re-queue every image that has no derivatives yet; returns the number queued"""
+    db = SessionLocal()
+    try:
+        queued = 0
+        last_id = 0
+        while True:
+            image_ids = crud_image.get_unprocessed_ids(db, after_id=last_id, limit=batch_size)
+            if not image_ids:
+                return queued
+            enqueue(image_ids)
+            queued += len(image_ids)
+            last_id = image_ids[-1]
+    finally:
+        db.close()
+
+
+def pending_count() -> int:
+    with _queued_lock:
+        return len(_queued)
+
+
+def _worker() -> None:
+    while True:
+        image_id = _queue.get()
+        try:
+            if image_id is None:
+                return
+            process_image(image_id)
+        finally:
+            if image_id is not None:
+                with _queued_lock:
+                    _queued.discard(image_id)
+            _queue.task_done()
+
+
+def start_workers() -> None:
+    """Start the derivative worker threads (called on application startup)"""
+    if _workers:
+        return
+    for index in range(max(1, settings.DERIVATIVE_WORKERS)):
+        worker = threading.Thread(target=_worker, name=f"derivatives-{index}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+
+
+def stop_workers() -> None:
+    """Ask the worker threads to exit once their current image is done"""
+    for _ in _workers:
+        _queue.put(None)
+    _workers.clear()
@@ -0,0 +1,79 @@
+"""
+Viewport retrieval: a region of an image, scaled to fit the client's view.
+
+Large originals (orthophotos, 8K frames) are never sent whole to show one
+part of them. The client asks for the rectangle it displays, in original
+pixel coordinates, and the largest output size it can use. Zoomed-out views
+are cut from the canvas preview derivative when it has enough resolution;
+otherwise the original is decoded, JPEGs at the smallest scale that still
+covers the output (via `draft`), so a zoomed-out view of a huge JPEG
+decodes a fraction of its pixels.
+"""
+import io
+import math
+import os
+from typing import NamedTuple, Tuple
+
+from PIL import Image as PILImage
+
+from . import derivatives
+
+
+class RegionError(ValueError):
+    """The requested region is invalid; the message is safe to show to the client"""
+
+
+class RenderedRegion(NamedTuple):
+    content: bytes
+    media_type: str
+    width: int
+    height: int
+
+
+def clamp_region(region: Tuple[int, int, int, int], image_size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """(left, top, right, bottom) of an (x, y, width, height) region, clipped to the image"""
+    x, y, width, height = region
+    if width <= 0 or height <= 0:
+        raise RegionError("Region width and height must be positive")
+    left, top = max(0, x), max(0, y)
+    right, bottom = min(image_size[0], x + width), min(image_size[1], y + height)
+    if left >= right or top >= bottom:
+        raise RegionError("Region lies outside the image")
+    return left, top, right, bottom
+
+
+def _source(image, scale: float) -> str:
+    """The preview when it has at least `scale` of the original's resolution, else the original"""
+    preview_path = derivatives.derivative_path(image.project_id, image.filename, "preview")
+    if image.is_processed and os.path.exists(preview_path):
+        with PILImage.open(preview_path) as preview:
+            if preview.width >= image.width * scale:
+                return preview_path
+    return image.file_path
+
+
+def render_region(image, region: Tuple[int, int, int, int], *, max_size: int) -> RenderedRegion:
+    """
+    Encode `region` (x, y, width, height in original pixels) of an image,
+    downscaled so its longer side is at most `max_size`. PNG when the
+    source has transparency, JPEG otherwise.
+    """
+    left, top, right, bottom = clamp_region(region, (image.width, image.height))
+    scale = min(1.0, max_size / max(right - left, bottom - top))
+    output_size = (max(1, round((right - left) * scale)), max(1, round((bottom - top) * scale)))
+
+    with PILImage.open(_source(image, scale)) as img:
+        # Only JPEG honours draft; it decodes at 1/2, 1/4 or 1/8 when that still covers the output
+        img.draft(img.mode, (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+        factor_x, factor_y = img.width / image.width, img.height / image.height
+        box = (left * factor_x, top * factor_y, right * factor_x, bottom * factor_y)
+        tile = img.resize(output_size, PILImage.Resampling.LANCZOS, box=box)
+
+    buffer = io.BytesIO()
+    if tile.mode in ("RGBA", "LA", "P") and (tile.mode != "P" or "transparency" in tile.info):
+        tile.save(buffer, "PNG", optimize=False)
+        media_type = "image/png"
+    else:
+        tile.convert("RGB").save(buffer, "JPEG", quality=85)
+        media_type = "image/jpeg"
+    return RenderedRegion(buffer.getvalue(), media_type, *output_size)
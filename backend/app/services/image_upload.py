@@ -0,0 +1,139 @@
+"""
+Image upload pipeline: chunked writes to disk, hashing and header-only probing.
+
+Uploads arrive as spooled temporary files; they are copied to disk in
+fixed-size chunks, hashed on the way, so a request never holds a whole image
+in memory. Width, height and format are read from the image header without
+decoding pixels.
+
+An upload is first received into a scratch file (`receive_upload`); the
+caller then either discards it as a duplicate or stores it
+(`store_received`), which moves it into the content store and links it into
+the project directory. Thumbnails and other derivatives are produced later
+by services.derivatives.
+"""
+import hashlib
+import os
+import uuid
+from typing import BinaryIO, NamedTuple, Optional, Tuple
+
+from PIL import Image as PILImage
+
+from ..core.config import settings
+from . import content_store
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadError(ValueError):
+    """An uploaded file was rejected; the message is safe to show to the client"""
+
+
+class ReceivedUpload(NamedTuple):
+    temp_path: str
+    extension: str
+    file_size: int
+    content_hash: str
+    width: int
+    height: int
+    format: str
+
+
+class StoredUpload(NamedTuple):
+    filename: str
+    file_path: str
+    file_size: int
+    content_hash: str
+    width: int
+    height: int
+    format: str
+
+
+def project_upload_dir(project_id: int) -> str:
+    return os.path.join(settings.UPLOAD_DIR, str(project_id))
+
+
+def validate_upload(filename: Optional[str], content_type: Optional[str]) -> str:
+    """Check the content type and extension of an upload; returns the normalized extension"""
+    if not content_type or not content_type.startswith("image/"):
+        raise UploadError("File must be an image")
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in settings.ALLOWED_EXTENSIONS:
+        raise UploadError(f"File type not allowed. Allowed types: {settings.ALLOWED_EXTENSIONS}")
+    return extension
+
+
+def write_chunks(source: BinaryIO, file_path: str, *, max_size: int) -> Tuple[int, str]:
+    """
+    Copy `source` to `file_path` in CHUNK_SIZE pieces, hashing as it goes.
+
+    Returns the byte count and SHA-256 hex digest. The partial file is
+    removed if the upload exceeds `max_size`.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(file_path, "wb") as buffer:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadError(
+                        f"File size exceeds maximum allowed size of {max_size} bytes"
+                    )
+                digest.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        _remove_quietly(file_path)
+        raise
+    return size, digest.hexdigest()
+
+
+def probe_image(file_path: str) -> Tuple[int, int, str]:
+    """Width, height and format read from the image header, without decoding pixels"""
+    try:
+        with PILImage.open(file_path) as img:
+            return img.size[0], img.size[1], img.format.lower()
+    except Exception:
+        raise UploadError("Invalid image file")
+
+
+def receive_upload(source: BinaryIO, *, filename: Optional[str], content_type: Optional[str]) -> ReceivedUpload:
+    """Validate, write, hash and probe one upload into a scratch file"""
+    extension = validate_upload(filename, content_type)
+    temp_path = os.path.join(content_store.incoming_dir(), f"{uuid.uuid4()}{extension}")
+
+    file_size, content_hash = write_chunks(source, temp_path, max_size=settings.MAX_FILE_SIZE)
+    try:
+        width, height, img_format = probe_image(temp_path)
+    except UploadError:
+        _remove_quietly(temp_path)
+        raise
+    return ReceivedUpload(temp_path, extension, file_size, content_hash, width, height, img_format)
+
+
+def store_received(received: ReceivedUpload, *, project_id: int) -> StoredUpload:
+    """Move a received upload into the content store and link it into the project directory"""
+    blob = content_store.store(received.temp_path, received.content_hash, received.extension)
+    unique_filename = f"{uuid.uuid4()}{received.extension}"
+    file_path = os.path.join(project_upload_dir(project_id), unique_filename)
+    content_store.link(blob, file_path)
+    return StoredUpload(
+        unique_filename, file_path, received.file_size, received.content_hash,
+        received.width, received.height, received.format
+    )
+
+
+def discard(received: ReceivedUpload) -> None:
+    """Drop a received upload that will not be stored (e.g. a duplicate)"""
+    _remove_quietly(received.temp_path)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
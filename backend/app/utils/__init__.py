@@ -0,0 +1 @@
+# Utility helpers
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""
+File responses with HTTP Range support and zero-copy sending.
+
+`serve_file` answers conditional requests (304), single byte ranges (206;
+416 when unsatisfiable) and If-Range, then sends the bytes the cheapest way
+available:
+
+* IMAGE_ACCEL_REDIRECT set: an empty response with X-Accel-Redirect, so
+  nginx sends the file itself (sendfile, ranges included) from an
+  `internal` location mapped to UPLOAD_DIR.
+* ASGI server offering the `http.response.zerocopysend` extension: the
+  server sendfile()s the file descriptor.
+* Otherwise the range is read in CHUNK_SIZE pieces in the threadpool, so
+  only one chunk is in memory at a time.
+
+Requests for several ranges get the whole file (RFC 9110 allows ignoring
+Range); image viewers ask for one range at a time.
+"""
+import mimetypes
+import os
+from datetime import datetime
+from typing import Optional, Tuple
+
+from anyio import to_thread
+from fastapi import Request, Response
+from starlette.types import Receive, Scope, Send
+
+from ..core.config import settings
+from . import http_cache
+
+CHUNK_SIZE = 1024 * 1024
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class RangeNotSatisfiable(ValueError):
+    """The requested range lies outside the file"""
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Strong ETag of a file version (usable with If-Range)"""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    (start, end) inclusive byte positions of a single-range `bytes=` Range
+    header, or None when the header should be ignored (other units, several
+    ranges, malformed). Raises RangeNotSatisfiable.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if not first:
+        if length <= 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - length), size - 1
+    if start > end and last:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(Response):
+    """Sends `count` bytes of a file from `offset` (see module docstring)"""
+
+    def __init__(
+        self, path: str, *, offset: int, count: int, status_code: int = 200,
+        headers: Optional[dict] = None, media_type: Optional[str] = None,
+    ):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.headers["Content-Length"] = str(count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        with open(self.path, "rb") as file:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({
+                    "type": ZEROCOPY_EXTENSION, "file": file,
+                    "offset": self.offset, "count": self.count, "more_body": False,
+                })
+                return
+            position, end = self.offset, self.offset + self.count
+            while position < end:
+                chunk = await to_thread.run_sync(_read, file, position, min(CHUNK_SIZE, end - position))
+                if not chunk:
+                    # File shrank under us; the declared length cannot be met
+                    raise RuntimeError(f"Unexpected end of file: {self.path}")
+                position += len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": position < end})
+
+
+def _read(file, offset: int, size: int) -> bytes:
+    file.seek(offset)
+    return file.read(size)
+
+
+def _if_range_matches(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Whether a Range applies under If-Range (strong ETag or exact date)"""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return if_range == http_cache.http_date(last_modified)
+
+
+def serve_file(request: Request, path: str, *, cache_control: str = http_cache.PRIVATE_REVALIDATE) -> Response:
+    """
+    Response for a GET/HEAD of `path` (already authorized), honouring
+    If-None-Match / If-Modified-Since, Range and If-Range.
+    """
+    stat_result = os.stat(path)
+    etag = file_etag(stat_result)
+    last_modified = datetime.utcfromtimestamp(stat_result.st_mtime)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_cache.http_date(last_modified),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if http_cache.is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if settings.IMAGE_ACCEL_REDIRECT:
+        relative = os.path.relpath(path, settings.UPLOAD_DIR).replace(os.sep, "/")
+        headers["X-Accel-Redirect"] = settings.IMAGE_ACCEL_REDIRECT.rstrip("/") + "/" + relative
+        return Response(headers=headers, media_type=media_type)
+
+    size = stat_result.st_size
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range is None:
+        return RangeFileResponse(path, offset=0, count=size, headers=headers, media_type=media_type)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return RangeFileResponse(
+        path, offset=start, count=end - start + 1, status_code=206, headers=headers, media_type=media_type
+    )
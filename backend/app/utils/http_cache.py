@@ -0,0 +1,124 @@
+"""
+HTTP caching: validators, conditional GETs and the /uploads mount.
+
+JSON endpoints derive a weak ETag from cheap version data (a row's
+revision counter, or crud.base.version_select rows for listings) before
+loading or serializing the body; updated_at is not precise enough, MySQL
+keeps whole seconds. When the client's If-None-Match matches they
+answer 304 with no body. Responses are marked `private, no-cache`, so
+browsers and proxies keep them but revalidate on every use.
+
+Uploaded originals are stored under a fresh uuid name and never rewritten,
+so the legacy /uploads mount (PUBLIC_UPLOADS) serves them as immutable.
+Derivatives keep their name when they are regenerated (e.g. after a
+project's image size changes), so they are cached for
+UPLOAD_DERIVATIVE_MAX_AGE seconds and then revalidated.
+"""
+import hashlib
+import os
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+
+from ..core.config import settings
+
+PRIVATE_REVALIDATE = "private, no-cache"
+IMMUTABLE = "public, max-age=31536000, immutable"
+PRIVATE_IMMUTABLE = "private, max-age=31536000, immutable"
+
+_UUID_FILENAME = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.\w+$")
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag over the given version values"""
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    """HTTP-date of a timestamp (naive values are UTC, as stored by the models)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == opaque
+        for candidate in (part.strip() for part in if_none_match.split(","))
+    )
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Whether a GET can be answered with 304. If-None-Match wins over
+    If-Modified-Since when both are sent (RFC 9110 13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole-second precision
+    return last_modified.replace(microsecond=0) <= since
+
+
+def _validators(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": PRIVATE_REVALIDATE}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None) -> None:
+    """Add ETag (and Last-Modified) to a 200 response"""
+    response.headers.update(_validators(etag, last_modified))
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """Empty 304 response carrying the validators"""
+    return Response(status_code=304, headers=_validators(etag, last_modified))
+
+
+def upload_cache_control(path: str) -> str:
+    """Cache-Control of a file under /uploads"""
+    if _UUID_FILENAME.match(os.path.basename(path)):
+        return IMMUTABLE
+    return f"public, max-age={settings.UPLOAD_DERIVATIVE_MAX_AGE}"
+
+
+class UploadFiles(StaticFiles):
+    """
+    StaticFiles for UPLOAD_DIR: adds Cache-Control (see upload_cache_control)
+    and compares If-None-Match weakly and per list element, so ETags that a
+    proxy turned weak (e.g. nginx after gzip) still revalidate.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = upload_cache_control(str(full_path))
+        return response
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match, response_headers["etag"])
+        return super().is_not_modified(response_headers, request_headers)
@@ -0,0 +1,183 @@
+"""
+Compact binary storage for segmentation masks.
+
+A stored mask is a small fixed header followed by the zlib-compressed,
+bit-packed pixels of the mask cropped to its bounding box:
+
+    magic (4s) | width, height (full image size) | x, y, w, h (crop box)  -- uint32 LE
+    zlib(packbits(crop))
+
+Decoding goes straight from the blob to a NumPy bool array; PNG is only
+produced at the API edge for clients that still exchange base64 images.
+"""
+import base64
+import struct
+import zlib
+from collections import namedtuple
+from typing import Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+MASK_MAGIC = b"SGM1"
+_HEADER = struct.Struct("<4sIIIIII")
+HEADER_SIZE = _HEADER.size
+
+# Full image size and crop box of a stored mask
+MaskHeader = namedtuple("MaskHeader", ["width", "height", "x", "y", "w", "h"])
+
+
+def mask_bbox(mask: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box (x, y, w, h) of the set pixels, or None for an empty mask"""
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1)
+
+
+def encode_mask(mask: np.ndarray) -> bytes:
+    """Encode a 2-D mask (any dtype, non-zero = set) into the binary storage format"""
+    if mask.ndim != 2:
+        raise ValueError("Mask must be a 2-D array")
+    mask = mask.astype(bool, copy=False)
+    height, width = mask.shape
+    return _encode_region(mask, 0, 0, width, height)
+
+
+def _encode_region(region: np.ndarray, x0: int, y0: int, width: int, height: int) -> bytes:
+    """Encode a bool array placed at (x0, y0) of a width x height mask that is empty elsewhere"""
+    bbox = mask_bbox(region)
+    if bbox is None:
+        return _HEADER.pack(MASK_MAGIC, width, height, 0, 0, 0, 0)
+
+    x, y, w, h = bbox
+    packed = np.packbits(region[y:y + h, x:x + w], axis=None)
+    header = _HEADER.pack(MASK_MAGIC, width, height, x0 + x, y0 + y, w, h)
+    return header + zlib.compress(packed.tobytes(), 6)
+
+
+def read_header(blob: bytes) -> MaskHeader:
+    """Read the header of a stored mask without decompressing its pixels"""
+    if len(blob) < HEADER_SIZE:
+        raise ValueError("Mask data is truncated")
+    magic, *fields = _HEADER.unpack_from(blob)
+    if magic != MASK_MAGIC:
+        raise ValueError("Unknown mask format")
+    return MaskHeader(*fields)
+
+
+def decode_mask_crop(blob: bytes) -> Tuple[np.ndarray, MaskHeader]:
+    """Decode only the bounding-box crop of a stored mask"""
+    header = read_header(blob)
+    if header.w == 0 or header.h == 0:
+        return np.zeros((0, 0), dtype=bool), header
+
+    packed = np.frombuffer(zlib.decompress(blob[HEADER_SIZE:]), dtype=np.uint8)
+    crop = np.unpackbits(packed, count=header.w * header.h).reshape(header.h, header.w)
+    return crop.view(bool), header
+
+
+def decode_mask(blob: bytes) -> np.ndarray:
+    """Decode a stored mask into a full-size bool array"""
+    crop, header = decode_mask_crop(blob)
+    mask = np.zeros((header.height, header.width), dtype=bool)
+    if crop.size:
+        mask[header.y:header.y + header.h, header.x:header.x + header.w] = crop
+    return mask
+
+
+def mask_stats(blob: bytes) -> dict:
+    """Bounding box and pixel area of a stored mask, in image pixels"""
+    crop, header = decode_mask_crop(blob)
+    return _stats(header, int(np.count_nonzero(crop)))
+
+
+def _stats(header: MaskHeader, area: int) -> dict:
+    if header.w == 0 or header.h == 0:
+        return {"bbox_x": None, "bbox_y": None, "bbox_width": None, "bbox_height": None, "area": 0}
+    return {
+        "bbox_x": header.x,
+        "bbox_y": header.y,
+        "bbox_width": header.w,
+        "bbox_height": header.h,
+        "area": area,
+    }
+
+
+def apply_patches(blob: bytes, patches: Iterable[Tuple[int, int, np.ndarray]]) -> Tuple[bytes, dict]:
+    """
+    Merge sub-masks into a stored mask; returns the new blob and its stats.
+
+    Each patch is (x, y, sub_mask) and replaces that rectangle of the mask
+    (set and cleared pixels alike). Only the union of the stored crop and
+    the patch rectangles is ever materialized, and the area is updated by
+    the pixels each patch adds or removes, so the cost follows the size of
+    the edit rather than the image resolution.
+    """
+    crop, header = decode_mask_crop(blob)
+    patches = [(int(x), int(y), np.asarray(sub, dtype=bool)) for x, y, sub in patches]
+    for x, y, sub in patches:
+        if sub.ndim != 2:
+            raise ValueError("Mask patch must be a 2-D array")
+        if x < 0 or y < 0 or x + sub.shape[1] > header.width or y + sub.shape[0] > header.height:
+            raise ValueError("Mask patch lies outside the image")
+    if not patches:
+        return blob, mask_stats(blob)
+
+    boxes = [(x, y, x + sub.shape[1], y + sub.shape[0]) for x, y, sub in patches]
+    if crop.size:
+        boxes.append((header.x, header.y, header.x + header.w, header.y + header.h))
+    x0, y0 = min(box[0] for box in boxes), min(box[1] for box in boxes)
+    x1, y1 = max(box[2] for box in boxes), max(box[3] for box in boxes)
+
+    region = np.zeros((y1 - y0, x1 - x0), dtype=bool)
+    area = 0
+    if crop.size:
+        region[header.y - y0:header.y - y0 + header.h, header.x - x0:header.x - x0 + header.w] = crop
+        area = int(np.count_nonzero(crop))
+    for x, y, sub in patches:
+        target = region[y - y0:y - y0 + sub.shape[0], x - x0:x - x0 + sub.shape[1]]
+        area += int(np.count_nonzero(sub)) - int(np.count_nonzero(target))
+        target[...] = sub
+
+    new_blob = _encode_region(region, x0, y0, header.width, header.height)
+    return new_blob, _stats(read_header(new_blob), area)
+
+
+def decode_image_data(mask_data: str) -> np.ndarray:
+    """
+    Decode a base64 (optionally data-URL) encoded mask image into a bool array.
+
+    RGBA canvases use the alpha channel; other images use any non-zero channel.
+    """
+    if mask_data.startswith("data:"):
+        mask_data = mask_data.split(",", 1)[-1]
+    try:
+        raw = base64.b64decode(mask_data, validate=False)
+    except (ValueError, TypeError):
+        raise ValueError("Mask data is not valid base64")
+    if not raw:
+        raise ValueError("Mask data is empty")
+
+    image = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError("Mask data is not a valid image")
+    if image.ndim == 2:
+        return image > 0
+    if image.shape[2] == 4:
+        return image[:, :, 3] > 0
+    return image.any(axis=2)
+
+
+def encode_png(mask: np.ndarray) -> bytes:
+    """Encode a mask as a grayscale PNG (API edge only)"""
+    ok, png = cv2.imencode(".png", mask.astype(np.uint8) * 255)
+    if not ok:
+        raise ValueError("Failed to encode mask")
+    return png.tobytes()
+
+
+def encode_png_data_url(mask: np.ndarray) -> str:
+    """Encode a mask as a base64 PNG data URL (API edge only)"""
+    return "data:image/png;base64," + base64.b64encode(encode_png(mask)).decode("ascii")
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Polygon geometry helpers built on NumPy and OpenCV.
+
+Polygons are (N, 2) float arrays of x, y vertices without a repeated
+closing vertex.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+def extract_polygons(
+    mask: np.ndarray, *, offset: Tuple[int, int] = (0, 0),
+    tolerance: float = 0.0, min_points: int = 3
+) -> List[np.ndarray]:
+    """
+    Extract the outer contours of a binary mask as polygons.
+
+    `offset` is added to every vertex, so a mask cropped to its bounding box
+    yields coordinates in full-image pixels. A positive `tolerance`
+    simplifies each contour with Douglas-Peucker (in pixels).
+    """
+    if not mask.size:
+        return []
+
+    # Bool masks are reinterpreted in place instead of copied
+    image = mask.view(np.uint8) if mask.dtype == bool else mask.astype(np.uint8)
+    contours, _ = cv2.findContours(
+        np.ascontiguousarray(image), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    )
+    polygons = []
+    for contour in contours:
+        if tolerance > 0:
+            contour = cv2.approxPolyDP(contour, tolerance, True)
+        if len(contour) < min_points:
+            continue
+        polygons.append(contour.reshape(-1, 2).astype(np.float64) + offset)
+    return polygons
+
+
+def polygon_metrics(polygons: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Area, perimeter and compactness (4*pi*A / P^2) of many polygons at once.
+
+    All vertices are concatenated and reduced per polygon with a single
+    vectorized pass instead of a Python loop over vertices.
+    """
+    if not polygons:
+        empty = np.empty(0, dtype=np.float64)
+        return empty, empty, empty
+
+    counts = np.fromiter((len(p) for p in polygons), dtype=np.intp, count=len(polygons))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    points = np.concatenate(polygons)
+
+    # Index of the next vertex, wrapping around inside each polygon
+    next_index = np.arange(len(points)) + 1
+    next_index[starts + counts - 1] = starts
+    x, y = points[:, 0], points[:, 1]
+    nx, ny = x[next_index], y[next_index]
+
+    areas = 0.5 * np.abs(np.add.reduceat(x * ny - nx * y, starts))
+    perimeters = np.add.reduceat(np.hypot(nx - x, ny - y), starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        compactness = np.where(perimeters > 0, 4 * np.pi * areas / perimeters ** 2, 0.0)
+    return areas, perimeters, compactness
+
+
+def simplify_polygons(polygons: Sequence[np.ndarray], tolerance: float) -> List[np.ndarray]:
+    """
+    Douglas-Peucker simplification of many closed polygons at once.
+
+    Returns, per polygon, the indices of the vertices kept. Iterative and
+    level-synchronous: each pass measures every interior vertex of every
+    open range (across all polygons) against its range's chord in one
+    vectorized computation, then splits the ranges whose farthest vertex is
+    beyond `tolerance`. The number of Python-level passes is the depth of
+    the split tree, not the number of vertices or polygons. Each polygon is
+    first split at its first vertex and the vertex farthest from it.
+    """
+    if not len(polygons):
+        return []
+    arrays = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polygons]
+    counts = np.fromiter((len(p) for p in arrays), dtype=np.intp, count=len(arrays))
+    if tolerance <= 0 or not counts.any():
+        return [np.arange(count) for count in counts]
+
+    # Every polygon is followed by a copy of its first vertex, so the closing
+    # edge is an ordinary range
+    points = np.concatenate([np.concatenate((p, p[:1])) for p in arrays])
+    sizes = np.where(counts > 0, counts + 1, 0)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    nonempty = counts > 0
+    firsts, lasts = starts[nonempty], (starts + counts)[nonempty]
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[firsts] = True
+    far = _group_argmax(
+        np.sum((points - np.repeat(points[firsts], sizes[nonempty], axis=0)) ** 2, axis=1),
+        sizes[nonempty]
+    )
+    keep[far] = True
+
+    xs, ys = np.ascontiguousarray(points[:, 0]), np.ascontiguousarray(points[:, 1])
+    range_start = np.concatenate((firsts, far))
+    range_end = np.concatenate((far, lasts))
+    while True:
+        interior = range_end - range_start - 1
+        active = interior > 0
+        range_start, range_end, interior = range_start[active], range_end[active], interior[active]
+        if not range_start.size:
+            break
+
+        offsets = np.concatenate(([0], np.cumsum(interior)[:-1]))
+        index = np.arange(interior.sum()) + np.repeat(range_start + 1 - offsets, interior)
+        ax, ay = xs[range_start], ys[range_start]
+        cx, cy = xs[range_end] - ax, ys[range_end] - ay
+        rx = xs[index] - np.repeat(ax, interior)
+        ry = ys[index] - np.repeat(ay, interior)
+
+        # |chord x rel| is the distance scaled by the chord length, which is
+        # constant within a range: compare it against tolerance * length.
+        # Degenerate chords (closing ranges of a polygon) use the squared
+        # distance to the range start instead.
+        score = np.abs(np.repeat(cx, interior) * ry - np.repeat(cy, interior) * rx)
+        length = np.hypot(cx, cy)
+        threshold = tolerance * length
+        degenerate = length == 0
+        if degenerate.any():
+            score = np.where(np.repeat(degenerate, interior), rx * rx + ry * ry, score)
+            threshold[degenerate] = tolerance * tolerance
+
+        best = _group_argmax(score, interior, offsets)
+        split = score[best] > threshold
+        mids = index[best[split]]
+        keep[mids] = True
+        range_start, range_end = (
+            np.concatenate((range_start[split], mids)),
+            np.concatenate((mids, range_end[split])),
+        )
+
+    return [np.flatnonzero(keep[start:start + count]) for start, count in zip(starts, counts)]
+
+
+def simplify_polygon(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Indices of the vertices of one closed polygon kept by Douglas-Peucker"""
+    return simplify_polygons([points], tolerance)[0]
+
+
+def _group_argmax(values: np.ndarray, counts: np.ndarray, offsets: Optional[np.ndarray] = None) -> np.ndarray:
+    """Flat index of the first maximum of each consecutive group of `counts` (all > 0) values"""
+    if offsets is None:
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    candidates = np.flatnonzero(values == np.repeat(np.maximum.reduceat(values, offsets), counts))
+    group = np.searchsorted(offsets, candidates, side="right")
+    return candidates[np.flatnonzero(np.diff(group, prepend=0))]
\ No newline at end of file
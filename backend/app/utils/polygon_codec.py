@@ -0,0 +1,71 @@
+"""
+Compact binary storage for annotation polygons.
+
+A stored polygon is the flat vertex list (x1, y1, x2, y2, ...) as packed
+little-endian float32, with no header: the point count is len(blob) / 8.
+Decoding is a zero-copy `np.frombuffer` view over the blob; JSON is only
+produced at the API edge for clients that still exchange coordinate arrays.
+
+float32 keeps ~7 significant digits, well below the 1e-6 rounding used for
+normalized coordinates and the 0.01 px used for pixel coordinates.
+"""
+import json
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+COORD_DTYPE = np.dtype("<f4")
+POINT_SIZE = 2 * COORD_DTYPE.itemsize
+
+# Decimals kept when coordinates are rendered as JSON
+NORMALIZED_DECIMALS = 6
+ORIGINAL_DECIMALS = 2
+
+Coordinates = Union[np.ndarray, Sequence[float], str]
+
+
+def encode_coordinates(coords: Coordinates) -> bytes:
+    """Pack a flat or (N, 2) coordinate array (or its JSON text) into the storage format"""
+    if isinstance(coords, str):
+        coords = parse_json(coords)
+    flat = np.asarray(coords, dtype=COORD_DTYPE).reshape(-1)
+    if flat.size % 2:
+        raise ValueError("Coordinates must be x, y pairs")
+    return flat.tobytes()
+
+
+def decode_coordinates(blob: Optional[bytes]) -> np.ndarray:
+    """Read-only flat float32 view (x1, y1, x2, y2, ...) over a stored polygon, without copying"""
+    if not blob:
+        return np.empty(0, dtype=COORD_DTYPE)
+    if len(blob) % POINT_SIZE:
+        raise ValueError("Polygon data is truncated")
+    return np.frombuffer(blob, dtype=COORD_DTYPE)
+
+
+def decode_points(blob: Optional[bytes]) -> np.ndarray:
+    """Stored polygon as an (N, 2) float32 view"""
+    return decode_coordinates(blob).reshape(-1, 2)
+
+
+def point_count(blob: Optional[bytes]) -> int:
+    return len(blob or b"") // POINT_SIZE
+
+
+def parse_json(raw: str) -> np.ndarray:
+    """Parse a JSON coordinate array (API edge only)"""
+    try:
+        coords = np.asarray(json.loads(raw), dtype=np.float64).reshape(-1)
+    except (TypeError, ValueError):
+        raise ValueError("Coordinates must be a JSON array of numbers")
+    if coords.size % 2:
+        raise ValueError("Coordinates must be x, y pairs")
+    return coords
+
+
+def to_json(blob: Optional[bytes], decimals: int) -> Optional[str]:
+    """Render a stored polygon as a JSON coordinate array (API edge only)"""
+    if blob is None:
+        return None
+    coords = decode_coordinates(blob).astype(np.float64)
+    return json.dumps(np.round(coords, decimals).tolist())
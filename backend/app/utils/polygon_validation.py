@@ -0,0 +1,268 @@
+"""
+Geometry checks for annotation polygons.
+
+Polygons are flat normalized coordinate arrays (x1, y1, x2, y2, ...) as
+stored (see utils.polygon_codec). `validate_polygons` checks a whole batch
+at once and returns human-readable errors and warnings per polygon; a
+polygon with any error is not valid for export.
+
+Point counts, coordinate range, duplicate vertices and area are computed for
+the batch with vectorized NumPy reductions. Self-intersection uses a
+Shamos-Hoey sweep line, skipped for rings whose vertices wind strictly
+monotonically around their centroid: such a ring is star-shaped and
+therefore simple, which covers most traced contours.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Shoelace area (normalized units) at or below which a ring is degenerate
+MIN_AREA = 1e-12
+# Smallest angular step (radians) trusted by the star-shaped fast path
+_MIN_STEP = 1e-9
+# Rings are snapped to this integer grid (the float32 mantissa) before the
+# sweep, so every orientation test is exact integer arithmetic
+SWEEP_GRID = 1 << 24
+
+Result = Tuple[List[str], List[str]]
+
+
+def validate_polygon(coords: np.ndarray, *, min_points: int, max_points: int) -> Result:
+    """Errors and warnings for one polygon (see validate_polygons)"""
+    return validate_polygons([coords], min_points=min_points, max_points=max_points)[0]
+
+
+def validate_polygons(
+    polygons: Sequence[np.ndarray], *, min_points: int, max_points: int
+) -> List[Result]:
+    """
+    Check point count, coordinate range, duplicates, area and self-intersection.
+
+    Consecutive duplicate vertices are only a warning (zero-length edges);
+    any other repeated vertex means the ring touches itself and is an error.
+    """
+    results: List[Result] = [([], []) for _ in polygons]
+    arrays = []
+    for result, coords in zip(results, polygons):
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1)
+        if coords.size % 2:
+            result[0].append("Coordinates must be x, y pairs")
+            coords = coords[:0]
+        elif not np.isfinite(coords).all():
+            result[0].append("Coordinates must be finite numbers")
+            coords = coords[:0]
+        arrays.append(coords.reshape(-1, 2))
+
+    counts = np.fromiter((len(points) for points in arrays), dtype=np.intp, count=len(arrays))
+    for result, count in zip(results, counts):
+        if result[0]:
+            continue
+        if count < min_points:
+            result[0].append(f"Polygon has {count} points; at least {min_points} are required")
+        if count > max_points:
+            result[0].append(f"Polygon has {count} points; at most {max_points} are allowed")
+        if count == 0:
+            result[0].append("Polygon is degenerate (zero area)")
+
+    present = np.flatnonzero(counts > 0)
+    if not present.size:
+        return results
+
+    stats = _batch_stats([arrays[i] for i in present], counts[present])
+    for position, index in enumerate(present):
+        errors, warnings = results[index]
+        if stats["outside"][position]:
+            errors.append(f"{stats['outside'][position]} coordinates are outside the normalized range [0, 1]")
+        if stats["consecutive"][position]:
+            warnings.append(f"{stats['consecutive'][position]} consecutive duplicate vertices")
+        if stats["repeated"][position]:
+            errors.append(f"{stats['repeated'][position]} vertices are repeated (the ring touches itself)")
+
+        if stats["ring_count"][position] < 3 or stats["area"][position] <= MIN_AREA:
+            errors.append("Polygon is degenerate (zero area)")
+        elif not stats["repeated"][position] and not stats["star"][position]:
+            start = stats["starts"][position]
+            points = arrays[index]
+            ring = points[~stats["consecutive_mask"][start:start + len(points)]]
+            if has_self_intersection(np.rint(ring * SWEEP_GRID).astype(np.int64)):
+                errors.append("Polygon edges intersect")
+    return results
+
+
+def _batch_stats(arrays: List[np.ndarray], counts: np.ndarray) -> dict:
+    """Per-polygon reductions over the concatenated vertices of non-empty polygons"""
+    points = np.concatenate(arrays)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    group = np.repeat(np.arange(len(counts)), counts)
+    next_index = np.arange(len(points)) + 1
+    next_index[starts + counts - 1] = starts
+    x, y = points[:, 0], points[:, 1]
+    nx, ny = x[next_index], y[next_index]
+
+    outside = np.add.reduceat(((points < 0) | (points > 1)).sum(axis=1), starts)
+    # Zero-length edges contribute nothing to the shoelace sum, so the area
+    # of the ring with consecutive duplicates removed is the same
+    area = 0.5 * np.abs(np.add.reduceat(x * ny - nx * y, starts))
+
+    consecutive_mask = (x == nx) & (y == ny) & (counts[group] > 1)
+    consecutive = np.add.reduceat(consecutive_mask.astype(np.intp), starts)
+    ring_count = counts - consecutive
+
+    # Repeated vertices: sort ring vertices by (polygon, x, y) and compare neighbours
+    ring_mask = ~consecutive_mask
+    ring_group, ring_x, ring_y = group[ring_mask], x[ring_mask], y[ring_mask]
+    order = np.lexsort((ring_y, ring_x, ring_group))
+    sorted_group = ring_group[order]
+    same = (
+        (sorted_group[1:] == sorted_group[:-1])
+        & (ring_x[order][1:] == ring_x[order][:-1])
+        & (ring_y[order][1:] == ring_y[order][:-1])
+    )
+    repeated = np.bincount(sorted_group[1:][same], minlength=len(counts))
+
+    return {
+        "starts": starts,
+        "outside": outside,
+        "area": area,
+        "consecutive": consecutive,
+        "consecutive_mask": consecutive_mask,
+        "ring_count": ring_count,
+        "repeated": repeated,
+        "star": _star_shaped(ring_x, ring_y, ring_group, ring_count),
+    }
+
+
+def _star_shaped(x: np.ndarray, y: np.ndarray, group: np.ndarray, ring_count: np.ndarray) -> np.ndarray:
+    """
+    Whether each ring winds strictly monotonically, by less than pi per edge
+    and exactly once in total, around its vertex centroid.
+
+    Every edge then sweeps its own angular wedge around the centroid, the
+    wedges only meet at shared vertices, and the ring is simple.
+    """
+    star = np.zeros(len(ring_count), dtype=bool)
+    nonempty = ring_count > 0
+    if not nonempty.any():
+        return star
+    counts = ring_count[nonempty]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    center_x = np.add.reduceat(x, starts) / counts
+    center_y = np.add.reduceat(y, starts) / counts
+    local = np.repeat(np.arange(len(counts)), counts)
+    dx, dy = x - center_x[local], y - center_y[local]
+
+    angle = np.arctan2(dy, dx)
+    next_index = np.arange(len(x)) + 1
+    next_index[starts + counts - 1] = starts
+    step = np.mod(angle[next_index] - angle + np.pi, 2 * np.pi) - np.pi
+    turn = np.add.reduceat(step, starts)
+    min_step = np.minimum.reduceat(step, starts)
+    max_step = np.maximum.reduceat(step, starts)
+    min_radius = np.minimum.reduceat(dx * dx + dy * dy, starts)
+
+    counterclockwise = (min_step > _MIN_STEP) & (max_step < np.pi - _MIN_STEP) & (np.abs(turn - 2 * np.pi) < 1e-6)
+    clockwise = (max_step < -_MIN_STEP) & (min_step > -np.pi + _MIN_STEP) & (np.abs(turn + 2 * np.pi) < 1e-6)
+    star[nonempty] = (counts >= 3) & (min_radius > 0) & (counterclockwise | clockwise)
+    return star
+
+
+def has_self_intersection(points: np.ndarray) -> bool:
+    """
+    Whether two edges of a closed ring cross or touch (Shamos-Hoey sweep line).
+
+    Edges are swept left to right; only edges that become neighbours in the
+    sweep order are tested, so a simple polygon costs O(n log n) comparisons
+    instead of the O(n^2) of testing every edge pair. Edges sharing a vertex
+    only count when they fold back over each other. Expects a ring without
+    zero-length edges or repeated vertices; integer coordinates make every
+    predicate exact.
+    """
+    pts = [tuple(point) for point in np.asarray(points).tolist()]
+    n = len(pts)
+    if n < 3:
+        return False
+
+    left, right = [], []
+    events = []
+    for i in range(n):
+        a, b = pts[i], pts[(i + 1) % n]
+        lo, hi = (a, b) if a <= b else (b, a)
+        left.append(lo)
+        right.append(hi)
+        events.append((lo, 0, i))
+        events.append((hi, 1, i))
+    events.sort()
+
+    def below(j: int, i: int) -> bool:
+        """
+        Whether edge j passes below the left end of edge i at the sweep
+        position, ties broken by direction. Uses the same orientation test
+        as the crossing check so the sweep order never contradicts it.
+        """
+        point = left[i]
+        if left[j][0] == right[j][0]:
+            side = point[1] - left[j][1]
+        else:
+            side = _orientation(left[j], right[j], point)
+        if side != 0:
+            return side > 0
+        # Same point: the edge turning clockwise from the other goes first
+        return _orientation(left[i], right[i], (left[i][0] + right[j][0] - left[j][0],
+                                                left[i][1] + right[j][1] - left[j][1])) < 0
+
+    def crosses(i: int, j: int) -> bool:
+        if (i + 1) % n == j or (j + 1) % n == i:
+            return _folds_back(pts, i, j, n)
+        return _segments_intersect(pts[i], pts[(i + 1) % n], pts[j], pts[(j + 1) % n])
+
+    status: List[int] = []
+    for _, kind, i in events:
+        if kind == 0:
+            lo, hi = 0, len(status)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if below(status[mid], i):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            status.insert(lo, i)
+            if lo > 0 and crosses(status[lo - 1], i):
+                return True
+            if lo + 1 < len(status) and crosses(i, status[lo + 1]):
+                return True
+        else:
+            pos = status.index(i)
+            if 0 < pos < len(status) - 1 and crosses(status[pos - 1], status[pos + 1]):
+                return True
+            del status[pos]
+    return False
+
+
+def _orientation(a, b, c) -> float:
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+def _on_segment(a, b, p) -> bool:
+    return min(a[0], b[0]) <= p[0] <= max(a[0], b[0]) and min(a[1], b[1]) <= p[1] <= max(a[1], b[1])
+
+
+def _segments_intersect(a, b, c, d) -> bool:
+    """Whether segments ab and cd share any point"""
+    o1, o2 = _orientation(a, b, c), _orientation(a, b, d)
+    o3, o4 = _orientation(c, d, a), _orientation(c, d, b)
+    if ((o1 > 0 > o2) or (o1 < 0 < o2)) and ((o3 > 0 > o4) or (o3 < 0 < o4)):
+        return True
+    return (
+        (o1 == 0 and _on_segment(a, b, c)) or (o2 == 0 and _on_segment(a, b, d))
+        or (o3 == 0 and _on_segment(c, d, a)) or (o4 == 0 and _on_segment(c, d, b))
+    )
+
+
+def _folds_back(pts, i: int, j: int, n: int) -> bool:
+    """Whether two edges sharing a vertex overlap beyond it (a spike)"""
+    if (i + 1) % n != j:
+        i, j = j, i
+    shared, p, q = pts[j], pts[i], pts[(j + 1) % n]
+    u = (p[0] - shared[0], p[1] - shared[1])
+    v = (q[0] - shared[0], q[1] - shared[1])
+    return u[0] * v[1] - u[1] * v[0] == 0 and u[0] * v[0] + u[1] * v[1] > 0
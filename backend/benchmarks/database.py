@@ -0,0 +1,55 @@
+"""
+In-memory database for benchmarks that exercise the CRUD layer.
+
+The models use MySQL column types; they are compiled to their SQLite
+equivalents so a benchmark can run without a database server. Query counts
+are dialect independent, timings are only indicative.
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.mysql import LONGBLOB, LONGTEXT
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.base import Base
+
+
+@compiles(LONGTEXT, "sqlite")
+def _compile_longtext(type_, compiler, **kw):
+    return "TEXT"
+
+
+@compiles(LONGBLOB, "sqlite")
+def _compile_longblob(type_, compiler, **kw):
+    return "BLOB"
+
+
+def make_session():
+    """Fresh in-memory database with the full schema; returns (engine, session)"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine, autoflush=False)()
+
+
+class QueryCounter:
+    """Counts statements executed on an engine while active"""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args, **kwargs) -> None:
+        self.count += 1
+
+
+@contextmanager
+def count_queries(engine):
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
@@ -0,0 +1,72 @@
+"""
+Export engine benchmark.
+
+Feeds synthetic joined annotation rows into the YOLO/COCO export builder and
+reports the per-annotation cost at increasing project sizes. A linear engine
+keeps the per-annotation cost roughly flat as the annotation count grows.
+
+Usage (from the backend directory):
+    python -m benchmarks.export_benchmark
+"""
+import random
+import sys
+import time
+from collections import namedtuple
+
+from app.services.dataset_export import build_export_data
+from app.utils import polygon_codec
+
+ExportRow = namedtuple(
+    "ExportRow",
+    ["image_id", "filename", "dataset_type", "width", "height",
+     "class_index", "annotation_id", "normalized_blob"],
+)
+ImageRow = namedtuple("ImageRow", ["id", "filename", "file_path", "dataset_type", "width", "height"])
+
+POLYGONS_PER_IMAGE = 10
+POINTS_PER_POLYGON = 32
+SIZES = (25_000, 50_000, 100_000)
+
+
+def make_project(annotation_count: int, seed: int = 0):
+    """Build synthetic rows for a project with `annotation_count` polygons"""
+    rng = random.Random(seed)
+    dataset_types = ("train", "train", "train", "val")
+    image_count = annotation_count // POLYGONS_PER_IMAGE
+    images = [
+        ImageRow(i, f"img_{i}.jpg", f"/tmp/img_{i}.jpg", dataset_types[i % 4], 1920, 1080)
+        for i in range(image_count)
+    ]
+    rows = []
+    for annotation_id in range(annotation_count):
+        image = images[annotation_id // POLYGONS_PER_IMAGE]
+        coords = [round(rng.random(), 6) for _ in range(POINTS_PER_POLYGON * 2)]
+        rows.append(ExportRow(
+            image.id, image.filename, image.dataset_type, image.width, image.height,
+            rng.randrange(10), annotation_id, polygon_codec.encode_coordinates(coords),
+        ))
+    return rows, images
+
+
+def run(format: str) -> None:
+    classes = [{"id": i, "name": f"class_{i}"} for i in range(10)]
+    baseline = None
+    print(f"\n[{format}]")
+    print(f"{'annotations':>12} {'seconds':>9} {'us/annotation':>14} {'ratio':>6}")
+    for size in SIZES:
+        rows, images = make_project(size)
+        start = time.perf_counter()
+        build_export_data(
+            rows, images if format == "coco" else None,
+            project_name="benchmark", format=format, classes=classes,
+        )
+        elapsed = time.perf_counter() - start
+        per_annotation = elapsed / size * 1e6
+        baseline = baseline or per_annotation
+        print(f"{size:>12} {elapsed:>9.3f} {per_annotation:>14.2f} {per_annotation / baseline:>6.2f}")
+
+
+if __name__ == "__main__":
+    formats = sys.argv[1:] or ["yolo", "coco"]
+    for export_format in formats:
+        run(export_format)
\ No newline at end of file
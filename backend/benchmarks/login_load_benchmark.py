@@ -0,0 +1,136 @@
+"""
+Login load benchmark.
+
+Drives the application in-process with two kinds of closed-loop clients:
+canvas clients repeatedly loading a project's annotations (an authenticated
+read the editor issues constantly) and login clients repeatedly posting
+/auth/login. Canvas latency is measured alone and during a login storm,
+once with bcrypt computed in the request threadpool
+(PASSWORD_HASH_WORKERS=0, the previous behaviour) and once in the password
+process pool. The pool keeps canvas latency close to its baseline while
+logins queue behind a bounded number of hashing processes.
+
+The database is a temporary SQLite file, so timings are only indicative.
+
+Usage (from the backend directory):
+    python -m benchmarks.login_load_benchmark [seconds per phase]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import deps, security
+from app.core.config import settings
+from app.main import app
+from app.models import Project, User
+from app.models.base import Base
+
+from . import database  # noqa: F401  (SQLite compilation of the MySQL column types)
+
+CANVAS_CLIENTS = 8
+LOGIN_CLIENTS = 16
+PASSWORD = "benchmark-password"
+
+
+def seed(SessionLocal):
+    db = SessionLocal()
+    user = User(
+        username="bench", email="bench@example.com", oauth_provider="local",
+        hashed_password=security.pwd_context.hash(PASSWORD), is_active=True,
+    )
+    db.add(user)
+    db.flush()
+    project = Project(name="bench", owner_id=user.id)
+    db.add(project)
+    db.commit()
+    user_id, project_id = user.id, project.id
+    db.close()
+    return user_id, project_id
+
+
+async def canvas_client(client, url, headers, deadline, latencies) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def login_client(client, deadline, results) -> None:
+    form = {"username": "bench", "password": PASSWORD}
+    while time.perf_counter() < deadline:
+        response = await client.post("/api/v1/auth/login", data=form)
+        results.append(response.status_code)
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+
+async def phase(client, url, headers, seconds: float, logins: bool):
+    deadline = time.perf_counter() + seconds
+    latencies, login_results = [], []
+    tasks = [canvas_client(client, url, headers, deadline, latencies) for _ in range(CANVAS_CLIENTS)]
+    if logins:
+        tasks += [login_client(client, deadline, login_results) for _ in range(LOGIN_CLIENTS)]
+    await asyncio.gather(*tasks)
+    return latencies, login_results
+
+
+def report(label: str, seconds: float, latencies, login_results) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95)]
+    accepted = login_results.count(200)
+    print(
+        f"{label:<22} {len(latencies) / seconds:>9.1f} {statistics.median(latencies) * 1000:>8.1f}"
+        f" {p95 * 1000:>8.1f} {accepted / seconds:>9.2f} {login_results.count(503):>5}"
+    )
+
+
+async def run(seconds: float) -> None:
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    user_id, project_id = seed(SessionLocal)
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[deps.get_db] = get_db
+    app.dependency_overrides[deps.get_read_db] = get_db
+    token = security.create_access_token(data={"sub": str(user_id)})
+    headers = {"Authorization": f"Bearer {token}"}
+    url = f"/api/v1/annotations/project/{project_id}"
+
+    print(f"bcrypt rounds {settings.BCRYPT_ROUNDS}, {CANVAS_CLIENTS} canvas / {LOGIN_CLIENTS} login clients, "
+          f"{os.cpu_count()} CPUs, {seconds:.0f} s per phase")
+    print(f"{'':<22} {'canvas/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'logins/s':>9} {'503':>5}")
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            report("canvas only", seconds, *await phase(client, url, headers, seconds, logins=False))
+            for workers, label in ((0, "logins, threadpool"), (2, "logins, process pool")):
+                settings.PASSWORD_HASH_WORKERS = workers
+                # Start the pool's processes before measuring
+                await client.post("/api/v1/auth/login", data={"username": "bench", "password": PASSWORD})
+                report(label, seconds, *await phase(client, url, headers, seconds, logins=True))
+    finally:
+        security.shutdown_executor()
+        app.dependency_overrides.clear()
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(run(float(sys.argv[1]) if len(sys.argv) > 1 else 10.0))
@@ -0,0 +1,116 @@
+"""
+Deep pagination benchmark: OFFSET vs keyset.
+
+Seeds a project with 100k images and 100k segmentations and times fetching
+page 1000 (100 rows per page) of the image listing, ordered by
+(project_id, id), and of the segmentation listing, ordered by
+(created_at, id) descending. OFFSET has to walk every skipped row, so its
+cost grows with the page number; a keyset page is a single index range
+scan whatever its depth.
+
+Usage (from the backend directory):
+    python -m benchmarks.pagination_benchmark
+"""
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert
+
+from app.crud import image as crud_image, segmentation as crud_segmentation
+from app.models.class_definition import ClassDefinition
+from app.models.image import Image
+from app.models.project import Project
+from app.models.segmentation import Segmentation
+from app.models.user import User
+from app.utils import mask_codec
+
+from .database import make_session
+
+ROWS = 100_000
+PAGE_SIZE = 100
+PAGE = 1000
+REPEAT = 5
+INSERT_BATCH = 10_000
+
+
+def seed(db) -> int:
+    """Create one project holding ROWS images with a segmentation each; returns its id"""
+    user = User(username="bench", email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    project = Project(name="bench", owner_id=user.id)
+    db.add(project)
+    db.flush()
+    class_def = ClassDefinition(name="c", display_name="C", color="#ff0000", class_index=0, project_id=project.id)
+    db.add(class_def)
+    db.flush()
+
+    start = datetime(2024, 1, 1)
+    mask_blob = mask_codec.encode_mask(np.ones((4, 4), dtype=bool))
+    for offset in range(0, ROWS, INSERT_BATCH):
+        ids = range(offset + 1, min(offset + INSERT_BATCH, ROWS) + 1)
+        db.execute(insert(Image), [
+            {
+                "id": i, "filename": f"{i}.jpg", "original_filename": f"{i}.jpg", "file_path": f"/tmp/{i}.jpg",
+                "file_size": 1, "width": 4, "height": 4, "format": "jpeg", "dataset_type": "train",
+                "is_processed": True, "has_annotations": True, "project_id": project.id,
+                "created_at": start, "updated_at": start,
+            }
+            for i in ids
+        ])
+        db.execute(insert(Segmentation), [
+            {
+                "id": i, "image_id": i, "class_id": class_def.id, "mask_blob": mask_blob, "layer_index": 0,
+                # Several rows share each timestamp, so the id tie-breaker matters
+                "created_at": start + timedelta(seconds=i // 4), "updated_at": start,
+            }
+            for i in ids
+        ])
+    db.commit()
+    return project.id
+
+
+def timed(fn) -> float:
+    """Median wall time of `fn` in milliseconds"""
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run() -> None:
+    engine, db = make_session()
+    project_id = seed(db)
+    skip = (PAGE - 1) * PAGE_SIZE
+
+    # Keys of the last row of page PAGE - 1, as a client would hold in its cursor
+    after_id = crud_image.get_by_project(db, project_id=project_id, skip=skip - 1, limit=1)[0].id
+    last = crud_segmentation.get_by_project(db, project_id=project_id, skip=skip - 1, limit=1)[0]
+    after = (last.created_at, last.id)
+
+    cases = {
+        "images": (
+            lambda: crud_image.get_by_project(db, project_id=project_id, skip=skip, limit=PAGE_SIZE),
+            lambda: crud_image.get_by_project(db, project_id=project_id, limit=PAGE_SIZE, after_id=after_id),
+        ),
+        "segmentations": (
+            lambda: crud_segmentation.get_by_project(db, project_id=project_id, skip=skip, limit=PAGE_SIZE),
+            lambda: crud_segmentation.get_by_project(db, project_id=project_id, limit=PAGE_SIZE, after=after),
+        ),
+    }
+
+    print(f"page {PAGE} of {ROWS // PAGE_SIZE} ({PAGE_SIZE} rows/page), median of {REPEAT}")
+    print(f"{'listing':>14} {'offset ms':>10} {'keyset ms':>10} {'speedup':>8}")
+    for name, (offset_page, keyset_page) in cases.items():
+        assert [row.id for row in offset_page()] == [row.id for row in keyset_page()]
+        offset_ms, keyset_ms = timed(offset_page), timed(keyset_page)
+        print(f"{name:>14} {offset_ms:>10.2f} {keyset_ms:>10.2f} {offset_ms / keyset_ms:>7.1f}x")
+        db.expunge_all()
+
+
+if __name__ == "__main__":
+    run()
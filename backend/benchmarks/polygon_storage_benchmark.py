@@ -0,0 +1,53 @@
+"""
+Polygon storage benchmark.
+
+Compares the former JSON text columns with the packed float32 blobs of
+utils.polygon_codec: bytes stored per project and the time to turn every
+stored polygon back into a coordinate array (what export, validation and
+simplification do for each row).
+
+Usage (from the backend directory):
+    python -m benchmarks.polygon_storage_benchmark
+"""
+import json
+import time
+
+import numpy as np
+
+from app.utils import polygon_codec
+
+POINTS_PER_POLYGON = 64
+SIZES = (10_000, 50_000)
+
+
+def make_polygons(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    coords = np.round(rng.random((count, POINTS_PER_POLYGON * 2)), 6)
+    texts = [json.dumps(row.tolist()) for row in coords]
+    blobs = [polygon_codec.encode_coordinates(row) for row in coords]
+    return texts, blobs
+
+
+def timed(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return time.perf_counter() - start
+
+
+def run() -> None:
+    print(f"{'polygons':>9} {'points':>10} {'json MB':>8} {'blob MB':>8} "
+          f"{'json parse s':>13} {'frombuffer s':>13} {'speedup':>8}")
+    for size in SIZES:
+        texts, blobs = make_polygons(size)
+        json_bytes = sum(len(text.encode()) for text in texts)
+        blob_bytes = sum(len(blob) for blob in blobs)
+        json_time = timed(lambda text: np.asarray(json.loads(text), dtype=np.float64), texts)
+        blob_time = timed(polygon_codec.decode_coordinates, blobs)
+        print(f"{size:>9} {size * POINTS_PER_POLYGON:>10} {json_bytes / 1e6:>8.1f} "
+              f"{blob_bytes / 1e6:>8.1f} {json_time:>13.3f} {blob_time:>13.4f} "
+              f"{json_time / blob_time:>7.0f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,83 @@
+"""
+Project listing statistics benchmark.
+
+Seeds an in-memory database with a growing number of projects and reports
+how many queries and how long it takes to read the stats shown by
+GET /projects/ from the project_stats counters. The query count should stay
+constant as projects are added.
+
+Usage (from the backend directory):
+    python -m benchmarks.project_stats_benchmark
+"""
+import time
+
+import numpy as np
+
+from app.crud import project as crud_project, project_stats as crud_project_stats
+from app.models.class_definition import ClassDefinition
+from app.models.image import Image
+from app.models.project import Project
+from app.models.segmentation import Segmentation
+from app.models.user import User
+
+from .database import count_queries, make_session
+
+IMAGES_PER_PROJECT = 20
+CLASSES_PER_PROJECT = 3
+SIZES = (10, 100, 500)
+
+
+def seed(db, project_count: int) -> int:
+    """Create `project_count` populated projects for one user; returns the user id"""
+    user = User(username="bench", email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+
+    mask = np.zeros((64, 64), dtype=bool)
+    mask[16:48, 16:48] = True
+    dataset_types = ("train", "train", "val", "test")
+    for p in range(project_count):
+        project = Project(name=f"project_{p}", owner_id=user.id)
+        db.add(project)
+        db.flush()
+        classes = [
+            ClassDefinition(name=f"class_{c}", display_name=f"Class {c}", color="#ff0000",
+                            class_index=c, project_id=project.id)
+            for c in range(CLASSES_PER_PROJECT)
+        ]
+        db.add_all(classes)
+        db.flush()
+        for i in range(IMAGES_PER_PROJECT):
+            image = Image(
+                filename=f"{p}_{i}.jpg", original_filename=f"{i}.jpg", file_path=f"/tmp/{p}_{i}.jpg",
+                file_size=1, width=64, height=64, format="jpeg",
+                dataset_type=dataset_types[i % 4], has_annotations=i % 2 == 0, project_id=project.id,
+            )
+            db.add(image)
+            db.flush()
+            if image.has_annotations:
+                segmentation = Segmentation(image_id=image.id, class_id=classes[i % CLASSES_PER_PROJECT].id)
+                segmentation.set_mask(mask)
+                db.add(segmentation)
+    db.commit()
+    return user.id
+
+
+def run() -> None:
+    print(f"{'projects':>9} {'queries':>8} {'seconds':>9}")
+    for size in SIZES:
+        engine, db = make_session()
+        user_id = seed(db, size)
+        crud_project_stats.reconcile(db)
+        with count_queries(engine) as counter:
+            start = time.perf_counter()
+            projects = crud_project.get_by_owner(db, owner_id=user_id, limit=size)
+            crud_project.get_stats_for_projects(db, project_ids=[project.id for project in projects])
+            elapsed = time.perf_counter() - start
+        print(f"{size:>9} {counter.count:>8} {elapsed:>9.3f}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    run()
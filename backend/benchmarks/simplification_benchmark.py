@@ -0,0 +1,56 @@
+"""
+Douglas-Peucker simplification benchmark.
+
+Simplifies synthetic noisy contours with utils.polygon.simplify_polygons
+(one vectorized run per batch, as the project-wide simplification does),
+the same engine called once per polygon, and cv2.approxPolyDP called once
+per polygon. Reports time and the vertices kept by each.
+
+Usage (from the backend directory):
+    python -m benchmarks.simplification_benchmark
+"""
+import time
+
+import cv2
+import numpy as np
+
+from app.utils.polygon import simplify_polygon, simplify_polygons
+
+TOLERANCE = 2.0
+CASES = ((10_000, 64), (10_000, 256), (1_000, 4096))
+
+
+def make_polygons(count: int, points: int, seed: int = 0):
+    """Noisy circles of `points` vertices, like traced mask contours"""
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, points, endpoint=False)
+    radii = rng.uniform(20, 400, (count, 1)) + rng.normal(0, 1.5, (count, points))
+    centers = rng.uniform(0, 2000, (count, 1, 2))
+    return list(np.stack((radii * np.cos(angles), radii * np.sin(angles)), axis=-1) + centers)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run() -> None:
+    print(f"{'polygons':>9} {'points':>7} {'batch s':>8} {'per-poly s':>11} {'cv2 s':>7} "
+          f"{'batch kept':>11} {'cv2 kept':>9}")
+    for count, points in CASES:
+        polygons = make_polygons(count, points)
+        contours = [polygon.astype(np.float32).reshape(-1, 1, 2) for polygon in polygons]
+
+        batch_time, batch = timed(lambda: simplify_polygons(polygons, TOLERANCE))
+        single_time, _ = timed(lambda: [simplify_polygon(polygon, TOLERANCE) for polygon in polygons])
+        cv2_time, approx = timed(lambda: [cv2.approxPolyDP(c, TOLERANCE, True) for c in contours])
+
+        batch_kept = sum(len(indices) for indices in batch)
+        cv2_kept = sum(len(contour) for contour in approx)
+        print(f"{count:>9} {points:>7} {batch_time:>8.3f} {single_time:>11.3f} {cv2_time:>7.3f} "
+              f"{batch_kept:>11} {cv2_kept:>9}")
+
+
+if __name__ == "__main__":
+    run()
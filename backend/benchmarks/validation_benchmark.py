@@ -0,0 +1,69 @@
+"""
+Annotation validation benchmark.
+
+Validates 100k synthetic polygons the way the project-wide validation does
+(services.annotation_validation.validate_rows over batches of stored blobs),
+in this process and spread over a process pool. Half of the polygons are
+noisy blobs (star-shaped, settled by the vectorized fast path), the other
+half crescents, which need the sweep line.
+
+Usage (from the backend directory):
+    python -m benchmarks.validation_benchmark [workers]
+"""
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.annotation_validation import validate_rows
+from app.utils import polygon_codec
+
+POLYGONS = 100_000
+POINTS = 48
+
+
+def make_rows(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, POINTS, endpoint=False)
+    rows = []
+    for annotation_id in range(count):
+        center = rng.uniform(0.3, 0.7, 2)
+        if annotation_id % 2:
+            radius = rng.uniform(0.05, 0.2) * (1 + rng.normal(0, 0.03, POINTS))
+            points = center + np.c_[np.cos(angles), np.sin(angles)] * radius[:, None]
+        else:
+            # Crescent: outer arc out, inner arc back
+            half = np.linspace(0.2, 2 * np.pi - 0.2, POINTS // 2)
+            outer = np.c_[np.cos(half), np.sin(half)] * 0.2
+            inner = np.c_[np.cos(half[::-1]), np.sin(half[::-1])] * 0.12
+            points = center + np.concatenate((outer, inner))
+        rows.append((annotation_id, polygon_codec.encode_coordinates(points)))
+    return rows
+
+
+def batches(rows, size):
+    return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+
+def run(workers: int) -> None:
+    rows = make_rows(POLYGONS)
+    chunks = batches(rows, settings.VALIDATION_BATCH_SIZE)
+
+    start = time.perf_counter()
+    invalid = sum(not m["is_valid"] for chunk in chunks for m in validate_rows(chunk))
+    single = time.perf_counter() - start
+    print(f"{POLYGONS} polygons x {POINTS} points, {invalid} invalid")
+    print(f"  1 process : {single:6.2f} s ({single / POLYGONS * 1e6:.0f} us/polygon)")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(validate_rows, chunks[:workers]))  # warm up the workers
+        start = time.perf_counter()
+        list(executor.map(validate_rows, chunks))
+        pooled = time.perf_counter() - start
+    print(f"  {workers} workers: {pooled:6.2f} s")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else max(1, settings.ANNOTATION_WORKERS))
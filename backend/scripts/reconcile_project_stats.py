@@ -0,0 +1,28 @@
+"""
+Rebuild the materialized project_stats counters from the source tables.
+
+The counters are maintained incrementally by the CRUD layer; run this after
+bulk changes made outside it (manual SQL, restores) or to verify drift.
+
+Usage (from the backend directory):
+    python -m scripts.reconcile_project_stats              # all projects
+    python -m scripts.reconcile_project_stats 3 7 12       # selected projects
+"""
+import sys
+
+from app.core.database import SessionLocal
+from app.crud import project_stats as crud_project_stats
+
+
+def main(argv) -> None:
+    project_ids = [int(arg) for arg in argv] or None
+    db = SessionLocal()
+    try:
+        rebuilt = crud_project_stats.reconcile(db, project_ids=project_ids)
+    finally:
+        db.close()
+    print(f"Rebuilt counters for {rebuilt} project(s)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
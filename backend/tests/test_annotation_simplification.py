@@ -0,0 +1,123 @@
+"""Regression tests: annotation updates and simplification keep both stored polygons consistent"""
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import deps
+from app.main import app
+from app.models import Annotation, ClassDefinition, Image, Project, Segmentation, User
+from app.crud import annotation as crud_annotation
+from app.utils import polygon_codec
+from benchmarks.database import make_session
+
+WIDTH, HEIGHT = 400, 300
+
+
+def ring(count: int, radius: float = 0.3) -> np.ndarray:
+    """Noisy normalized contour with `count` vertices"""
+    rng = np.random.default_rng(count)
+    angle = np.linspace(0, 2 * np.pi, count, endpoint=False)
+    r = radius + rng.normal(0, 0.002, count)
+    return np.column_stack((0.5 + r * np.cos(angle), 0.5 + r * np.sin(angle)))
+
+
+@pytest.fixture
+def db():
+    engine, session = make_session()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def annotation_id(db):
+    user = User(username="owner", email="owner@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    project = Project(name="p", owner_id=user.id)
+    db.add(project)
+    db.flush()
+    image = Image(
+        project_id=project.id, filename="a.png", original_filename="a.png", file_path="a.png",
+        file_size=1, width=WIDTH, height=HEIGHT, format="png",
+    )
+    class_definition = ClassDefinition(
+        project_id=project.id, name="c", display_name="c", color="#ff0000", class_index=0
+    )
+    db.add_all([image, class_definition])
+    db.flush()
+    segmentation = Segmentation(image_id=image.id, class_id=class_definition.id)
+    segmentation.set_mask(np.ones((10, 10), dtype=bool))
+    db.add(segmentation)
+    db.commit()
+    points = ring(40)
+    annotation = crud_annotation.create_from_segmentation(
+        db, segmentation_id=segmentation.id,
+        normalized_coordinates=points, original_coordinates=points * (WIDTH, HEIGHT),
+    )
+    return annotation.id
+
+
+@pytest.fixture
+def client(db):
+    def get_db():
+        yield db
+
+    app.dependency_overrides[deps.get_db] = get_db
+    app.dependency_overrides[deps.get_read_db] = get_db
+    app.dependency_overrides[deps.get_current_user] = lambda: db.query(User).one()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def assert_consistent(db, annotation_id: int) -> np.ndarray:
+    annotation = db.query(Annotation).get(annotation_id)
+    db.refresh(annotation)
+    normalized = polygon_codec.decode_points(annotation.normalized_blob)
+    assert annotation.point_count == len(normalized)
+    assert annotation.original_blob is not None
+    np.testing.assert_allclose(
+        polygon_codec.decode_points(annotation.original_blob), normalized * (WIDTH, HEIGHT), rtol=1e-5
+    )
+    return normalized
+
+
+def test_update_rederives_original_coordinates(client, db, annotation_id):
+    response = client.put(f"/api/v1/annotations/{annotation_id}",
+                          json={"normalized_coordinates": json.dumps(ring(120).ravel().tolist())})
+    assert response.status_code == 200
+    assert len(assert_consistent(db, annotation_id)) == 120
+
+
+def test_update_rejects_mismatched_point_counts(client, db, annotation_id):
+    response = client.put(f"/api/v1/annotations/{annotation_id}", json={
+        "normalized_coordinates": json.dumps(ring(50).ravel().tolist()),
+        "original_coordinates": json.dumps((ring(60) * (WIDTH, HEIGHT)).ravel().tolist()),
+    })
+    assert response.status_code == 400
+    db.rollback()
+    assert len(assert_consistent(db, annotation_id)) == 40
+
+
+def test_simplify_after_update(client, db, annotation_id):
+    client.put(f"/api/v1/annotations/{annotation_id}",
+               json={"normalized_coordinates": json.dumps(ring(200).ravel().tolist())})
+    response = client.post(f"/api/v1/annotations/{annotation_id}/simplify", params={"tolerance": 1.0})
+    assert response.status_code == 200
+    assert response.json()["original_points"] == 200
+    simplified = assert_consistent(db, annotation_id)
+    assert 3 <= len(simplified) < 200
+    assert response.json()["simplified_points"] == len(simplified)
+
+
+def test_simplify_project_after_update(client, db, annotation_id):
+    client.put(f"/api/v1/annotations/{annotation_id}",
+               json={"normalized_coordinates": json.dumps(ring(300).ravel().tolist())})
+    project_id = db.query(Project.id).scalar()
+    response = client.post(f"/api/v1/annotations/project/{project_id}/simplify", params={"tolerance": 1.0})
+    assert response.status_code == 200
+    totals = response.json()
+    assert totals["original_points"] == 300
+    assert totals["simplified_points"] == len(assert_consistent(db, annotation_id))
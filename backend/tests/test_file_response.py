@@ -0,0 +1,135 @@
+"""Tests for Range handling in utils.file_response"""
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.utils import file_response
+from app.utils.file_response import RangeNotSatisfiable, parse_range
+
+DATA = bytes(range(256)) * 40  # 10240 bytes
+SIZE = len(DATA)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, SIZE - 1)),
+    ("bytes=100-999999", (100, SIZE - 1)),
+    ("bytes=-50", (SIZE - 50, SIZE - 1)),
+    ("bytes=-999999", (0, SIZE - 1)),
+    (f"bytes={SIZE - 1}-", (SIZE - 1, SIZE - 1)),
+    # Ignored: whole file
+    ("bytes=0-1,5-6", None),
+    ("items=0-10", None),
+    ("bytes=abc-", None),
+    ("bytes=10-5", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize("header", [f"bytes={SIZE}-", f"bytes={SIZE + 10}-{SIZE + 20}", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, SIZE)
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "image.png"
+    path.write_bytes(DATA)
+    app = FastAPI()
+
+    @app.api_route("/file", methods=["GET", "HEAD"])
+    def read_file(request: Request):
+        return file_response.serve_file(request, str(path))
+
+    return TestClient(app)
+
+
+def test_full_file(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-type"] == "image/png"
+
+
+def test_byte_range(client):
+    response = client.get("/file", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 100-199/{SIZE}"
+    assert response.headers["content-length"] == "100"
+    assert response.content == DATA[100:200]
+
+
+def test_suffix_range(client):
+    response = client.get("/file", headers={"Range": "bytes=-10"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {SIZE - 10}-{SIZE - 1}/{SIZE}"
+    assert response.content == DATA[-10:]
+
+
+def test_range_past_the_end(client):
+    response = client.get("/file", headers={"Range": f"bytes={SIZE}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{SIZE}"
+    assert response.content == b""
+
+
+def test_multiple_ranges_get_the_whole_file(client):
+    response = client.get("/file", headers={"Range": "bytes=0-1,5-6"})
+    assert response.status_code == 200
+    assert response.content == DATA
+
+
+def test_if_range(client):
+    etag = client.get("/file").headers["etag"]
+    matching = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert matching.status_code == 206
+    assert matching.content == DATA[:10]
+    stale = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.content == DATA
+
+
+def test_conditional_get(client):
+    etag = client.get("/file").headers["etag"]
+    response = client.get("/file", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_head(client):
+    response = client.head("/file")
+    assert response.status_code == 200
+    assert response.headers["content-length"] == str(SIZE)
+    assert response.content == b""
+    ranged = client.head("/file", headers={"Range": "bytes=0-9"})
+    assert ranged.status_code == 206
+    assert ranged.headers["content-length"] == "10"
+    assert ranged.content == b""
+
+
+def test_chunked_read(client, monkeypatch):
+    monkeypatch.setattr(file_response, "CHUNK_SIZE", 1000)
+    response = client.get("/file", headers={"Range": "bytes=10-5009"})
+    assert response.status_code == 206
+    assert response.content == DATA[10:5010]
+
+
+def test_accel_redirect(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "IMAGE_ACCEL_REDIRECT", "/protected-uploads/")
+    (tmp_path / "1").mkdir()
+    (tmp_path / "1" / "image.png").write_bytes(DATA)
+    app = FastAPI()
+
+    @app.get("/file")
+    def read_file(request: Request):
+        return file_response.serve_file(request, str(tmp_path / "1" / "image.png"))
+
+    response = TestClient(app).get("/file")
+    assert response.status_code == 200
+    assert response.headers["x-accel-redirect"] == "/protected-uploads/1/image.png"
+    assert response.content == b""
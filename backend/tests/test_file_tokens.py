@@ -0,0 +1,38 @@
+"""Tests for the signed image file URLs in core.security"""
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from app.core import security
+from app.core.config import settings
+
+
+def test_token_is_scoped_to_one_image():
+    token = security.create_file_token(7)
+    assert security.verify_file_token(token, 7)
+    assert not security.verify_file_token(token, 8)
+    assert not security.verify_file_token(token + "x", 7)
+
+
+def test_access_token_is_not_a_file_token():
+    assert not security.verify_file_token(security.create_access_token(data={"sub": "7", "img": 7}), 7)
+
+
+def test_expired_token(monkeypatch):
+    issued = time.time() - 2 * settings.FILE_TOKEN_TTL - 1
+    monkeypatch.setattr(security.time, "time", lambda: issued)
+    token = security.create_file_token(7)
+    monkeypatch.undo()
+    assert not security.verify_file_token(token, 7)
+
+
+def test_urls_are_stable_within_a_window(monkeypatch):
+    window = settings.FILE_TOKEN_TTL
+    monkeypatch.setattr(security.time, "time", lambda: 1000 * window + 1)
+    first = security.image_file_url(7, "thumbnail")
+    monkeypatch.setattr(security.time, "time", lambda: 1001 * window - 1)
+    assert security.image_file_url(7, "thumbnail") == first
+    assert security.file_token_expiry() == 1002 * window
+
+    url = urlsplit(first)
+    assert url.path == "/api/v1/images/7/file"
+    assert parse_qs(url.query)["variant"] == ["thumbnail"]
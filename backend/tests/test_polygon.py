@@ -0,0 +1,88 @@
+"""Tests for the vectorized Douglas-Peucker in utils.polygon"""
+import math
+
+import numpy as np
+import pytest
+
+from app.utils.polygon import simplify_polygon, simplify_polygons
+
+
+def reference_simplify(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Recursive Douglas-Peucker of a closed polygon, split first at vertex 0
+    and the vertex farthest from it (the same convention as simplify_polygons)
+    """
+    pts = [tuple(p) for p in np.asarray(points, dtype=np.float64).tolist()]
+    n = len(pts)
+    if tolerance <= 0 or n == 0:
+        return np.arange(n)
+    ring = pts + pts[:1]
+    keep = {0}
+
+    def distance(p, a, b) -> float:
+        length = math.hypot(b[0] - a[0], b[1] - a[1])
+        if length == 0:
+            return math.hypot(p[0] - a[0], p[1] - a[1])
+        return abs((b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0])) / length
+
+    def split(start: int, end: int) -> None:
+        if end - start < 2:
+            return
+        best, best_distance = None, -1.0
+        for k in range(start + 1, end):
+            d = distance(ring[k], ring[start], ring[end])
+            if d > best_distance:
+                best, best_distance = k, d
+        if best_distance > tolerance:
+            keep.add(best % n)
+            split(start, best)
+            split(best, end)
+
+    distances = [math.hypot(x - ring[0][0], y - ring[0][1]) for x, y in ring]
+    far = distances.index(max(distances))
+    keep.add(far % n)
+    split(0, far)
+    split(far, n)
+    return np.array(sorted(keep), dtype=np.intp)
+
+
+def random_polygon(rng: np.random.Generator, count: int) -> np.ndarray:
+    """Noisy closed contour, like a traced mask boundary"""
+    angle = np.sort(rng.uniform(0, 2 * np.pi, count))
+    radius = 100 + rng.normal(0, 5, count).cumsum() * 0.3 + rng.normal(0, 2, count)
+    return np.column_stack((radius * np.cos(angle), radius * np.sin(angle))) + 200
+
+
+@pytest.mark.parametrize("tolerance", [0.5, 2.0, 10.0])
+def test_matches_recursive_reference(tolerance):
+    rng = np.random.default_rng(16)
+    polygons = [random_polygon(rng, count) for count in (3, 4, 10, 57, 400, 2000)]
+    results = simplify_polygons(polygons, tolerance)
+    assert len(results) == len(polygons)
+    for polygon, indices in zip(polygons, results):
+        np.testing.assert_array_equal(indices, reference_simplify(polygon, tolerance))
+
+
+def test_single_polygon_matches_batch():
+    polygon = random_polygon(np.random.default_rng(1), 300)
+    np.testing.assert_array_equal(simplify_polygon(polygon, 1.5), simplify_polygons([polygon], 1.5)[0])
+
+
+def test_collinear_vertices_are_dropped():
+    square = np.array([[0, 0], [5, 0], [10, 0], [10, 5], [10, 10], [5, 10], [0, 10], [0, 5]], dtype=float)
+    np.testing.assert_array_equal(simplify_polygon(square, 0.1), [0, 2, 4, 6])
+
+
+def test_zero_tolerance_keeps_every_vertex():
+    polygon = random_polygon(np.random.default_rng(2), 50)
+    np.testing.assert_array_equal(simplify_polygon(polygon, 0), np.arange(50))
+
+
+def test_empty_and_degenerate_inputs():
+    assert simplify_polygons([], 1.0) == []
+    empty, point, repeated = simplify_polygons(
+        [np.empty((0, 2)), np.array([[1.0, 1.0]]), np.array([[1.0, 1.0]] * 4)], 1.0
+    )
+    assert empty.size == 0
+    np.testing.assert_array_equal(point, [0])
+    np.testing.assert_array_equal(repeated, [0])
@@ -0,0 +1,153 @@
+"""Tests for the geometry checks in utils.polygon_validation"""
+import numpy as np
+import pytest
+
+from app.utils.polygon_validation import (
+    _folds_back, _segments_intersect, _star_shaped, has_self_intersection, validate_polygon, validate_polygons
+)
+
+LIMITS = {"min_points": 3, "max_points": 10000}
+
+
+def normalized(*points):
+    """Flat normalized coordinates of (x, y) points on a 0..10 grid"""
+    return np.array(points, dtype=np.float64).reshape(-1) / 10
+
+
+def brute_force_intersection(points) -> bool:
+    """Every pair of edges tested: the O(n^2) definition the sweep must agree with"""
+    pts = [tuple(p) for p in np.asarray(points).tolist()]
+    n = len(pts)
+    for i in range(n):
+        for j in range(i + 1, n):
+            if (i + 1) % n == j or (j + 1) % n == i:
+                if _folds_back(pts, i, j, n):
+                    return True
+            elif _segments_intersect(pts[i], pts[(i + 1) % n], pts[j], pts[(j + 1) % n]):
+                return True
+    return False
+
+
+def star_shaped(points) -> bool:
+    points = np.asarray(points, dtype=np.float64)
+    return bool(_star_shaped(points[:, 0], points[:, 1], np.zeros(len(points), dtype=np.intp),
+                             np.array([len(points)]))[0])
+
+
+SQUARE = [(1, 1), (9, 1), (9, 9), (1, 9)]
+U_SHAPE = [(0, 0), (6, 0), (6, 6), (4, 6), (4, 2), (2, 2), (2, 6), (0, 6)]
+# Unequal lobes, so the signed areas do not cancel to zero
+BOWTIE = [(1, 1), (9, 6), (9, 1), (1, 9)]
+# Vertex (2, 0) lies on the first edge without repeating a vertex
+TOUCHING_EDGE = [(0, 0), (4, 0), (4, 4), (2, 0), (0, 4)]
+# The ring passes through (5, 5) twice
+TOUCHING_VERTEX = [(1, 1), (5, 5), (9, 1), (9, 9), (5, 5), (1, 9)]
+# (2, 4) -> (2, 7) -> (2, 5) doubles back over itself
+SPIKE = [(0, 0), (4, 0), (4, 4), (2, 4), (2, 7), (2, 5), (0, 4)]
+
+
+def test_simple_polygons_are_valid():
+    for ring in (SQUARE, U_SHAPE):
+        assert validate_polygon(normalized(*ring), **LIMITS) == ([], [])
+
+
+def test_crossing_edges():
+    errors, _ = validate_polygon(normalized(*BOWTIE), **LIMITS)
+    assert errors == ["Polygon edges intersect"]
+    assert has_self_intersection(np.array(BOWTIE))
+
+
+def test_vertex_touching_an_edge():
+    errors, _ = validate_polygon(normalized(*TOUCHING_EDGE), **LIMITS)
+    assert errors == ["Polygon edges intersect"]
+
+
+def test_repeated_vertex_touches():
+    errors, _ = validate_polygon(normalized(*TOUCHING_VERTEX), **LIMITS)
+    assert errors == ["1 vertices are repeated (the ring touches itself)"]
+
+
+def test_spike():
+    errors, _ = validate_polygon(normalized(*SPIKE), **LIMITS)
+    assert errors == ["Polygon edges intersect"]
+    assert has_self_intersection(np.array(SPIKE))
+    # A straight continuation through a vertex is not a spike
+    assert not has_self_intersection(np.array([(0, 0), (2, 0), (4, 0), (4, 4)]))
+
+
+def test_consecutive_duplicates_only_warn():
+    errors, warnings = validate_polygon(normalized((1, 1), (9, 1), (9, 1), (9, 9), (1, 9), (1, 1)), **LIMITS)
+    assert errors == []
+    assert warnings == ["2 consecutive duplicate vertices"]
+
+
+def test_degenerate_and_malformed():
+    assert validate_polygon(normalized((1, 1), (5, 5), (9, 9)), **LIMITS)[0] == ["Polygon is degenerate (zero area)"]
+    assert validate_polygon(np.array([0.1, 0.2, 0.3]), **LIMITS)[0] == ["Coordinates must be x, y pairs"]
+    assert validate_polygon(np.array([0.1, np.nan, 0.3, 0.4, 0.5, 0.6]), **LIMITS)[0] == [
+        "Coordinates must be finite numbers"
+    ]
+    errors, _ = validate_polygon(normalized((1, 1), (12, 1), (9, 9)), **LIMITS)
+    assert errors == ["1 coordinates are outside the normalized range [0, 1]"]
+
+
+def test_batch_results_follow_input_order():
+    results = validate_polygons(
+        [normalized(*SQUARE), normalized(*BOWTIE), np.empty(0), normalized(*U_SHAPE)], **LIMITS
+    )
+    assert [errors for errors, _ in results] == [
+        [],
+        ["Polygon edges intersect"],
+        ["Polygon has 0 points; at least 3 are required", "Polygon is degenerate (zero area)"],
+        [],
+    ]
+
+
+@pytest.mark.parametrize("ring, expected", [
+    (SQUARE, True),
+    (list(reversed(SQUARE)), True),
+    # Concave but star-shaped around its centroid
+    ([(5, 0), (6, 4), (10, 5), (6, 6), (5, 10), (4, 6), (0, 5), (4, 4)], True),
+    # Simple, but the centroid lies in the notch
+    (U_SHAPE, False),
+    # Pentagram: winds twice around the centre
+    ([(5, 0), (8, 9), (0, 3), (10, 3), (2, 9)], False),
+    (BOWTIE, False),
+    (SPIKE, False),
+])
+def test_star_shaped_fast_path(ring, expected):
+    assert star_shaped(ring) is expected
+    if expected:
+        assert not has_self_intersection(np.array(ring))
+
+
+def test_star_shaped_rings_are_simple():
+    rng = np.random.default_rng(17)
+    stars = 0
+    for _ in range(500):
+        count = int(rng.integers(3, 40))
+        angle = np.sort(rng.uniform(0, 2 * np.pi, count))
+        radius = rng.uniform(300, 1000, count)
+        ring = np.rint(np.column_stack((radius * np.cos(angle), radius * np.sin(angle)))).astype(np.int64)
+        if len(np.unique(ring, axis=0)) < count:
+            continue
+        intersects = brute_force_intersection(ring)
+        assert has_self_intersection(ring) == intersects
+        if star_shaped(ring):
+            assert not intersects
+            stars += 1
+    assert stars > 100
+
+
+def test_sweep_matches_brute_force():
+    # A small grid makes collinear edges, touching vertices and spikes common
+    rng = np.random.default_rng(1)
+    grid = np.array([(x, y) for x in range(6) for y in range(6)], dtype=np.int64)
+    outcomes = set()
+    for _ in range(3000):
+        count = int(rng.integers(3, 12))
+        ring = grid[rng.choice(len(grid), count, replace=False)]
+        expected = brute_force_intersection(ring)
+        assert has_self_intersection(ring) == expected, ring.tolist()
+        outcomes.add(expected)
+    assert outcomes == {True, False}
@@ -65,6 +65,22 @@ CREATE TABLE projects (
     INDEX idx_created_at (created_at)
 );
 
+-- プロジェクト統計テーブル（CRUD層で増分更新されるカウンタ）
+CREATE TABLE project_stats (
+    project_id INT PRIMARY KEY,
+    total_images INT NOT NULL DEFAULT 0,
+    train_images INT NOT NULL DEFAULT 0,
+    val_images INT NOT NULL DEFAULT 0,
+    test_images INT NOT NULL DEFAULT 0,
+    annotated_images INT NOT NULL DEFAULT 0,
+    class_count INT NOT NULL DEFAULT 0,
+    segmentation_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
 -- 画像テーブル
 CREATE TABLE images (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -72,6 +88,7 @@ CREATE TABLE images (
     original_filename VARCHAR(255) NOT NULL,
     file_path VARCHAR(500) NOT NULL,
     file_size INT NOT NULL,
+    content_hash VARCHAR(64),
     
     -- Image properties
     width INT NOT NULL,
@@ -90,13 +107,15 @@ CREATE TABLE images (
     notes TEXT,
     
     project_id INT NOT NULL,
+    revision INT NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
     INDEX idx_project_id (project_id),
     INDEX idx_dataset_type (dataset_type),
-    INDEX idx_is_processed (is_processed)
+    INDEX idx_is_processed (is_processed),
+    INDEX idx_project_content_hash (project_id, content_hash)
 );
 
 -- クラス定義テーブル
@@ -118,6 +137,7 @@ CREATE TABLE class_definitions (
     stroke_width INT DEFAULT 2,
     
     project_id INT NOT NULL,
+    revision INT NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
@@ -132,8 +152,8 @@ CREATE TABLE segmentations (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(100),
     
-    -- Canvas data (stored as base64 encoded image)
-    mask_data LONGTEXT NOT NULL,
+    -- Canvas data (bit-packed mask cropped to its bbox)
+    mask_blob LONGBLOB NOT NULL,
     
     -- Bounding box
     bbox_x DECIMAL(10,6),
@@ -156,6 +176,7 @@ CREATE TABLE segmentations (
     
     image_id INT NOT NULL,
     class_id INT NOT NULL,
+    revision INT NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
@@ -163,16 +184,17 @@ CREATE TABLE segmentations (
     FOREIGN KEY (class_id) REFERENCES class_definitions(id) ON DELETE CASCADE,
     INDEX idx_image_id (image_id),
     INDEX idx_class_id (class_id),
-    INDEX idx_layer_index (layer_index)
+    INDEX idx_layer_index (layer_index),
+    INDEX idx_segmentations_created_at_id (created_at, id)
 );
 
 -- アノテーションテーブル
 CREATE TABLE annotations (
     id INT AUTO_INCREMENT PRIMARY KEY,
     
-    -- YOLO format data
-    normalized_coordinates LONGTEXT NOT NULL,
-    original_coordinates LONGTEXT,
+    -- YOLO format data (packed little-endian float32 x, y pairs)
+    normalized_blob LONGBLOB NOT NULL,
+    original_blob LONGBLOB,
     
     -- Polygon properties
     point_count INT NOT NULL,
@@ -193,12 +215,14 @@ CREATE TABLE annotations (
     export_format VARCHAR(20),
     
     segmentation_id INT NOT NULL,
+    revision INT NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
     FOREIGN KEY (segmentation_id) REFERENCES segmentations(id) ON DELETE CASCADE,
     INDEX idx_segmentation_id (segmentation_id),
-    INDEX idx_is_exported (is_exported)
+    INDEX idx_is_exported (is_exported),
+    INDEX idx_annotations_created_at_id (created_at, id)
 );
 
 -- データベース制約追加
@@ -211,4 +235,4 @@ INSERT INTO users (username, email, hashed_password, full_name, is_superuser) VA
 ('testuser', 'test@example.com', '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewdBPj7D7QmH9D6G', 'Test User', FALSE);
 
 -- インデックス最適化
-ANALYZE TABLE users, projects, images, class_definitions, segmentations, annotations;
\ No newline at end of file
+ANALYZE TABLE users, projects, project_stats, images, class_definitions, segmentations, annotations;
\ No newline at end of file
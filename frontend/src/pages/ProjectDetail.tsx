@@ -136,7 +136,7 @@ const ProjectDetail: React.FC = () => {
         <Grid item xs={12} lg={8}>
           {selectedImage ? (
             <AdvancedImageCanvas
-              imageUrl={`/uploads/${project.id}/${selectedImage.filename}`}
+              imageUrl={selectedImage.file_url}
               width={800}
               height={600}
               classes={classes}
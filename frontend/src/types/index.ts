@@ -44,6 +44,10 @@ export interface Image {
   dataset_type: 'train' | 'val' | 'test';
   notes?: string;
   thumbnail_path?: string;
+  // Signed URLs, valid for FILE_TOKEN_TTL..2*FILE_TOKEN_TTL seconds
+  file_url: string;
+  thumbnail_url?: string;
+  preview_url?: string;
   created_at: string;
   updated_at: string;
 }